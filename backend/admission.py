@@ -0,0 +1,185 @@
+"""
+admission.py — Admission control for the ScamShield backend.
+Caps the number of scans in flight, rate-limits each client with a token
+bucket and bounds concurrent access to Azure and MongoDB so that bursts
+are shed quickly instead of queueing until everything times out. A
+circuit breaker stops calling a dependency that keeps failing.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a request must be rejected; carries a Retry-After hint."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class Saturated(Exception):
+    """Raised when a bounded resource has no free slot within its timeout."""
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Consume one token; return 0 on success or seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-client token buckets, keeping only the most recently seen clients."""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = per_minute / 60
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, client_id: str) -> float:
+        bucket = self.buckets.get(client_id)
+        if bucket is None:
+            bucket = self.buckets[client_id] = TokenBucket(self.rate, self.burst)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_id)
+        return bucket.take()
+
+
+class Bulkhead:
+    """A semaphore with a bounded wait, tracking slots in use and waiters."""
+
+    def __init__(self, name: str, limit: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_use = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            # Unlike wait_for() on 3.11, a timeout here never drops a permit that
+            # was acquired just as the deadline or a cancellation hit
+            async with asyncio.timeout(self.timeout):
+                await self.semaphore.acquire()
+        except TimeoutError:
+            raise Saturated(f"{self.name} saturated ({self.limit} in use)")
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            self.semaphore.release()
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds; then lets one trial call through (half-open),
+    closing again on its success and re-opening on its failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now; pair with record_success/record_failure."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        # Half-open: one trial at a time; a trial that never reported back
+        # is given up on after another reset_timeout
+        now = time.monotonic()
+        if self.trial_started is not None and now - self.trial_started < self.reset_timeout:
+            return False
+        self.trial_started = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_started = None
+        if self.opened_at is not None or (self.failure_threshold and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+
+
+class AdmissionController:
+    """Global in-flight limit plus per-client rate limiting for scan requests."""
+
+    def __init__(self, max_in_flight: int, rate_limiter: RateLimiter):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rate_limiter = rate_limiter
+
+    @property
+    def saturation(self) -> float:
+        return self.in_flight / self.max_in_flight if self.max_in_flight else 0.0
+
+    def admit(self, client_id: str):
+        """
+        Reserve an in-flight slot or raise Overloaded; pair with release().
+        The in-flight limit is checked first, so a request shed as server_busy
+        does not spend one of the client's rate-limit tokens.
+        """
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            raise Overloaded("server_busy", 1.0)
+        if self.rate_limiter.enabled:
+            wait = self.rate_limiter.check(client_id)
+            if wait:
+                raise Overloaded("rate_limited", wait)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
@@ -0,0 +1,300 @@
+"""
+cli.py — Offline scanner for directories of files or lines on stdin.
+Runs the detection layers directly, without HTTP, upload parsing or
+history writes. Inputs are scanned in chunks on a process pool; each
+worker loads the model artifacts and the blocklists once, and results
+are streamed in input order as JSONL or CSV.
+
+Usage (from the repository root):
+    python -m backend.cli messages/ --output results.jsonl
+    python -m backend.cli inbox/ --format csv --workers 8 > results.csv
+    cat numbers.txt | python -m backend.cli - --offline --persist
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+try:
+    from . import config, server, storage
+except ImportError:  # launched from inside backend/ (python cli.py)
+    import config
+    import server
+    import storage
+
+CSV_FIELDS = ["source", "scan_type", "risk_score", "label", "triggers", "explanation", "error"]
+
+# Server selection timeout of the CLI's Mongo clients: a batch run fails fast
+# instead of waiting out Motor's 30s default on every blocklist lookup
+MONGO_TIMEOUT_MS = 5000
+
+# Event loop of a pool worker, kept open so its storage client stays usable
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+# --------------------------------------------------
+# Inputs
+# --------------------------------------------------
+
+def iter_files(root: Path) -> Iterator[Tuple[str, str, str]]:
+    """("file", path, path) for every supported file under root, in a stable order."""
+    if root.is_file():
+        yield "file", str(root), str(root)
+        return
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in server.SUPPORTED_FILE_TYPES:
+                path = os.path.join(directory, filename)
+                yield "file", path, path
+
+
+def iter_lines(stream: TextIO) -> Iterator[Tuple[str, str, str]]:
+    """("line", "stdin:<line number>", text) for every non-empty line of a text stream."""
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            yield "line", f"stdin:{number}", line
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_file(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """(content, scan_type) extracted from a file like /api/scan/file, or raise ValueError."""
+    file_ext = os.path.splitext(path)[1].lower()
+    with open(path, 'rb') as f:
+        content_bytes = f.read(server.MAX_FILE_BYTES + 1)
+    if len(content_bytes) > server.MAX_FILE_BYTES:
+        raise ValueError("File too large. Maximum size is 1MB.")
+    try:
+        content = server.extract_file_content(file_ext, content_bytes)
+    except server.HTTPException as e:
+        raise ValueError(e.detail)
+    if not content:
+        raise ValueError("Could not extract text from file.")
+    return content, 'email' if file_ext == '.eml' else None
+
+
+# --------------------------------------------------
+# Storage
+# --------------------------------------------------
+
+class StorageUnavailable(Exception):
+    """The configured storage backend could not be reached."""
+
+
+def open_storage() -> storage.Storage:
+    """The configured storage backend, with the CLI's short Mongo timeout."""
+    return storage.create_storage(config.STORAGE_BACKEND, config.MONGO_URL, config.DB_NAME,
+                                  config.SQLITE_PATH, mongo_timeout_ms=MONGO_TIMEOUT_MS)
+
+
+# --------------------------------------------------
+# Pool workers
+# --------------------------------------------------
+
+def init_worker(offline: bool, log_level: int):
+    """Load the model and connect the blocklist storage once per worker process."""
+    global _worker_loop
+    logging.getLogger().setLevel(log_level)
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    # A model loaded by a forked parent is shared as is; spawned workers load the
+    # artifacts the parent saved, and never train themselves
+    if server.ml_model is None and server.MODEL_PATH.exists() and server.VECTORIZER_PATH.exists():
+        _worker_loop.run_until_complete(server.initialize_ml_model())
+    if offline:
+        server.store = storage.SQLiteStorage(":memory:")
+        _worker_loop.run_until_complete(server.store.connect())
+        _worker_loop.run_until_complete(server.seed_database())
+    else:
+        # Never reuse a client inherited from the parent process
+        server.store = open_storage()
+        _worker_loop.run_until_complete(server.connect_database())
+    _worker_loop.run_until_complete(server.build_near_duplicate_index())
+
+
+def scan_chunk(inputs: List[Tuple[str, str, str]]) -> List[Tuple[str, dict]]:
+    """(source, compact scan document or {"error": ...}) for a chunk of (kind, source, value) inputs."""
+    sources = []
+    items = []
+    errors = {}
+    for position, (kind, source, value) in enumerate(inputs):
+        sources.append(source)
+        if kind == "file":
+            try:
+                items.append(read_file(value))
+            except (OSError, ValueError) as e:
+                errors[position] = {"error": str(e)}
+                items.append(None)
+        else:
+            items.append((value, None))
+    scanned = iter(_worker_loop.run_until_complete(
+        server.run_scan_batch([item for item in items if item is not None])
+    ))
+    return [(source, errors[position] if item is None else next(scanned))
+            for position, (source, item) in enumerate(zip(sources, items))]
+
+
+def scan_parallel(inputs: Iterable[Tuple[str, str, str]], workers: int, chunk_size: int,
+                  offline: bool, log_level: int) -> Iterator[Tuple[str, dict]]:
+    """
+    Scan inputs on a process pool and yield results in input order. At most
+    two chunks per worker are queued, so inputs are read as work completes.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(offline, log_level)) as executor:
+        pending = deque()
+        for chunk in chunked(inputs, chunk_size):
+            pending.append(executor.submit(scan_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# --------------------------------------------------
+# Output
+# --------------------------------------------------
+
+def output_row(source: str, doc: dict) -> dict:
+    if "error" in doc:
+        return {"source": source, "error": doc["error"]}
+    result = server.scan_codec.decode(doc)
+    return {
+        "source": source,
+        "scan_type": result["scan_type"],
+        "risk_score": result["risk_score"],
+        "label": result["label"],
+        "triggers": result["triggers"],
+        "explanation": result["explanation"],
+    }
+
+
+class RowWriter:
+    """Writes output rows as JSON lines or CSV (triggers joined with "; ")."""
+
+    def __init__(self, stream: TextIO, output_format: str):
+        self.stream = stream
+        self.csv = None
+        if output_format == "csv":
+            self.csv = csv.DictWriter(stream, CSV_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row: dict):
+        if self.csv is None:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            self.csv.writerow({**row, "triggers": "; ".join(row.get("triggers", []))})
+
+
+# --------------------------------------------------
+# Entry point
+# --------------------------------------------------
+
+def run(args) -> dict:
+    """Scan args.input and write the results; return item, error and Dangerous counts."""
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    logging.getLogger().setLevel(log_level)
+
+    # Connect once here before starting the pool, so an unreachable backend
+    # fails the run instead of stalling every worker
+    loop = asyncio.new_event_loop()
+    store = None
+    if args.persist or not args.offline:
+        store = open_storage()
+        try:
+            loop.run_until_complete(store.connect())
+        except Exception as e:
+            loop.close()
+            raise StorageUnavailable(f"cannot connect to the {store.name} storage backend: {e}")
+        if not args.persist:
+            loop.run_until_complete(store.close())
+            store = None
+
+    # Train or load the artifacts here, so workers never race to train
+    asyncio.run(server.initialize_ml_model())
+
+    if args.input == "-":
+        inputs = iter_lines(sys.stdin)
+    else:
+        inputs = iter_files(Path(args.input))
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    writer = RowWriter(output, args.format)
+    counts = {"items": 0, "errors": 0, "dangerous": 0}
+    try:
+        for source, doc in scan_parallel(inputs, args.workers, args.chunk_size, args.offline, log_level):
+            row = output_row(source, doc)
+            writer.write(row)
+            counts["items"] += 1
+            if "error" in row:
+                counts["errors"] += 1
+                continue
+            if row["label"] == server.LABELS[2]:
+                counts["dangerous"] += 1
+            if store is not None:
+                try:
+                    loop.run_until_complete(store.insert_scan(doc))
+                except Exception as e:
+                    logging.error(f"Failed to store scan history: {e}")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if store is not None:
+            loop.run_until_complete(store.close())
+        loop.close()
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Scan files or stdin lines offline with the ScamShield detection layers")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file or directory to scan, or - to scan stdin lines (default)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", default="", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="inputs per worker task")
+    parser.add_argument("--persist", action="store_true",
+                        help="save results to scan_history in the configured storage backend")
+    parser.add_argument("--offline", action="store_true",
+                        help="use the built-in seed blocklists instead of the storage backend")
+    parser.add_argument("--verbose", action="store_true", help="log at INFO level")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+    if args.input != "-" and not os.path.exists(args.input):
+        parser.error(f"{args.input}: no such file or directory")
+
+    started = time.perf_counter()
+    try:
+        counts = run(args)
+    except StorageUnavailable as e:
+        print(f"error: {e} (use --offline to scan with the built-in blocklists)", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+    print(f"Scanned {counts['items']} inputs in {elapsed:.1f}s "
+          f"({counts['items'] / elapsed if elapsed else 0:.0f}/s): "
+          f"{counts['dangerous']} dangerous, {counts['errors']} errors", file=sys.stderr)
+    return 1 if counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+compact.py — Compact stored representation of scan results.
+Labels and triggers are stored as small integer codes and the guidance
+and explanation text is dropped; ScanCodec rebuilds the full API shape
+from the code tables on read. Documents written before the compact
+schema (string labels) are passed through unchanged.
+"""
+
+from typing import Callable, List, Optional, Sequence
+
+UNKNOWN = "Unknown"
+
+
+class ScanCodec:
+    """
+    Encodes scan result dicts for storage and decodes them back.
+    The label and trigger tables are append-only: a stored code is the
+    position of the string in the table, so existing entries must never
+    be reordered or removed.
+    """
+
+    def __init__(self, labels: Sequence[str], guidance: Sequence[str], triggers: Sequence[str],
+                 explain: Callable[[List[str]], str]):
+        self.labels = tuple(labels)
+        self.guidance = tuple(guidance)
+        self.triggers = tuple(triggers)
+        self.explain = explain
+        self.label_codes = {label: code for code, label in enumerate(self.labels)}
+        self.trigger_codes = {trigger: code for code, trigger in enumerate(self.triggers)}
+
+    def label_code(self, label: str) -> Optional[int]:
+        return self.label_codes.get(label)
+
+    def label_name(self, value) -> Optional[str]:
+        """Map a stored label (code or legacy string) to its display string."""
+        if isinstance(value, int):
+            return self.labels[value] if 0 <= value < len(self.labels) else None
+        return value
+
+    def trigger_name(self, value) -> str:
+        """Map a stored trigger (code or string) to its display string."""
+        if isinstance(value, int):
+            return self.triggers[value] if 0 <= value < len(self.triggers) else f"{UNKNOWN} trigger {value}"
+        return value
+
+    def encode(self, result: dict) -> dict:
+        """Return the compact document for a ScanResult dict."""
+        doc = {key: value for key, value in result.items() if key not in ("guidance", "explanation")}
+        doc["label"] = self.label_codes.get(result["label"], result["label"])
+        # Triggers without a code (e.g. from a newer deployment) are kept as strings
+        doc["triggers"] = [self.trigger_codes.get(trigger, trigger) for trigger in result["triggers"]]
+        return doc
+
+    def decode(self, doc: dict) -> dict:
+        """Return the full API representation of a stored document."""
+        result = {key: value for key, value in doc.items() if key != "_id"}
+        label = result.get("label")
+        if not isinstance(label, int):
+            result.setdefault("explanation", "")
+            return result
+        triggers = [self.trigger_name(t) for t in result.get("triggers", [])]
+        # Codes outside the tables come from a newer deployment's documents
+        name = self.label_name(label)
+        result["label"] = name if name is not None else UNKNOWN
+        result["guidance"] = self.guidance[label] if name is not None else ""
+        result["triggers"] = triggers
+        result["explanation"] = self.explain(triggers)
+        return result
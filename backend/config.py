@@ -1,15 +1,19 @@
 """
 config.py — Centralized configuration for the ScamShield backend.
-Loads environment variables for MongoDB, secret keys, and version info.
+Loads environment variables for storage, secret keys, and version info.
 """
 
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load variables from .env if available
 load_dotenv()
 
 # Core settings
+# Storage backend: "mongo" (MongoDB at MONGO_URL) or "sqlite" (embedded file at SQLITE_PATH)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).parent / "scamshield.db"))
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "scamshield")
 SECRET_KEY = os.getenv("SECRET_KEY", "default-secret")
@@ -18,6 +22,8 @@ API_VERSION = os.getenv("API_VERSION", "v1")
 def get_settings():
     """Return settings as a dictionary for debugging or dependency injection."""
     return {
+        "STORAGE_BACKEND": STORAGE_BACKEND,
+        "SQLITE_PATH": SQLITE_PATH,
         "MONGO_URL": MONGO_URL,
         "DB_NAME": DB_NAME,
         "SECRET_KEY": SECRET_KEY,
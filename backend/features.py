@@ -0,0 +1,124 @@
+"""
+features.py — Single-pass normalization for the ScamShield detection layers.
+extract_features() strips, lowercases, tokenizes and parses the scanned
+content once; every layer then reads the resulting immutable ScanFeatures
+instead of re-normalizing the raw string.
+"""
+
+import math
+import re
+from typing import Optional, Tuple
+
+# Characters dropped to turn a formatted phone number into its compact form
+_PHONE_SEPARATORS = str.maketrans('', '', '-() ')
+_HOST_RE = re.compile(r'://([^/]+)')
+# Same token pattern as scikit-learn's TfidfVectorizer default
+_TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+
+class ScanFeatures:
+    """Immutable, normalized view of one scanned input."""
+
+    __slots__ = ("text", "lower", "phone_digits", "host", "tokens")
+
+    def __init__(self, text: str, lower: str, phone_digits: str, host: str, tokens: Tuple[str, ...]):
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "lower", lower)
+        object.__setattr__(self, "phone_digits", phone_digits)
+        object.__setattr__(self, "host", host)
+        object.__setattr__(self, "tokens", tokens)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScanFeatures is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ScanFeatures is immutable")
+
+    def __repr__(self):
+        return f"ScanFeatures(text={self.text[:40]!r}, host={self.host!r}, tokens={len(self.tokens)})"
+
+
+def tokenize(lower: str) -> Tuple[str, ...]:
+    """Word tokens of lowercased text, as TfidfVectorizer's default analyzer splits them."""
+    return tuple(_TOKEN_RE.findall(lower))
+
+
+def extract_features(content: str, with_tokens: bool = True) -> ScanFeatures:
+    """Normalize content once: stripped text, lowercase, compact phone, URL host, tokens."""
+    text = content.strip()
+    lower = text.lower()
+    host_match = _HOST_RE.search(lower)
+    return ScanFeatures(
+        text=text,
+        lower=lower,
+        phone_digits=text.translate(_PHONE_SEPARATORS),
+        host=host_match.group(1) if host_match else "",
+        tokens=tokenize(lower) if with_tokens else (),
+    )
+
+
+class LinearTextScorer:
+    """
+    Scores pre-tokenized text with a fitted TfidfVectorizer + binary
+    LogisticRegression without re-tokenizing: the idf and coefficient of
+    each vocabulary term are folded into one lookup table, reproducing
+    transform() + predict_proba() for the default word analyzer.
+    """
+
+    __slots__ = ("weights", "intercept")
+
+    def __init__(self, weights: dict, intercept: float):
+        self.weights = weights
+        self.intercept = intercept
+
+    @classmethod
+    def from_model(cls, vectorizer, model) -> Optional["LinearTextScorer"]:
+        """Build a scorer, or return None when the model shape is not supported."""
+        params = vectorizer.get_params()
+        supported = (
+            params.get("analyzer") == "word"
+            and params.get("lowercase")
+            and params.get("ngram_range") == (1, 1)
+            and params.get("token_pattern") == _TOKEN_RE.pattern
+            and params.get("tokenizer") is None
+            and params.get("preprocessor") is None
+            and params.get("strip_accents") is None
+            and params.get("norm") == "l2"
+            and params.get("use_idf")
+            and not params.get("binary")
+            and not params.get("sublinear_tf")
+            and getattr(model, "coef_", None) is not None
+            and model.coef_.shape[0] == 1
+            and len(getattr(model, "classes_", ())) == 2
+        )
+        if not supported:
+            return None
+        idf = vectorizer.idf_
+        coef = model.coef_[0]
+        weights = {
+            term: (float(idf[index]), float(idf[index] * coef[index]))
+            for term, index in vectorizer.vocabulary_.items()
+        }
+        return cls(weights, float(model.intercept_[0]))
+
+    def scam_probability(self, tokens: Tuple[str, ...]) -> float:
+        counts = {}
+        for token in tokens:
+            if token in self.weights:
+                counts[token] = counts.get(token, 0) + 1
+        norm_sq = 0.0
+        dot = 0.0
+        for token, count in counts.items():
+            idf, weight = self.weights[token]
+            norm_sq += (count * idf) ** 2
+            dot += count * weight
+        return self.probability(dot, norm_sq)
+
+    def probability(self, dot: float, norm_sq: float) -> float:
+        """Probability from the summed term weights and squared tf-idf norm."""
+        decision = self.intercept
+        if norm_sq > 0:
+            decision += dot / math.sqrt(norm_sq)
+        if decision < -500:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-decision))
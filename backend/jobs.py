@@ -0,0 +1,234 @@
+"""
+jobs.py — Asynchronous batch scan jobs for the ScamShield backend.
+Large submissions are split into chunks, processed by a local worker pool
+and persisted through the storage backend so unfinished jobs resume
+after a restart. Each job records the manager that owns its queued
+chunks and that manager's last heartbeat; jobs whose owner stopped
+heart-beating (a crashed worker process) are claimed by another manager.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+UNFINISHED_STATUSES = [JOB_QUEUED, JOB_RUNNING]
+
+# scan_batch(items) -> one result dict per (content, scan_type) item, in order
+ScanBatchFn = Callable[[List[Tuple[str, Optional[str]]]], Awaitable[List[dict]]]
+
+
+class JobManager:
+    """Owns the job queue and the worker pool; jobs are stored through `storage`."""
+
+    def __init__(self, storage, scan_batch: ScanBatchFn, concurrency: int = 4, chunk_size: int = 100,
+                 heartbeat_interval: float = 10.0, owner_timeout: float = 60.0):
+        self.storage = storage
+        self.scan_batch = scan_batch
+        self.concurrency = max(1, concurrency)
+        self.chunk_size = max(1, chunk_size)
+        self.heartbeat_interval = heartbeat_interval
+        # Jobs whose owner has not heart-beaten for this long are claimed (0 disables)
+        self.owner_timeout = owner_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+        self.heartbeat: Optional[asyncio.Task] = None
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+
+    async def start(self, resume: bool = True):
+        """
+        Start the worker pool and the heartbeat; with resume, first take over
+        every job left unfinished by a restart, whoever owned it.
+        """
+        if resume:
+            await self.resume_unfinished()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self.heartbeat = asyncio.create_task(self._heartbeat())
+        logging.info(f"Scan job worker pool started ({self.concurrency} workers).")
+
+    async def stop(self):
+        tasks = self.workers + ([self.heartbeat] if self.heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.heartbeat = None
+
+    async def resume_unfinished(self, stale_before: Optional[datetime] = None):
+        """
+        Claim unfinished jobs and re-enqueue every chunk without a full set
+        of stored results. With stale_before, only jobs of other owners whose
+        last heartbeat is older are claimed. A chunk whose results were only
+        partly written before a crash is scanned again; results already
+        stored for its items are kept.
+        """
+        for job in await self.storage.unfinished_jobs(UNFINISHED_STATUSES):
+            if stale_before is not None and not _owner_is_stale(job, self.owner, stale_before):
+                continue
+            now = datetime.now(timezone.utc)
+            if not await self.storage.claim_job(job["id"], self.owner, job.get("owner"), now):
+                # Another manager claimed it first
+                continue
+            stored = await self.storage.job_result_counts(job["id"])
+            pending, processed = [], 0
+            for start in range(0, job["total"], job["chunk_size"]):
+                size = min(job["chunk_size"], job["total"] - start)
+                if stored.get(start, 0) >= size:
+                    processed += size
+                else:
+                    pending.append(start)
+            await self.storage.update_job(job["id"], {"processed": processed})
+            if not pending:
+                await self._finish(job["id"])
+                continue
+            for start in pending:
+                self.queue.put_nowait((job["id"], start, job["chunk_size"]))
+            logging.info(f"Resumed scan job {job['id']} from {job.get('owner')} ({len(pending)} chunks pending).")
+
+    async def _heartbeat(self):
+        """Keep this manager's jobs alive and claim the jobs of owners that stopped."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                now = datetime.now(timezone.utc)
+                await self.storage.touch_jobs(self.owner, UNFINISHED_STATUSES, now)
+                if self.owner_timeout > 0:
+                    await self.resume_unfinished(stale_before=now - timedelta(seconds=self.owner_timeout))
+            except Exception as e:
+                logging.error(f"Scan job heartbeat failed: {e}")
+
+    # --------------------------------------------------
+    # Submission and queries
+    # --------------------------------------------------
+
+    async def submit(self, items: List[Tuple[str, Optional[str]]]) -> dict:
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "status": JOB_QUEUED,
+            "total": len(items),
+            "processed": 0,
+            "failed": 0,
+            "chunk_size": self.chunk_size,
+            "scan_time_ms": 0.0,
+            "created_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None,
+            "owner": self.owner,
+            "heartbeat_at": datetime.now(timezone.utc),
+        }
+        await self.storage.insert_job(job, items)
+        for start in range(0, len(items), self.chunk_size):
+            self.queue.put_nowait((job_id, start, self.chunk_size))
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        job = await self.storage.get_job(job_id)
+        if job:
+            job.update(job_throughput(job))
+        return job
+
+    async def get_results(self, job_id: str, skip: int, limit: int) -> List[dict]:
+        return await self.storage.job_results(job_id, skip, limit)
+
+    # --------------------------------------------------
+    # Worker pool
+    # --------------------------------------------------
+
+    async def _worker(self):
+        while True:
+            job_id, start, size = await self.queue.get()
+            try:
+                await self._process_chunk(job_id, start, size)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Scan job {job_id} chunk {start} failed: {e}")
+                try:
+                    await self._fail(job_id, str(e))
+                except Exception as e:
+                    logging.error(f"Scan job {job_id} could not be marked failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _process_chunk(self, job_id: str, start: int, size: int):
+        job = await self.storage.get_job(job_id)
+        if not job or job["status"] == JOB_FAILED:
+            # Another chunk failed; the job's remaining chunks are dropped
+            return
+        if job.get("owner") not in (None, self.owner):
+            # Claimed by another manager after this one missed its heartbeats
+            return
+        await self.storage.update_job(
+            job_id, {"status": JOB_RUNNING, "started_at": datetime.now(timezone.utc)}, expected_status=JOB_QUEUED
+        )
+        items = await self.storage.job_items(job_id, start, start + size)
+        started = time.perf_counter()
+        results = await self.scan_batch([(item["content"], item.get("scan_type")) for item in items])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        failed = sum(1 for result in results if "error" in result)
+        await self.storage.insert_job_results(
+            job_id, start, [(item["index"], result) for item, result in zip(items, results)]
+        )
+        await self.storage.update_job(
+            job_id, inc_fields={"processed": len(items), "failed": failed, "scan_time_ms": elapsed_ms}
+        )
+        await self._finish(job_id)
+
+    async def _finish(self, job_id: str):
+        job = await self.storage.get_job(job_id)
+        if job and job["processed"] >= job["total"] and job["status"] != JOB_FAILED:
+            await self.storage.update_job(
+                job_id, {"status": JOB_COMPLETED, "finished_at": datetime.now(timezone.utc)}
+            )
+            await self.storage.delete_job_items(job_id)
+
+    async def _fail(self, job_id: str, error: str):
+        await self.storage.update_job(
+            job_id, {"status": JOB_FAILED, "error": error, "finished_at": datetime.now(timezone.utc)}
+        )
+        await self.storage.delete_job_items(job_id)
+
+
+def _owner_is_stale(job: dict, owner: str, stale_before: datetime) -> bool:
+    if job.get("owner") == owner:
+        return False
+    heartbeat = job.get("heartbeat_at")
+    if heartbeat is None:
+        return True
+    if heartbeat.tzinfo is None:
+        heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+    return heartbeat < stale_before
+
+
+def job_throughput(job: dict) -> dict:
+    """Derive per-job throughput figures from the stored counters."""
+    started = job.get("started_at")
+    if not started:
+        return {"elapsed_seconds": 0.0, "items_per_second": 0.0, "avg_scan_ms": 0.0}
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    finished = job.get("finished_at") or datetime.now(timezone.utc)
+    if finished.tzinfo is None:
+        finished = finished.replace(tzinfo=timezone.utc)
+    elapsed = max((finished - started).total_seconds(), 1e-6)
+    processed = job.get("processed", 0)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "items_per_second": round(processed / elapsed, 2),
+        "avg_scan_ms": round(job.get("scan_time_ms", 0.0) / processed, 3) if processed else 0.0,
+    }
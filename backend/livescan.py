@@ -0,0 +1,232 @@
+"""
+livescan.py — Incremental state for live (as-you-type) scanning.
+A LiveScanSession holds the text being edited in the scanner and keeps
+the results of the cheap layers up to date edit by edit: the span of a
+rule category's match is kept and shifted while edits stay clear of it,
+unmatched categories are only searched around the edited region, and
+token counts for the linear text scorer are adjusted by the words an edit
+touches. The blacklist and Azure layers are left to the final submit.
+"""
+
+import functools
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Rule patterns with unbounded repeats (\d+) are treated as matching at
+# most this many characters when searching around an edit; the final
+# submit always runs the full rule layer.
+MAX_MATCH_WIDTH = 1024
+
+# Category state: a (start, end) span of a known match, NO_MATCH, or DIRTY
+# when an edit touched the last known match.
+NO_MATCH = None
+DIRTY = ()
+
+
+class EditError(ValueError):
+    """Raised for an edit that does not apply to the current text."""
+
+
+@functools.lru_cache(maxsize=None)
+def match_width(pattern: re.Pattern) -> int:
+    """Longest possible match of a compiled pattern, capped at MAX_MATCH_WIDTH."""
+    try:
+        width = sre_parse.parse(pattern.pattern, pattern.flags).getwidth()[1]
+    except Exception:
+        return MAX_MATCH_WIDTH
+    return min(width, MAX_MATCH_WIDTH)
+
+
+def common_affixes(old: str, new: str) -> Tuple[int, int]:
+    """
+    Length of the common prefix and common suffix of two strings, found by
+    bisecting on slice comparisons so the work stays in C. The suffix
+    never overlaps the prefix.
+    """
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return prefix, lo
+
+
+def _is_word(ch: str) -> bool:
+    # Same definition as \w in a str pattern
+    return ch.isalnum() or ch == '_'
+
+
+class LiveScanSession:
+    """
+    Text under edit plus incremental rule and token state.
+    patterns are (key, compiled pattern, trigger) triples matched against
+    the lowercased text; tokenize splits lowercased text into the
+    scorer's word tokens.
+    """
+
+    def __init__(self, patterns: Sequence[tuple], tokenize: Callable[[str], tuple], max_chars: int):
+        self.patterns = list(patterns)
+        self.tokenize = tokenize
+        self.widths = [match_width(pattern) for _, pattern, _ in self.patterns]
+        self.max_chars = max_chars
+        self.text = ""
+        self.lower = ""
+        self.version = 0
+        self.states = [NO_MATCH] * len(self.patterns)
+        # Region edited since the last evaluation, in current coordinates
+        self.dirty: Optional[Tuple[int, int]] = None
+        self.rescan = False
+        # Token counts of the lowercased text, and the scorer sums kept in step
+        self.counts = {}
+        self.scorer = None
+        self.dot = 0.0
+        self.norm_sq = 0.0
+        self.scored_terms = 0
+
+    # --------------------------------------------------
+    # Edits
+    # --------------------------------------------------
+
+    def replace(self, text: str):
+        """Set the whole text; only the changed middle is treated as edited."""
+        prefix, suffix = common_affixes(self.text, text)
+        self.edit(prefix, len(self.text) - suffix, text[prefix:len(text) - suffix])
+
+    def edit(self, start: int, end: int, inserted: str):
+        """Replace text[start:end] with `inserted`."""
+        if not 0 <= start <= end <= len(self.text):
+            raise EditError("Edit range is outside the current text")
+        if len(self.text) - (end - start) + len(inserted) > self.max_chars:
+            raise EditError(f"Live scans are limited to {self.max_chars} characters")
+        if start == end and not inserted:
+            return
+        old = self.text
+        new = old[:start] + inserted + old[end:]
+        self._update_tokens(old, new, start, end, start + len(inserted))
+        self._update_rules(start, end, len(inserted))
+        self.text = new
+        self.version += 1
+
+    def _update_tokens(self, old: str, new: str, start: int, old_end: int, new_end: int):
+        # Widen the edit to whole words on both sides; outside that range the
+        # tokens of the old and new text are identical.
+        left = start
+        while left > 0 and _is_word(old[left - 1]):
+            left -= 1
+        right = old_end
+        while right < len(old) and _is_word(old[right]):
+            right += 1
+        for token in self.tokenize(old[left:right].lower()):
+            self._count(token, -1)
+        for token in self.tokenize(new[left:right - old_end + new_end].lower()):
+            self._count(token, 1)
+
+    def _count(self, token: str, delta: int):
+        count = self.counts.get(token, 0)
+        if count + delta:
+            self.counts[token] = count + delta
+        else:
+            del self.counts[token]
+        if self.scorer is not None:
+            entry = self.scorer.weights.get(token)
+            if entry is not None:
+                self._add_term(entry, count, count + delta)
+
+    def _add_term(self, entry: tuple, before: int, after: int):
+        idf, weight = entry
+        self.dot += (after - before) * weight
+        self.norm_sq += (after * after - before * before) * idf * idf
+        self.scored_terms += (after > 0) - (before > 0)
+        if not self.scored_terms:
+            # Reset so floating-point drift cannot build up across edits
+            self.dot = self.norm_sq = 0.0
+
+    def _update_rules(self, start: int, end: int, inserted: int):
+        delta = inserted - (end - start)
+        for index, state in enumerate(self.states):
+            if not state:
+                continue
+            match_start, match_end = state
+            # A match keeps matching while the edit does not touch it or the
+            # characters on either side of it.
+            if match_end < start:
+                continue
+            if match_start > end:
+                self.states[index] = (match_start + delta, match_end + delta)
+            else:
+                self.states[index] = DIRTY
+        if self.dirty is None:
+            self.dirty = (start, start + inserted)
+        else:
+            lo, hi = self.dirty
+            if hi > end:
+                hi += delta
+            elif hi > start:
+                hi = start + inserted
+            self.dirty = (min(lo, start), max(hi, start + inserted))
+
+    # --------------------------------------------------
+    # Evaluation
+    # --------------------------------------------------
+
+    def matches(self) -> List[tuple]:
+        """(key, trigger) for every pattern that matches the current text, in pattern order."""
+        if self.dirty is not None:
+            self._refresh_rules()
+        return [(key, trigger) for (key, _, trigger), state in zip(self.patterns, self.states) if state]
+
+    def _refresh_rules(self):
+        lower = self.text.lower()
+        # Offsets are only shared with the text while lowercasing keeps lengths
+        full = self.rescan or len(lower) != len(self.text)
+        self.rescan = len(lower) != len(self.text)
+        self.lower = lower
+        lo, hi = self.dirty or (0, len(lower))
+        self.dirty = None
+        for index, (_, pattern, _) in enumerate(self.patterns):
+            state = self.states[index]
+            if state and not full:
+                continue
+            if state is NO_MATCH and not full:
+                # Any new match must overlap the edited region
+                width = self.widths[index]
+                match = self._search_window(pattern, max(0, lo - width - 1), min(len(lower), hi + width + 1))
+            else:
+                match = pattern.search(lower)
+            self.states[index] = match.span() if match else NO_MATCH
+
+    def _search_window(self, pattern: re.Pattern, pos: int, endpos: int):
+        match = pattern.search(self.lower, pos, endpos)
+        if match and match.end() == endpos < len(self.lower):
+            # endpos makes the window look like the end of the text; confirm
+            # a match that reaches it against the real text.
+            match = pattern.match(self.lower, match.start()) or pattern.search(self.lower, match.start() + 1)
+        return match
+
+    def scam_probability(self, scorer) -> float:
+        """Probability from a LinearTextScorer, using the incrementally kept sums."""
+        if scorer is not self.scorer:
+            self.scorer = scorer
+            self.dot = self.norm_sq = 0.0
+            self.scored_terms = 0
+            for token, count in self.counts.items():
+                entry = scorer.weights.get(token)
+                if entry is not None:
+                    self._add_term(entry, 0, count)
+        return scorer.probability(self.dot, self.norm_sq)
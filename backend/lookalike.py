@@ -0,0 +1,158 @@
+"""
+lookalike.py — Homoglyph and typosquat detection for scanned URL hosts.
+Protected brand domains are reduced to a confusable "skeleton" once at
+startup and indexed together with every single-character deletion of the
+skeleton, so a host is matched against all brands with a handful of dict
+lookups (symmetric deletion) instead of a comparison per brand.
+"""
+
+import codecs
+import unicodedata
+from typing import Iterable, Optional
+
+# Characters that render like a Latin letter: digits, Cyrillic and Greek
+# lookalikes, and separators that are dropped from the skeleton.
+CONFUSABLES = {
+    '0': 'o', '1': 'l', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b', '9': 'g',
+    '|': 'l', '!': 'i', '$': 's', '@': 'a', '-': '', '_': '',
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'і': 'i', 'ї': 'i', 'ј': 'j', 'к': 'k',
+    'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x',
+    'ѕ': 's', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w', 'ɡ': 'g',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p',
+    'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w',
+    # Latin letters that read as another letter
+    'ı': 'i', 'ł': 'l', 'ø': 'o', 'đ': 'd', 'ħ': 'h',
+}
+# Letter pairs that read as a single letter
+CONFUSABLE_SEQUENCES = (('rn', 'm'), ('vv', 'w'))
+# Latin letters easily misread as each other; a one-letter substitution only
+# counts as a lookalike when it swaps one of these pairs (goggle.com is a
+# different word, not a disguised google.com)
+CONFUSABLE_PAIRS = {
+    frozenset(pair) for pair in
+    ('il', 'ij', 'lt', 'mn', 'nh', 'uv', 'vy', 'ce', 'gq', 'bd', 'pq')
+}
+
+# Second-level labels of common two-part public suffixes (example.co.uk)
+SECOND_LEVEL_SUFFIXES = {'co', 'com', 'org', 'net', 'ac', 'gov', 'edu'}
+
+# Brands shorter than this only match on an exact skeleton, not at distance 1
+MIN_FUZZY_LENGTH = 6
+
+# DNS limits; longer "hosts" are not domains and are not compared
+MAX_HOST_LENGTH = 253
+MAX_LABEL_LENGTH = 63
+
+
+def decode_label(label: str) -> str:
+    """Decode an IDNA (xn--) label to Unicode; other labels are returned as-is."""
+    if label.startswith('xn--'):
+        try:
+            return codecs.decode(label[4:].encode('ascii'), 'punycode')
+        except (UnicodeError, ValueError):
+            return label
+    return label
+
+
+def skeleton(label: str) -> str:
+    """Map a domain label to the Latin string it visually resembles."""
+    text = unicodedata.normalize('NFKD', decode_label(label).lower())
+    chars = []
+    for ch in text:
+        if unicodedata.combining(ch):
+            continue
+        chars.append(CONFUSABLES.get(ch, ch))
+    result = ''.join(chars)
+    for sequence, replacement in CONFUSABLE_SEQUENCES:
+        result = result.replace(sequence, replacement)
+    return result
+
+
+def deletions(text: str) -> set:
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def split_host(host: str) -> tuple:
+    """Return (registrable label, registrable domain) of a host, ignoring port and userinfo."""
+    host = host.rsplit('@', 1)[-1].split(':', 1)[0].strip('.')
+    labels = host.split('.')
+    if len(labels) < 2:
+        return labels[0], host
+    index = len(labels) - 2
+    if index > 0 and len(labels[-1]) == 2 and labels[index] in SECOND_LEVEL_SUFFIXES:
+        index -= 1
+    return labels[index], '.'.join(labels[index:])
+
+
+def typosquat_edit(brand: str, candidate: str) -> bool:
+    """True when candidate differs from brand by one edit a reader skims past.
+
+    That is a doubled or dropped repeated letter (gooogle, gogle), a swap of
+    adjacent letters (amazno) or a confusable substitution (twltter). Other
+    one-letter changes give real, unrelated names (twister, amazin, netflux).
+    """
+    if brand == candidate or abs(len(brand) - len(candidate)) > 1:
+        return False
+    if len(brand) == len(candidate):
+        diffs = [i for i in range(len(brand)) if brand[i] != candidate[i]]
+        if len(diffs) == 1:
+            i = diffs[0]
+            return frozenset((brand[i], candidate[i])) in CONFUSABLE_PAIRS
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and brand[diffs[0]] == candidate[diffs[1]] and brand[diffs[1]] == candidate[diffs[0]])
+    shorter, longer = sorted((brand, candidate), key=len)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    if shorter[i:] != longer[i + 1:]:
+        return False
+    # The extra letter must repeat a neighbour: an inserted double or a dropped one
+    extra = longer[i]
+    return (i > 0 and longer[i - 1] == extra) or (i + 1 < len(longer) and longer[i + 1] == extra)
+
+
+class LookalikeIndex:
+    """Skeleton index of protected domains with hashed single-deletion variants."""
+
+    def __init__(self, domains: Iterable[str]):
+        self.domains = set()
+        # skeleton or deletion variant -> {(brand skeleton, brand domain, brand label)}
+        self.index = {}
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str):
+        domain = domain.lower()
+        label, registrable = split_host(domain)
+        brand = skeleton(label)
+        self.domains.add(registrable)
+        entry = (brand, registrable, label)
+        self.index.setdefault(brand, set()).add(entry)
+        if len(brand) >= MIN_FUZZY_LENGTH:
+            for variant in deletions(brand):
+                self.index.setdefault(variant, set()).add(entry)
+
+    def match(self, host: str) -> Optional[str]:
+        """Return the protected domain a host imitates, or None."""
+        if not host or len(host) > MAX_HOST_LENGTH:
+            return None
+        label, registrable = split_host(host.lower())
+        if registrable in self.domains or len(label) > MAX_LABEL_LENGTH:
+            return None
+        candidate = skeleton(label)
+        if not candidate:
+            return None
+        for brand, domain, brand_label in self.index.get(candidate, ()):
+            # The brand's own name under another TLD is not a lookalike
+            if brand == candidate and decode_label(label) != brand_label:
+                return domain
+        if len(candidate) < MIN_FUZZY_LENGTH - 1:
+            return None
+        variants = {candidate} | deletions(candidate)
+        for variant in variants:
+            for brand, domain, _ in self.index.get(variant, ()):
+                if len(brand) >= MIN_FUZZY_LENGTH and typosquat_edit(brand, candidate):
+                    return domain
+        return None
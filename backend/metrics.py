@@ -0,0 +1,142 @@
+"""
+metrics.py — Prometheus instrumentation for the ScamShield backend.
+Defines the latency histograms, counters and gauges exposed on /metrics.
+Label children are resolved once at import so the hot path only pays
+for a perf_counter() pair and a histogram observe.
+"""
+
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Sub-millisecond buckets for the in-process layers, up to 10s for Azure/Mongo
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LAYERS = ("rules", "blacklist", "ml", "azure")
+
+LAYER_LATENCY = Histogram(
+    "scamshield_layer_latency_seconds",
+    "Time spent in each detection layer.",
+    ["layer"],
+    buckets=LATENCY_BUCKETS,
+)
+SCAN_LATENCY = Histogram(
+    "scamshield_scan_latency_seconds",
+    "End-to-end run_scan latency, including history persistence.",
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_LATENCY = Histogram(
+    "scamshield_mongo_operation_seconds",
+    "Latency of storage backend operations issued by the API.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+SCANS_TOTAL = Counter(
+    "scamshield_scans_total",
+    "Completed scans by result label and scan type.",
+    ["label", "scan_type"],
+)
+ERRORS_TOTAL = Counter(
+    "scamshield_errors_total",
+    "Errors by component.",
+    ["component"],
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "scamshield_job_queue_depth",
+    "Batch scan chunks waiting for a worker.",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "scamshield_admission_in_flight",
+    "Scan requests currently admitted.",
+)
+ADMISSION_SATURATION = Gauge(
+    "scamshield_admission_saturation_ratio",
+    "In-flight scans divided by the configured in-flight limit.",
+)
+ADMISSION_REJECTED = Counter(
+    "scamshield_admission_rejected_total",
+    "Requests rejected by reason: 429 for rate_limited and server_busy, 503 for storage_saturated.",
+    ["reason"],
+)
+RESOURCE_IN_USE = Gauge(
+    "scamshield_resource_slots_in_use",
+    "Occupied concurrency slots per bounded resource (azure, mongo).",
+    ["resource"],
+)
+RESOURCE_WAITING = Gauge(
+    "scamshield_resource_waiters",
+    "Coroutines waiting for a slot per bounded resource.",
+    ["resource"],
+)
+RESOURCE_TIMEOUTS = Counter(
+    "scamshield_resource_timeouts_total",
+    "Operations skipped because no slot freed up in time.",
+    ["resource"],
+)
+RESOURCE_CIRCUIT_OPEN = Gauge(
+    "scamshield_resource_circuit_open",
+    "1 while the circuit breaker of a resource (azure) is open or half-open.",
+    ["resource"],
+)
+SENTIMENT_SCORES = Counter(
+    "scamshield_sentiment_scores_total",
+    "Layer 4 tone scores by the backend that produced them (azure, lexicon).",
+    ["backend"],
+)
+RULE_INPUT_TRUNCATED = Counter(
+    "scamshield_rule_input_truncated_total",
+    "Scans longer than RULE_MATCH_MAX_CHARS; rules matched only the leading characters.",
+)
+NEAR_DUPLICATE_ENTRIES = Gauge(
+    "scamshield_near_duplicate_entries",
+    "Known scam texts held by the near-duplicate (MinHash/LSH) index.",
+)
+LIVE_SCAN_SESSIONS = Gauge(
+    "scamshield_live_scan_sessions",
+    "Open live-scan WebSocket sessions.",
+)
+LIVE_SCAN_UPDATE_LATENCY = Histogram(
+    "scamshield_live_scan_update_seconds",
+    "Time to re-evaluate a live-scan session after an edit (cheap layers only).",
+    buckets=LATENCY_BUCKETS,
+)
+
+_layer_children = {layer: LAYER_LATENCY.labels(layer) for layer in LAYERS}
+
+
+@contextmanager
+def time_layer(layer: str):
+    """Observe the wall time of a detection layer."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _layer_children[layer].observe(time.perf_counter() - start)
+
+
+@contextmanager
+def time_mongo(operation: str):
+    """Observe the wall time of a MongoDB operation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        MONGO_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+def record_scan(label: str, scan_type: str):
+    """Count a finished scan; the emoji prefix is dropped from the label."""
+    SCANS_TOTAL.labels(label.split()[-1].lower(), scan_type).inc()
+
+
+def record_error(component: str):
+    ERRORS_TOTAL.labels(component).inc()
+
+
+def render():
+    """Return (body, content_type) for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,149 @@
+"""
+neardup.py — MinHash/LSH near-duplicate index of known scam messages.
+Texts are normalized (case, whitespace, punctuation and digit runs
+removed) and cut into character shingles, so changed amounts, extra
+spaces or a swapped word still share most shingles with the original.
+Each text is reduced to a MinHash signature and bucketed by bands of the
+signature; a lookup only compares against the texts sharing a bucket, so
+its cost does not grow with the size of the index.
+numpy is imported on first use to keep server imports light.
+"""
+
+import re
+import threading
+from typing import Iterable, Optional, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 5
+# Texts shorter than this once normalized are left to the exact blacklist
+MIN_CHARS = 20
+# Longer texts are shingled up to this many normalized characters
+MAX_CHARS = 4000
+# Candidates compared per lookup, however many texts share a bucket
+MAX_CANDIDATES = 64
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_DIGITS_RE = re.compile(r'\d+')
+_SEPARATORS_RE = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase, collapse every number to 0 and drop whitespace and punctuation."""
+    return _SEPARATORS_RE.sub('', _DIGITS_RE.sub('0', text.lower()))[:MAX_CHARS]
+
+
+def shingle_hashes(normalized: str, size: int = SHINGLE_SIZE):
+    """Unique 32-bit hashes of the character shingles of a normalized text."""
+    import numpy as np
+
+    codes = np.frombuffer(normalized.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * np.uint64(1000003) + codes[offset:offset + count]
+    # splitmix64 finalizer so nearby shingles spread over the whole range
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= np.uint64(0xbf58476d1ce4e5b9)
+    hashes ^= hashes >> np.uint64(27)
+    return np.unique(hashes & np.uint64(MAX_HASH))
+
+
+class NearDuplicateIndex:
+    """
+    In-memory LSH table of MinHash signatures. add() and match() are safe
+    to call from worker threads while the event loop keeps querying.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = 1):
+        import numpy as np
+
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.np = np
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.tables = [{} for _ in range(bands)]
+        self.signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self.sources = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sources)
+
+    def signature(self, text: str):
+        """MinHash signature of a text, or None when it is too short to compare."""
+        normalized = normalize(text)
+        if len(normalized) < MIN_CHARS:
+            return None
+        np = self.np
+        hashes = shingle_hashes(normalized)
+        # (a * h + b) mod p over every shingle and permutation, minimum per permutation
+        permuted = (hashes[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+        return (permuted & np.uint64(MAX_HASH)).min(axis=0).astype(np.uint32)
+
+    def _keys(self, signature) -> list:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _candidates(self, keys: list) -> list:
+        candidates = []
+        for table, key in zip(self.tables, keys):
+            bucket = table.get(key)
+            if bucket:
+                candidates.extend(bucket[:MAX_CANDIDATES - len(candidates)])
+                if len(candidates) >= MAX_CANDIDATES:
+                    break
+        return candidates
+
+    def _best(self, signature, keys: list) -> Tuple[float, Optional[int]]:
+        candidates = self._candidates(keys)
+        if not candidates:
+            return 0.0, None
+        ids = self.np.unique(self.np.array(candidates))
+        # Share of equal MinHash values estimates the Jaccard similarity
+        similarity = (self.signatures[ids] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return float(similarity[best]), int(ids[best])
+
+    def add(self, text: str, source: str = "") -> bool:
+        """Index a text; near-identical texts already indexed are skipped."""
+        signature = self.signature(text)
+        if signature is None:
+            return False
+        keys = self._keys(signature)
+        with self.lock:
+            if self._best(signature, keys)[0] >= max(self.threshold, 0.9):
+                return False
+            entry = len(self.sources)
+            if entry == len(self.signatures):
+                grown = self.np.empty((entry * 2, self.num_perm), dtype=self.np.uint32)
+                grown[:entry] = self.signatures
+                self.signatures = grown
+            self.signatures[entry] = signature
+            self.sources.append(source)
+            for table, key in zip(self.tables, keys):
+                table.setdefault(key, []).append(entry)
+        return True
+
+    def add_many(self, texts: Iterable[str], source: str = "") -> int:
+        return sum(self.add(text, source) for text in texts)
+
+    def match(self, text: str) -> Optional[Tuple[float, str]]:
+        """(estimated similarity, source) of the closest indexed text at or above the threshold."""
+        signature = self.signature(text)
+        if signature is None or not self.sources:
+            return None
+        keys = self._keys(signature)
+        # add() may grow the tables and swap in a larger signature array from another thread
+        with self.lock:
+            similarity, entry = self._best(signature, keys)
+            if entry is None or similarity < self.threshold:
+                return None
+            return similarity, self.sources[entry]
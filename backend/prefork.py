@@ -0,0 +1,179 @@
+"""
+prefork.py — Pre-fork launcher for multi-worker deployments.
+The master process loads (or, under a file lock, trains) the model
+artifacts once, builds the derived read-only scorers, freezes them out of
+the garbage collector's reach and then forks the uvicorn workers. The
+workers inherit that state copy-on-write instead of each unpickling its
+own copy, and a worker that dies is re-forked from the loaded master
+without repeating the startup cost.
+
+Deployment-wide background work (the retention archival task, resuming
+unfinished scan jobs) runs only in the worker of slot 0. Jobs are only
+resumed wholesale by its first start: a re-forked worker would re-queue
+chunks the other workers are still processing. The chunks a crashed
+worker had queued are instead claimed by a surviving worker once the
+job's heartbeat goes stale (see jobs.JobManager).
+
+Usage (from the repository root):
+    python -m backend.prefork --workers 4 --host 0.0.0.0 --port 8001
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+try:
+    from . import server
+except ImportError:  # launched from inside backend/ (python prefork.py)
+    import server
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+# A worker that exits sooner than this after being forked is re-forked only
+# after the same delay, so a crashing worker cannot spin the master
+MIN_WORKER_LIFETIME = 1.0
+
+
+def preload():
+    """Load every read-only artifact the workers share, then freeze it."""
+    asyncio.run(server.initialize_ml_model())
+    if server.ml_model is not None:
+        server.get_text_scorer()
+    if server.SENTIMENT_BACKEND in ("local", "auto"):
+        server.get_lexicon_sentiment()
+    # Objects that exist now are moved to the permanent generation: collections
+    # in the workers never write to their headers, so their pages stay shared.
+    gc.collect()
+    gc.freeze()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, args, slot: int, first_start: bool):
+    """Body of a forked worker: serve the app on the shared listening socket."""
+    gc.enable()
+    server.RETENTION_TASK_ENABLED = server.RETENTION_TASK_ENABLED and slot == 0
+    server.RESUME_SCAN_JOBS = server.RESUME_SCAN_JOBS and slot == 0 and first_start
+    config = uvicorn.Config(server.app, log_level=args.log_level, access_log=args.access_log,
+                            timeout_keep_alive=args.timeout_keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    """
+    Forks the workers and keeps their number at `workers` until stopped.
+    Each worker has a slot; a re-forked worker takes over the slot of the
+    one that exited.
+    """
+
+    def __init__(self, sock: socket.socket, args):
+        self.sock = sock
+        self.args = args
+        self.children = {}  # pid -> (slot, fork time)
+        self.stopping = False
+        self.failed = False
+
+    def spawn(self, slot: int, first_start: bool = False):
+        # Stop signals are held across fork() so a child can never run the
+        # master's handler; the child resets them before unblocking
+        signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            for signum in STOP_SIGNALS:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+            code = 0
+            try:
+                run_worker(self.sock, self.args, slot, first_start)
+            except BaseException as e:
+                logging.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                # Never return into the master's loop or run its exit handlers
+                os._exit(code)
+        self.children[pid] = (slot, time.monotonic())
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+        logging.info(f"Started worker {pid} (slot {slot})")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        """Serve until stopped; 1 if a worker crashed or did not shut down cleanly, else 0."""
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self.stop)
+        for slot in range(self.args.workers):
+            self.spawn(slot, first_start=True)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            child = self.children.pop(pid, None)
+            if child is None:
+                continue
+            slot, started = child
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                if code != 0:
+                    self.failed = True
+                    logging.error(f"Worker {pid} exited with status {code} during shutdown")
+                continue
+            # Workers only exit on their own when something went wrong
+            self.failed = True
+            logging.warning(f"Worker {pid} exited with status {code}, restarting")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self.spawn(slot)
+        return 1 if self.failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve ScamShield with pre-forked workers sharing the loaded model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--timeout-keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not hasattr(os, "fork"):
+        parser.error("pre-fork mode needs os.fork(); use uvicorn --workers on this platform")
+
+    # Keep the collector from leaving freed holes in pages the workers will share
+    gc.disable()
+    started = time.perf_counter()
+    preload()
+    sock = bind_socket(args.host, args.port, args.backlog)
+    logging.info(f"Artifacts loaded in {time.perf_counter() - started:.2f}s; "
+                 f"forking {args.workers} workers on {args.host}:{args.port}")
+    return Master(sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
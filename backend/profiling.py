@@ -0,0 +1,171 @@
+"""
+profiling.py — Per-request timing breakdown and sampling profiler.
+ScanTimings collects stage durations for a single debug request and is
+rendered as a Server-Timing header. SamplingProfiler samples the event
+loop thread while profiled requests are in flight and produces a
+flamegraph-compatible collapsed-stack file.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+
+class ScanTimings:
+    """Ordered stage -> milliseconds breakdown for one request."""
+
+    __slots__ = ("stages", "_started")
+
+    def __init__(self):
+        self.stages = {}
+        self._started = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def server_timing(self) -> str:
+        stages = dict(self.stages)
+        stages["total"] = (time.perf_counter() - self._started) * 1000
+        return ", ".join(f"{name};dur={ms:.3f}" for name, ms in stages.items())
+
+
+@contextmanager
+def stage(timings: Optional[ScanTimings], name: str):
+    """Record a stage into timings; a no-op when timing is not requested."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack at a fixed interval while tracked requests
+    are running, until the requested number of requests has finished.
+    Only one session can be active at a time. All session state is read
+    and written under `lock`; the sampler thread is joined before a new
+    session starts and before a finished profile is rendered.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.thread: Optional[threading.Thread] = None
+        self.target_ident: Optional[int] = None
+        self.interval = 0.005
+        self.requests_wanted = 0
+        self.requests_done = 0
+        self.in_flight = 0
+        self.samples = 0
+        self.status = "idle"
+        # Incremented per session, so a request tracked by an earlier session
+        # never updates the counters of a later one
+        self.session = 0
+        self.stop_event = threading.Event()
+
+    def start(self, requests: int, interval_ms: float, target_ident: Optional[int] = None):
+        """Start a session sampling thread `target_ident` (default: the calling thread)."""
+        with self.lock:
+            if self.status == "running":
+                raise RuntimeError("A profiling session is already running")
+        # The previous sampler has been told to stop; wait for it before reusing stop_event
+        self._join()
+        with self.lock:
+            if self.status == "running":
+                raise RuntimeError("A profiling session is already running")
+            self.stacks = Counter()
+            self.target_ident = target_ident if target_ident is not None else threading.get_ident()
+            self.interval = interval_ms / 1000
+            self.requests_wanted = requests
+            self.requests_done = 0
+            self.in_flight = 0
+            self.samples = 0
+            self.status = "running"
+            self.session += 1
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="scamshield-profiler", daemon=True)
+            self.thread.start()
+
+    def cancel(self):
+        with self.lock:
+            self.stop_event.set()
+            if self.status == "running":
+                self.status = "cancelled"
+        self._join()
+
+    def _join(self):
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @contextmanager
+    def track(self):
+        """Mark a request as profiled while the session is running."""
+        with self.lock:
+            session = self.session if self.status == "running" else None
+            if session is not None:
+                self.in_flight += 1
+        if session is None:
+            yield
+            return
+        try:
+            yield
+        finally:
+            with self.lock:
+                if self.session == session and self.status == "running":
+                    self.in_flight -= 1
+                    self.requests_done += 1
+                    if self.requests_done >= self.requests_wanted:
+                        self.stop_event.set()
+                        self.status = "completed"
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "status": self.status,
+                "requests_wanted": self.requests_wanted,
+                "requests_done": self.requests_done,
+                "samples": self.samples,
+                "interval_ms": self.interval * 1000,
+            }
+
+    def collapsed(self) -> str:
+        """Render samples in Brendan Gregg's collapsed-stack format."""
+        with self.lock:
+            finished = self.status != "running"
+        if finished:
+            self._join()
+        with self.lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                sampling = self.in_flight > 0
+            if not sampling:
+                continue
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            with self.lock:
+                # Nothing is recorded once the session has ended
+                if self.stop_event.is_set():
+                    break
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,211 @@
+"""
+retention.py — Hot-window retention and archival for scan_history.
+Only the most recent scans are kept in the database. Before documents
+reach the end of the window a background task streams them, oldest
+first, into per-day jsonl.gz files on local disk, and only then deletes
+them; query_archive() searches those files for investigations.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+FILE_PREFIX = "scan_history-"
+
+
+def _utc(value: datetime) -> datetime:
+    """MongoDB returns naive UTC datetimes; make them timezone-aware."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _stamp(value: Optional[datetime]) -> str:
+    return _utc(value).strftime("%Y%m%dT%H%M%S") if value else "start"
+
+
+def _archive_day(path: Path) -> Optional[date]:
+    """Parse the day from scan_history-YYYY-MM-DD-<start>.jsonl.gz."""
+    try:
+        return date.fromisoformat(path.name[len(FILE_PREFIX):len(FILE_PREFIX) + 10])
+    except ValueError:
+        return None
+
+
+class ArchiveWriter:
+    """
+    Writes one run's documents to per-day gzip files. Files are written
+    under a temporary name and only renamed into place by commit(), so an
+    interrupted run leaves nothing half-written behind.
+    """
+
+    def __init__(self, archive_dir: Path, run_stamp: str):
+        self.archive_dir = archive_dir
+        self.run_stamp = run_stamp
+        self.current_day = None
+        self.current = None
+        self.pending = []  # (tmp path, final path)
+        self.written = 0
+
+    def write(self, docs: List[dict]):
+        for doc in docs:
+            timestamp = _utc(doc["timestamp"])
+            day = timestamp.date().isoformat()
+            if day != self.current_day:
+                self._open(day)
+            doc["timestamp"] = timestamp.isoformat()
+            self.current.write(json.dumps(doc, default=str).encode("utf-8") + b"\n")
+            self.written += 1
+
+    def _open(self, day: str):
+        if self.current:
+            self.current.close()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        final = self.archive_dir / f"{FILE_PREFIX}{day}-{self.run_stamp}.jsonl.gz"
+        tmp = final.with_name(final.name + ".tmp")
+        self.current = gzip.open(tmp, "wb")
+        self.current_day = day
+        self.pending.append((tmp, final))
+
+    def commit(self):
+        if self.current:
+            self.current.close()
+        for tmp, final in self.pending:
+            os.replace(tmp, final)
+        return [final for _, final in self.pending]
+
+    def abort(self):
+        if self.current:
+            self.current.close()
+        for tmp, _ in self.pending:
+            tmp.unlink(missing_ok=True)
+
+
+class RetentionManager:
+    """Maintains the hot window and runs the periodic archival task."""
+
+    def __init__(self, storage, archive_dir: Path, hot_window: timedelta, lead: timedelta,
+                 interval: float = 3600.0, chunk_size: int = 1000):
+        self.storage = storage
+        self.archive_dir = Path(archive_dir)
+        self.hot_window = hot_window
+        # Documents are archived once they are within `lead` of expiring
+        self.lead = min(lead, hot_window)
+        self.interval = interval
+        self.chunk_size = max(1, chunk_size)
+        self.task: Optional[asyncio.Task] = None
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+
+    async def start(self):
+        self.task = asyncio.create_task(self._run())
+        logging.info(
+            f"scan_history retention enabled: {self.hot_window} hot window, archiving to {self.archive_dir}."
+        )
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"scan_history archival failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    # --------------------------------------------------
+    # Archival
+    # --------------------------------------------------
+
+    async def archive_once(self, now: Optional[datetime] = None) -> dict:
+        """Export every document between the watermark and the archive cutoff, then expire."""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - (self.hot_window - self.lead)
+        start = await self.storage.get_archive_watermark()
+        start = _utc(start) if start else None
+        result = {"archived": 0, "files": [], "archived_until": start}
+        if not start or start < cutoff:
+            if start and start < now - self.hot_window:
+                logging.warning(f"scan_history archival is behind the retention window; scans before "
+                                f"{now - self.hot_window} are kept past it until they are archived.")
+            result = await self._archive_range(start, cutoff)
+        # Only reached once everything before the cutoff is safely on disk
+        expired = await self.storage.expire_scans(now - self.hot_window)
+        if expired:
+            logging.info(f"Expired {expired} scans from the hot window.")
+        return result
+
+    async def _archive_range(self, start: Optional[datetime], cutoff: datetime) -> dict:
+        # Named after the range start so a retried run overwrites its own files
+        writer = ArchiveWriter(self.archive_dir, _stamp(start))
+        try:
+            async for chunk in self.storage.iter_scans(start, cutoff, self.chunk_size):
+                await asyncio.to_thread(writer.write, chunk)
+            files = await asyncio.to_thread(writer.commit)
+        except BaseException:
+            await asyncio.to_thread(writer.abort)
+            raise
+
+        await self.storage.set_archive_watermark(cutoff)
+        if writer.written:
+            logging.info(f"Archived {writer.written} scans to {len(files)} file(s).")
+        return {"archived": writer.written, "files": [f.name for f in files], "archived_until": cutoff}
+
+
+def query_archive(archive_dir: Path, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  scan_type: Optional[str] = None, label: Optional[str] = None,
+                  contains: Optional[str] = None, limit: int = 100,
+                  decode: Optional[Callable[[dict], dict]] = None) -> dict:
+    """
+    Search archived scans, newest files first. Only files whose day
+    overlaps [start, end) are opened, and each is read line by line.
+    decode() expands stored documents before filtering.
+    """
+    start = _utc(start) if start else None
+    end = _utc(end) if end else None
+    contains = contains.lower() if contains else None
+    files = []
+    for path in Path(archive_dir).glob(f"{FILE_PREFIX}*.jsonl.gz"):
+        day = _archive_day(path)
+        if day is None:
+            continue
+        if start and day < start.date():
+            continue
+        if end and day > end.date():
+            continue
+        files.append((day, path.name, path))
+    files.sort(reverse=True)
+
+    results = []
+    for _, _, path in files:
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                doc = json.loads(line)
+                if decode:
+                    doc = decode(doc)
+                timestamp = datetime.fromisoformat(doc["timestamp"])
+                if start and timestamp < start:
+                    continue
+                if end and timestamp >= end:
+                    continue
+                if scan_type and doc.get("scan_type") != scan_type:
+                    continue
+                if label and label.lower() not in doc.get("label", "").lower():
+                    continue
+                if contains and contains not in doc.get("content", "").lower():
+                    continue
+                results.append(doc)
+                if len(results) >= limit:
+                    return {"results": results, "files_scanned": len(files), "truncated": True}
+    return {"results": results, "files_scanned": len(files), "truncated": False}
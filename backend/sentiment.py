@@ -0,0 +1,160 @@
+"""
+sentiment.py — Local lexicon-based sentiment and threat-tone scoring.
+An in-process stand-in for the Azure sentiment call of Layer 4: word
+tokens are looked up in a fixed valence lexicon, a preceding negator
+flips and damps a word's valence and a preceding intensifier scales it.
+The result is reported as Azure-style negative/neutral/positive
+confidences so the same thresholds apply to both backends. A batch of
+texts is scored in one vectorized pass; numpy is imported on first use.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+# Valence of scam-relevant and general sentiment words, on a -4..4 scale.
+# Tokens are the lowercased \w\w+ words of features.tokenize.
+LEXICON = {
+    # Threats, penalties and loss of access
+    'arrest': -3.2, 'arrested': -3.2, 'warrant': -3.0, 'lawsuit': -2.8, 'prosecution': -3.0,
+    'prosecuted': -3.0, 'jail': -3.2, 'prison': -3.2, 'police': -1.8, 'court': -1.6,
+    'legal': -1.4, 'penalty': -2.6, 'penalties': -2.6, 'fined': -2.4,
+    'seized': -2.8, 'seize': -2.6, 'confiscated': -2.8, 'deported': -3.2, 'deportation': -3.2,
+    'suspended': -2.6, 'suspension': -2.6, 'suspend': -2.4, 'terminated': -2.8,
+    'termination': -2.6, 'terminate': -2.4, 'blocked': -2.2, 'block': -1.4, 'locked': -2.2,
+    'lock': -1.2, 'frozen': -2.4, 'freeze': -2.0, 'disabled': -2.0, 'deactivated': -2.2,
+    'closed': -1.4, 'cancelled': -1.8, 'canceled': -1.8, 'revoked': -2.4, 'expire': -1.4,
+    'expired': -1.8, 'expires': -1.4, 'overdue': -2.2, 'unpaid': -2.0, 'debt': -2.0,
+    'owe': -1.8, 'owed': -1.6, 'failure': -2.2, 'fail': -2.0, 'failed': -2.2,
+    'threat': -2.8, 'threaten': -2.8, 'threatened': -2.8, 'consequences': -2.4,
+    'immediate': -0.8, 'final': -1.0, 'last': -0.6, 'warning': -2.2, 'alert': -1.6,
+    # Fraud, compromise and harm
+    'fraud': -3.0, 'fraudulent': -3.0, 'scam': -3.0, 'stolen': -3.0, 'steal': -2.8,
+    'theft': -3.0, 'hacked': -3.0, 'hack': -2.4, 'compromised': -2.8, 'breach': -2.6,
+    'unauthorized': -2.6, 'unauthorised': -2.6, 'suspicious': -2.2, 'unusual': -1.4,
+    'illegal': -2.8, 'criminal': -3.0, 'crime': -3.0, 'violation': -2.6, 'violated': -2.6,
+    'risk': -1.8, 'danger': -2.6, 'dangerous': -2.8, 'lose': -2.2, 'lost': -2.0,
+    'loss': -2.2, 'losing': -2.2, 'damage': -2.4, 'problem': -1.8, 'problems': -1.8,
+    'issue': -1.2, 'error': -1.6, 'virus': -2.6, 'infected': -2.6, 'malware': -2.8,
+    'emergency': -2.2, 'trouble': -2.2, 'victim': -2.6,
+    # General negative sentiment
+    'bad': -2.4, 'worse': -2.6, 'worst': -3.0, 'terrible': -3.0, 'awful': -3.0,
+    'horrible': -3.0, 'angry': -2.6, 'upset': -2.0, 'afraid': -2.2, 'fear': -2.4,
+    'scared': -2.4, 'worried': -1.8, 'sorry': -1.0, 'sad': -2.2, 'hate': -3.0,
+    'unfortunately': -1.6, 'denied': -2.2, 'declined': -1.8, 'rejected': -2.2,
+    'refused': -2.0, 'wrong': -2.0, 'poor': -2.0, 'annoying': -2.0, 'disappointed': -2.2,
+    # General positive sentiment
+    'good': 1.9, 'great': 3.1, 'excellent': 3.2, 'wonderful': 3.2, 'amazing': 3.0,
+    'awesome': 3.1, 'nice': 1.8, 'lovely': 2.8, 'love': 3.2, 'loved': 2.9,
+    'happy': 2.7, 'glad': 2.0, 'pleased': 2.2, 'enjoy': 2.2, 'enjoyed': 2.3, 'fun': 2.3,
+    'thanks': 1.9, 'thank': 1.5, 'appreciate': 2.0, 'appreciated': 2.0, 'welcome': 2.0,
+    'congratulations': 2.9, 'congrats': 2.4, 'best': 3.2, 'beautiful': 2.9, 'kind': 2.4,
+    'helpful': 1.9, 'perfect': 2.7, 'safe': 1.9, 'secure': 1.4, 'free': 1.6, 'win': 2.8,
+    'won': 2.7, 'winner': 2.8, 'prize': 2.2, 'reward': 2.1, 'bonus': 2.0, 'gift': 1.9,
+    'lucky': 2.6, 'exciting': 2.2, 'excited': 2.2, 'fantastic': 2.9, 'cool': 1.3,
+    'hope': 1.9, 'smile': 1.8,
+}
+
+# Words that negate the valence of the next NEGATION_WINDOW tokens. Contractions
+# arrive split ("don't" -> "don"); "won" is left out as "won't" is rarer in
+# scam text than "you have won".
+NEGATORS = frozenset([
+    'not', 'no', 'never', 'none', 'nothing', 'nobody', 'nowhere', 'neither', 'nor',
+    'without', 'cannot', 'don', 'doesn', 'didn', 'isn', 'aren', 'wasn', 'weren',
+    'wouldn', 'shouldn', 'couldn', 'haven', 'hasn', 'hadn', 'mustn', 'ain',
+])
+NEGATION_WINDOW = 3
+# A negated word keeps part of its valence in the opposite direction
+NEGATION_SCALAR = -0.74
+
+# Multipliers applied to the valence of the next token
+INTENSIFIERS = {
+    'very': 1.3, 'extremely': 1.5, 'really': 1.3, 'so': 1.2, 'totally': 1.3,
+    'absolutely': 1.4, 'completely': 1.4, 'highly': 1.3, 'seriously': 1.4,
+    'immediately': 1.3, 'permanently': 1.5, 'severe': 1.4, 'severely': 1.4,
+    'serious': 1.3, 'strict': 1.2, 'strictly': 1.2, 'most': 1.2, 'too': 1.2,
+    'slightly': 0.7, 'somewhat': 0.7, 'little': 0.7, 'barely': 0.6, 'partly': 0.7,
+    'kinda': 0.7, 'fairly': 0.8, 'quite': 1.1,
+}
+
+# Emphasis from exclamation marks, counted up to MAX_EXCLAMATIONS
+EXCLAMATION_BOOST = 0.1
+MAX_EXCLAMATIONS = 4
+# Larger values need more sentiment-bearing words to reach a confident score
+NORMALIZATION_ALPHA = 15.0
+
+
+class LexiconSentiment:
+    """
+    Scores token sequences against the lexicon. The lexicon, negator and
+    intensifier tables are compiled into one word -> row index and
+    per-row arrays, so scoring costs one dict lookup per token plus a few
+    array operations per batch.
+    """
+
+    def __init__(self, lexicon: dict = LEXICON, negators=NEGATORS, intensifiers: dict = INTENSIFIERS):
+        import numpy as np
+
+        self.np = np
+        words = sorted(set(lexicon) | set(negators) | set(intensifiers))
+        # Row 0 is the neutral entry shared by every word outside the tables
+        self.rows = {word: row for row, word in enumerate(words, start=1)}
+        self.valence = np.array([0.0] + [lexicon.get(word, 0.0) for word in words])
+        self.negator = np.array([False] + [word in negators for word in words])
+        self.multiplier = np.array([1.0] + [intensifiers.get(word, 1.0) for word in words])
+
+    def score(self, tokens: Sequence[str], exclamations: int = 0) -> Tuple[str, float, float]:
+        """(sentiment, negative, positive) of one token sequence."""
+        return self.score_batch([tokens], [exclamations])[0]
+
+    def score_batch(self, token_lists: Sequence[Sequence[str]],
+                    exclamations: Optional[Sequence[int]] = None) -> List[Tuple[str, float, float]]:
+        """
+        (sentiment, negative, positive) for each token sequence. Negative and
+        positive are Azure-style confidences in 0..1; the remainder is neutral.
+        """
+        np = self.np
+        count = len(token_lists)
+        if not count:
+            return []
+        rows = self.rows
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.intp, count=count)
+        index = np.array([rows.get(token, 0) for tokens in token_lists for token in tokens], dtype=np.intp)
+        docs = np.repeat(np.arange(count), lengths)
+
+        values = self.valence[index]
+        # Intensifier of the previous token in the same text
+        if len(index) > 1:
+            same_doc = docs[1:] == docs[:-1]
+            values[1:] *= np.where(same_doc, self.multiplier[index[:-1]], 1.0)
+        # Negator among the previous NEGATION_WINDOW tokens of the same text
+        negators = self.negator[index]
+        negated = np.zeros(len(index), dtype=bool)
+        for shift in range(1, min(NEGATION_WINDOW, len(index) - 1) + 1):
+            negated[shift:] |= negators[:-shift] & (docs[shift:] == docs[:-shift])
+        values = np.where(negated, values * NEGATION_SCALAR, values)
+
+        # astype: bincount returns integers when there are no tokens at all
+        positive = np.bincount(docs, weights=np.clip(values, 0, None), minlength=count).astype(float)
+        negative = np.bincount(docs, weights=np.clip(-values, 0, None), minlength=count).astype(float)
+        if exclamations is not None:
+            boost = 1 + EXCLAMATION_BOOST * np.minimum(np.asarray(exclamations, dtype=float), MAX_EXCLAMATIONS)
+            positive *= boost
+            negative *= boost
+
+        total = positive + negative
+        # Share of the text's confidence that is not neutral, 0..1
+        strength = total / np.sqrt(total * total + NORMALIZATION_ALPHA)
+        safe_total = np.where(total > 0, total, 1.0)
+        negative_conf = strength * negative / safe_total
+        positive_conf = strength * positive / safe_total
+        neutral_conf = 1 - strength
+
+        results = []
+        for neg, pos, neu in zip(negative_conf.tolist(), positive_conf.tolist(), neutral_conf.tolist()):
+            if neg > pos and neg > neu:
+                sentiment = "negative"
+            elif pos > neg and pos > neu:
+                sentiment = "positive"
+            else:
+                sentiment = "neutral"
+            results.append((sentiment, neg, pos))
+        return results
@@ -11,52 +11,171 @@
 #   Layer 4: Azure AI Language sentiment + entity analysis.
 # ======================================================
 
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from fastapi import (FastAPI, APIRouter, HTTPException, UploadFile, File, Query, Request, Response, Header, Depends,
+                     WebSocket, WebSocketDisconnect)
+from fastapi.responses import PlainTextResponse
+# orjson is optional; when installed, JSON responses are rendered with it
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.requests import HTTPConnection
+import asyncio
 import os
 import io
 import logging
 import pickle
 import re
+import secrets
+import threading
+import time
 import uuid
 import urllib.request
-import httpx
-import numpy as np
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime, timezone
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+from datetime import datetime, timedelta, timezone
+
+# scikit-learn, httpx and motor are imported lazily (training path, first
+# Azure call and startup respectively) to keep worker cold starts fast.
+
+try:
+    from . import (admission, compact, config, features, jobs, livescan, lookalike, metrics, neardup,
+                   profiling, retention, sentiment, storage)
+except ImportError:  # launched from inside backend/ (uvicorn server:app)
+    import admission
+    import compact
+    import config
+    import features
+    import jobs
+    import livescan
+    import lookalike
+    import metrics
+    import neardup
+    import profiling
+    import retention
+    import sentiment
+    import storage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage backend (created on startup by connect_database from config.STORAGE_BACKEND)
+store: Optional[storage.Storage] = None
 
 # Azure AI Language credentials
 AZURE_LANGUAGE_KEY = os.environ.get('AZURE_LANGUAGE_KEY', '')
 AZURE_LANGUAGE_ENDPOINT = os.environ.get('AZURE_LANGUAGE_ENDPOINT', '')
 
+# Layer 4 tone scoring: "azure" (Azure AI Language only), "local" (in-process
+# lexicon only) or "auto" (Azure, falling back to the lexicon while Azure is
+# not configured, failing or its circuit is open)
+SENTIMENT_BACKEND = os.environ.get('SENTIMENT_BACKEND', 'azure').lower()
+# Consecutive Azure failures that open its circuit, and seconds it stays open
+AZURE_CIRCUIT_FAILURES = int(os.environ.get('AZURE_CIRCUIT_FAILURES', '5'))
+AZURE_CIRCUIT_RESET_SECONDS = float(os.environ.get('AZURE_CIRCUIT_RESET_SECONDS', '30'))
+# Texts sent per Azure request by batch jobs (Azure accepts at most 10 per sentiment call)
+AZURE_BATCH_DOCUMENTS = max(1, min(10, int(os.environ.get('AZURE_BATCH_DOCUMENTS', '10'))))
+
+# Admission control: in-flight cap, per-client rate limit and resource bulkheads
+MAX_IN_FLIGHT_SCANS = int(os.environ.get('MAX_IN_FLIGHT_SCANS', '64'))
+# Off by default: behind a platform proxy every client shares the proxy's address
+# unless TRUST_PROXY_HEADERS is set, so a per-client limit would cap the whole service
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', '0'))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', '20'))
+AZURE_MAX_CONCURRENCY = int(os.environ.get('AZURE_MAX_CONCURRENCY', '8'))
+MONGO_MAX_CONCURRENCY = int(os.environ.get('MONGO_MAX_CONCURRENCY', '32'))
+RESOURCE_ACQUIRE_TIMEOUT = float(os.environ.get('RESOURCE_ACQUIRE_TIMEOUT', '2.0'))
+TRUST_PROXY_HEADERS = os.environ.get('TRUST_PROXY_HEADERS', '').lower() in ('1', 'true', 'yes')
+
+# Token required by /api/admin endpoints (admin endpoints are disabled when unset)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
 # Paths for saving the trained model
 MODEL_PATH = ROOT_DIR / "ml_model.pkl"
 VECTORIZER_PATH = ROOT_DIR / "vectorizer.pkl"
+# File lock held while training, so only one process on a node trains at a time
+MODEL_LOCK_PATH = ROOT_DIR / "ml_model.lock"
+
+# Batch scan job worker pool
+SCAN_JOB_CONCURRENCY = int(os.environ.get('SCAN_JOB_CONCURRENCY', '4'))
+SCAN_JOB_CHUNK_SIZE = int(os.environ.get('SCAN_JOB_CHUNK_SIZE', '100'))
+SCAN_JOB_MAX_ITEMS = int(os.environ.get('SCAN_JOB_MAX_ITEMS', '100000'))
+# Each process heart-beats the jobs it owns; any process claims the jobs of an
+# owner silent for longer than the timeout (a crashed worker) and finishes them
+SCAN_JOB_HEARTBEAT_SECONDS = float(os.environ.get('SCAN_JOB_HEARTBEAT_SECONDS', '10'))
+SCAN_JOB_OWNER_TIMEOUT_SECONDS = float(os.environ.get('SCAN_JOB_OWNER_TIMEOUT_SECONDS', '60'))
+
+# Rule layer budget: characters of each input matched against the rule
+# patterns. The patterns are linear, so this bounds the layer's cost while
+# keeping its verdict a function of the text alone.
+RULE_MATCH_MAX_CHARS = int(os.environ.get('RULE_MATCH_MAX_CHARS', '20000'))
+
+# scan_history retention: days kept in the database (opt-in; 0 keeps every scan
+# and disables archival), hours before expiry that scans are archived,
+# archive location and cadence
+HISTORY_RETENTION_DAYS = float(os.environ.get('HISTORY_RETENTION_DAYS', '0'))
+HISTORY_ARCHIVE_LEAD_HOURS = float(os.environ.get('HISTORY_ARCHIVE_LEAD_HOURS', '24'))
+HISTORY_ARCHIVE_DIR = Path(os.environ.get('HISTORY_ARCHIVE_DIR', str(ROOT_DIR / 'archive')))
+HISTORY_ARCHIVE_INTERVAL = float(os.environ.get('HISTORY_ARCHIVE_INTERVAL', '3600'))
+HISTORY_ARCHIVE_CHUNK_SIZE = int(os.environ.get('HISTORY_ARCHIVE_CHUNK_SIZE', '1000'))
+
+# Deployment-wide background work that must run in a single process: the
+# periodic archival task, and re-queueing jobs left unfinished by a restart.
+# The pre-fork launcher keeps them in one worker; set both to false on the
+# extra processes of any other multi-process deployment.
+RETENTION_TASK_ENABLED = os.environ.get('RETENTION_TASK_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESUME_SCAN_JOBS = os.environ.get('RESUME_SCAN_JOBS', 'true').lower() in ('1', 'true', 'yes')
+
+# Live scanning over /api/ws/scan: quiet period after the last edit before an
+# update is pushed, and the longest text a live session accepts
+LIVE_SCAN_DEBOUNCE_MS = float(os.environ.get('LIVE_SCAN_DEBOUNCE_MS', '150'))
+LIVE_SCAN_MAX_CHARS = int(os.environ.get('LIVE_SCAN_MAX_CHARS', '10000'))
+
+# Near-duplicate scam detection: minimum estimated similarity to a known scam
+# text (0 disables the index), and whether confirmed Dangerous scans are indexed
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', '0.6'))
+NEAR_DUPLICATE_FROM_HISTORY = os.environ.get('NEAR_DUPLICATE_FROM_HISTORY', '').lower() in ('1', 'true', 'yes')
 
-# Create the main app
-app = FastAPI(title="ScamShield API", description="Hybrid fraud detection system with Azure AI")
 api_router = APIRouter(prefix="/api")
 
 # Global ML model variables
 ml_model = None
 vectorizer = None
 
+# Token-level scorer derived from (ml_model, vectorizer); rebuilt when they change
+text_scorer = None
+text_scorer_source = None
+
+# Batch scan job manager (created on startup)
+job_manager: Optional[jobs.JobManager] = None
+
+# scan_history retention manager (created on startup when retention is enabled)
+retention_manager: Optional[retention.RetentionManager] = None
+
+# Admission controller and bulkheads in front of Azure and MongoDB
+admission_controller = admission.AdmissionController(
+    MAX_IN_FLIGHT_SCANS, admission.RateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+)
+azure_bulkhead = admission.Bulkhead("azure", AZURE_MAX_CONCURRENCY, RESOURCE_ACQUIRE_TIMEOUT)
+azure_circuit = admission.CircuitBreaker("azure", AZURE_CIRCUIT_FAILURES, AZURE_CIRCUIT_RESET_SECONDS)
+# The "mongo" bulkhead bounds whichever storage backend is configured
+mongo_bulkhead = admission.Bulkhead("mongo", MONGO_MAX_CONCURRENCY, RESOURCE_ACQUIRE_TIMEOUT)
+
+# Shared Azure HTTP client (created on first use, pooled up to AZURE_MAX_CONCURRENCY)
+azure_client = None
+
+# Local lexicon tone scorer (created on first use)
+lexicon_sentiment: Optional[sentiment.LexiconSentiment] = None
+
+# MinHash/LSH index of known scam texts (built on startup) and its history backfill task
+near_duplicate_index: Optional[neardup.NearDuplicateIndex] = None
+near_duplicate_backfill: Optional[asyncio.Task] = None
+
 # ======================================================
 # Pydantic Models
 # ======================================================
@@ -87,10 +206,40 @@ class HistoryItem(BaseModel):
     explanation: str = ""
     timestamp: datetime
 
+class ScanJobRequest(BaseModel):
+    items: List[ScanRequest]
+
+class ScanJobStatus(BaseModel):
+    id: str
+    status: str
+    total: int
+    processed: int
+    failed: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    elapsed_seconds: float
+    items_per_second: float
+    avg_scan_ms: float
+    error: Optional[str] = None
+
+class ScanJobResults(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    skip: int
+    limit: int
+    results: List[dict]
+
 # ======================================================
 # Rule-based Detection Patterns
 # ======================================================
 
+# Gaps between the words of a rule are bounded: with Python's backtracking
+# engine an unbounded .* makes matching quadratic (or worse) in the input
+# length, while a bounded gap keeps it linear.
+GAP = r'.{0,60}'
+
 SCAM_PATTERNS = {
     'urgency': [
         r'urgent|immediate|expire|expires|within \d+ hours?',
@@ -98,29 +247,29 @@ SCAM_PATTERNS = {
         r'suspend|blocked|frozen|terminate',
     ],
     'lottery': [
-        r'congratulations|winner|won.*prize|lottery|jackpot',
-        r'claim.*\$[\d,]+|claim.*prize|claim.*reward',
+        rf'congratulations|winner|won{GAP}prize|lottery|jackpot',
+        rf'claim{GAP}\$[\d,]+|claim{GAP}prize|claim{GAP}reward',
         r'inheritance|beneficiary|million dollars?',
-        r'you.*won.*\$|selected.*winner',
+        rf'you{GAP}won{GAP}\$|selected{GAP}winner',
     ],
     'otp_phishing': [
         r'verification code|otp|one.time.password',
-        r'code.*\d{4,6}|pin.*\d{4,6}',
-        r'authenticate|verify.*account',
+        rf'code{GAP}\d{{4,6}}|pin{GAP}\d{{4,6}}',
+        rf'authenticate|verify{GAP}account',
     ],
     'financial': [
-        r'bank.*details|credit.*card|account.*number',
-        r'ssn|social.*security|tax.*refund',
-        r'bitcoin|crypto|investment.*opportunity',
+        rf'bank{GAP}details|credit{GAP}card|account{GAP}number',
+        rf'ssn|social{GAP}security|tax{GAP}refund',
+        rf'bitcoin|crypto|investment{GAP}opportunity',
     ],
     'authority': [
         r'irs|fbi|police|government|court',
-        r'legal.*action|warrant|arrest',
+        rf'legal{GAP}action|warrant|arrest',
         r'immigration|deportation|fine',
     ],
     'suspicious_links': [
         r'bit\.ly|tinyurl|t\.co|goo\.gl',
-        r'click.*here|download.*now|open.*link',
+        rf'click{GAP}here|download{GAP}now|open{GAP}link',
     ],
     'email_phishing': [
         r'dear (customer|user|account holder|valued member)',
@@ -141,142 +290,281 @@ EXPLANATION_MAP = {
     'suspicious_links': 'Contains shortened or suspicious links that hide the real destination.',
     'email_phishing': 'Uses phishing language common in fake emails impersonating banks or services.',
     'azure': 'Azure AI Language detected negative sentiment and suspicious entity patterns.',
+    'lookalike_domain': 'The link imitates a well-known brand domain using look-alike characters, a doubled or swapped letter, or a confusable letter.',
+    'near_duplicate': 'Closely matches a known scam message, with small changes such as different amounts or wording.',
+    'lexicon': 'Local sentiment analysis detected a negative, threatening tone.',
 }
 
+# Each category's patterns are joined into one compiled alternation; a match
+# of any of them is what the per-pattern loop used to look for.
+CATEGORY_SCORES = {
+    'urgency': 30, 'authority': 30,
+    'lottery': 35, 'financial': 35,
+    'otp_phishing': 25, 'suspicious_links': 25,
+    'email_phishing': 30,
+}
+COMPILED_SCAM_PATTERNS = [
+    (category, re.compile('|'.join(f'(?:{p})' for p in patterns)), f"Rule: {category}")
+    for category, patterns in SCAM_PATTERNS.items()
+]
+
+PHONE_INPUT_RE = re.compile(r'^[\+]?[1-9]?[\-\.\s]?\(?[0-9]{3}\)?[\-\.\s]?[0-9]{3}[\-\.\s]?[0-9]{4,6}$')
+# Same test as ^https?://|^www\.|\.com$|\.org$|\.net$ on the stripped text,
+# without a regex attempt at every position of long inputs
+URL_INPUT_PREFIXES = ('http://', 'https://', 'www.')
+URL_INPUT_SUFFIXES = ('.com', '.org', '.net')
+EMAIL_INPUT_RE = re.compile(
+    r'subject:|from:|to:|dear (customer|user|sir|madam)'
+    r'|unsubscribe|click here to|your account|sincerely|regards'
+)
+SCAM_NUMBER_RE = re.compile(
+    r'^(000|111|222|333|444|666|777|888|999)[-\s]?\d{3}[-\s]?\d{4}$'
+    r'|^\+1[-\s]?900[-\s]?\d{3}[-\s]?\d{4}$'
+    r'|^\d{4,6}$'
+    r'|^\d{11,}$'
+)
+# [a-z0-9]{20}\. matches exactly when [a-z0-9]{20,}\. does, without backtracking over long runs
+SUSPICIOUS_URL_RE = re.compile(
+    r'^https?://[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}'
+    r'|[a-z0-9]{20}\.'
+    r'|[0-9]{10}\.'
+)
+RULE_LEGITIMATE_DOMAINS = ['google.com', 'microsoft.com', 'apple.com', 'amazon.com',
+                           'facebook.com', 'youtube.com', 'wikipedia.org', 'github.com']
+BLACKLIST_LEGITIMATE_DOMAINS = RULE_LEGITIMATE_DOMAINS + [
+    'linkedin.com', 'twitter.com', 'instagram.com', 'reddit.com'
+]
+
+# Brand domains protected against homoglyph / typosquat lookalikes
+PROTECTED_DOMAINS = BLACKLIST_LEGITIMATE_DOMAINS + [
+    'paypal.com', 'netflix.com', 'outlook.com', 'dropbox.com',
+    'chase.com', 'wellsfargo.com', 'bankofamerica.com',
+]
+lookalike_index = lookalike.LookalikeIndex(PROTECTED_DOMAINS)
+
+# Result labels by severity and their guidance; the index is the stored label code
+LABELS = ["🟢 Safe", "🟡 Suspicious", "🔴 Dangerous"]
+LABEL_GUIDANCE = [
+    "This content appears safe. No significant risk indicators detected.",
+    "This content shows some warning signs. Exercise caution and verify authenticity before taking any action.",
+    "This content is highly likely to be a scam. Do not share personal information, click links, or send money.",
+]
+
+# Stored trigger codes. Append only — the index is persisted in scan_history,
+# so this is spelled out rather than derived from SCAM_PATTERNS.
+TRIGGER_CODES = [
+    "Rule: urgency",
+    "Rule: lottery",
+    "Rule: otp_phishing",
+    "Rule: financial",
+    "Rule: authority",
+    "Rule: suspicious_links",
+    "Rule: email_phishing",
+    "Rule: suspicious_number_pattern",
+    "Rule: suspicious_url_pattern",
+    "Rule: lookalike_domain",
+    "Blacklist: known_scam_number",
+    "Blacklist: known_scam_domain",
+    "Blacklist: known_scam_message",
+    "AI: suspicious_language_patterns",
+    "Azure: high_negative_sentiment",
+    "Azure: threatening_tone_detected",
+    "Blacklist: near_duplicate_scam",
+    "Lexicon: high_negative_sentiment",
+    "Lexicon: threatening_tone_detected",
+]
+
 # ======================================================
 # Detection Helpers
 # ======================================================
 
-def detect_input_type(content: str) -> str:
-    content = content.strip()
-    phone_pattern = r'^[\+]?[1-9]?[\-\.\s]?\(?[0-9]{3}\)?[\-\.\s]?[0-9]{3}[\-\.\s]?[0-9]{4,6}$'
-    if re.match(phone_pattern, content) or content.replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
+@asynccontextmanager
+async def storage_op(operation: str):
+    """Run a storage operation inside the storage bulkhead and time it."""
+    try:
+        async with mongo_bulkhead.slot():
+            with metrics.time_mongo(operation):
+                yield
+    except admission.Saturated:
+        metrics.RESOURCE_TIMEOUTS.labels("mongo").inc()
+        raise
+
+def get_azure_client():
+    global azure_client
+    if azure_client is None:
+        import httpx
+        azure_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=AZURE_MAX_CONCURRENCY,
+                                max_keepalive_connections=AZURE_MAX_CONCURRENCY),
+        )
+    return azure_client
+
+def detect_input_type(feats: features.ScanFeatures, email_match: Optional[bool] = None) -> str:
+    """email_match can carry an already known EMAIL_INPUT_RE result (live sessions track it)."""
+    if PHONE_INPUT_RE.match(feats.text) or feats.phone_digits.isdigit():
         return 'phone'
-    url_pattern = r'^https?://|^www\.|\.com$|\.org$|\.net$'
-    if re.search(url_pattern, content, re.IGNORECASE):
+    if feats.lower.startswith(URL_INPUT_PREFIXES) or feats.lower.endswith(URL_INPUT_SUFFIXES):
         return 'url'
-    email_patterns = [
-        r'subject:|from:|to:|dear (customer|user|sir|madam)',
-        r'unsubscribe|click here to|your account|sincerely|regards',
-    ]
-    if any(re.search(p, content.lower()) for p in email_patterns):
+    if email_match if email_match is not None else EMAIL_INPUT_RE.search(feats.lower):
         return 'email'
     return 'text'
 
-def apply_rule_layer(content: str, scan_type: str) -> tuple:
+def apply_rule_layer(feats: features.ScanFeatures, scan_type: str) -> tuple:
     score = 0
     triggers = []
-    content_lower = content.lower()
-
-    for category, patterns in SCAM_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, content_lower):
-                if category in ['urgency', 'authority']:
-                    score += 30
-                elif category in ['lottery', 'financial']:
-                    score += 35
-                elif category in ['otp_phishing', 'suspicious_links']:
-                    score += 25
-                elif category == 'email_phishing':
-                    score += 30
-                triggers.append(f"Rule: {category}")
-                break
+    content_lower = feats.lower[:RULE_MATCH_MAX_CHARS]
+    if len(feats.lower) > RULE_MATCH_MAX_CHARS:
+        metrics.RULE_INPUT_TRUNCATED.inc()
 
+    for category, pattern, trigger in COMPILED_SCAM_PATTERNS:
+        if pattern.search(content_lower):
+            score += CATEGORY_SCORES[category]
+            triggers.append(trigger)
+
+    type_score, type_triggers = apply_type_rules(feats, scan_type, content_lower)
+    return min(score + type_score, 70), triggers + type_triggers
+
+def apply_type_rules(feats: features.ScanFeatures, scan_type: str, content_lower: str) -> tuple:
+    """Rules that only apply to phone numbers and URLs."""
+    score = 0
+    triggers = []
     if scan_type == 'phone':
-        scam_number_patterns = [
-            r'^(000|111|222|333|444|666|777|888|999)[-\s]?\d{3}[-\s]?\d{4}$',
-            r'^\+1[-\s]?900[-\s]?\d{3}[-\s]?\d{4}$',
-            r'^\d{4,6}$',
-            r'^\d{11,}$',
-        ]
-        for pattern in scam_number_patterns:
-            if re.search(pattern, content.replace('-', '').replace(' ', '').replace('(', '').replace(')', '')):
-                score += 20
-                triggers.append("Rule: suspicious_number_pattern")
-                break
+        if SCAM_NUMBER_RE.search(feats.phone_digits):
+            score += 20
+            triggers.append("Rule: suspicious_number_pattern")
 
     elif scan_type == 'url':
-        content_clean = content.lower().strip()
-        suspicious_url_patterns = [
-            r'^https?://[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}',
-            r'[a-z0-9]{20,}\.',
-            r'[0-9]{10,}\.',
-        ]
-        legitimate_domains = ['google.com', 'microsoft.com', 'apple.com', 'amazon.com',
-                              'facebook.com', 'youtube.com', 'wikipedia.org', 'github.com']
-        is_legitimate = any(domain in content_clean for domain in legitimate_domains)
-        if not is_legitimate:
-            for pattern in suspicious_url_patterns:
-                if re.search(pattern, content_clean):
-                    score += 25
-                    triggers.append("Rule: suspicious_url_pattern")
-                    break
+        is_legitimate = any(domain in content_lower for domain in RULE_LEGITIMATE_DOMAINS)
+        if not is_legitimate and SUSPICIOUS_URL_RE.search(content_lower):
+            score += 25
+            triggers.append("Rule: suspicious_url_pattern")
+        # Hosts without a scheme (www.example.com) are taken up to the first slash
+        host = feats.host or content_lower.split('/', 1)[0]
+        if lookalike_index.match(host):
+            score += 40
+            triggers.append("Rule: lookalike_domain")
 
-    return min(score, 70), triggers
+    return score, triggers
 
-async def apply_blacklist_layer(content: str, scan_type: str) -> tuple:
+async def apply_blacklist_layer(feats: features.ScanFeatures, scan_type: str) -> tuple:
     score = 0
     triggers = []
     try:
         if scan_type == 'phone':
-            blocked = await db.blocked_numbers.find_one({"number": content})
+            async with storage_op("blocked_numbers.find_one"):
+                blocked = await store.find_blocked_number(feats.text)
             if blocked:
                 score += 50
                 triggers.append("Blacklist: known_scam_number")
         elif scan_type == 'url':
-            domain_match = re.search(r'://([^/]+)', content)
-            if domain_match:
-                domain = domain_match.group(1).lower()
-                legitimate_domains = [
-                    'google.com', 'microsoft.com', 'apple.com', 'amazon.com',
-                    'facebook.com', 'youtube.com', 'wikipedia.org', 'github.com',
-                    'linkedin.com', 'twitter.com', 'instagram.com', 'reddit.com'
-                ]
-                is_legitimate = any(legit_domain in domain for legit_domain in legitimate_domains)
+            domain = feats.host
+            if domain:
+                is_legitimate = any(legit_domain in domain for legit_domain in BLACKLIST_LEGITIMATE_DOMAINS)
                 if not is_legitimate:
-                    blocked = await db.blocked_domains.find_one({"domain": domain})
+                    async with storage_op("blocked_domains.find_one"):
+                        blocked = await store.find_blocked_domain(domain)
                     if blocked:
                         score += 50
                         triggers.append("Blacklist: known_scam_domain")
         else:
-            blocked_messages = await db.blocked_messages.find().to_list(100)
-            for blocked_msg in blocked_messages:
-                if blocked_msg['pattern'].lower() in content.lower():
+            async with storage_op("blocked_messages.find"):
+                patterns = await store.blocked_message_patterns(100)
+            for pattern in patterns:
+                if pattern.lower() in feats.lower:
                     score += 50
                     triggers.append("Blacklist: known_scam_message")
                     break
+            if not score and near_duplicate_index is not None and near_duplicate_index.match(feats.text):
+                score += 40
+                triggers.append("Blacklist: near_duplicate_scam")
+    except admission.Saturated:
+        # A scan that could not be checked must not be reported as clean
+        raise
     except Exception as e:
+        metrics.record_error("blacklist")
         logging.error(f"Blacklist check error: {e}")
     return score, triggers
 
-def apply_ai_layer(content: str) -> tuple:
+def get_text_scorer():
+    """Return the token-level scorer for the current model, rebuilding it if the model changed."""
+    global text_scorer, text_scorer_source
+    if text_scorer_source != (id(ml_model), id(vectorizer)):
+        text_scorer = features.LinearTextScorer.from_model(vectorizer, ml_model)
+        text_scorer_source = (id(ml_model), id(vectorizer))
+    return text_scorer
+
+def ai_result(scam_probability: float) -> tuple:
+    ai_score = int(scam_probability * 40)
+    triggers = []
+    if ai_score > 20:
+        triggers.append("AI: suspicious_language_patterns")
+    return ai_score, triggers
+
+def apply_ai_layer(feats: features.ScanFeatures) -> tuple:
     global ml_model, vectorizer
     if ml_model is None or vectorizer is None:
         return 0, []
     try:
-        content_vector = vectorizer.transform([content])
-        proba = ml_model.predict_proba(content_vector)[0]
-        scam_probability = proba[1] if len(proba) > 1 else 0
-        ai_score = int(scam_probability * 40)
-        triggers = []
-        if ai_score > 20:
-            triggers.append("AI: suspicious_language_patterns")
-        return ai_score, triggers
+        scorer = get_text_scorer()
+        if scorer is not None:
+            return ai_result(scorer.scam_probability(feats.tokens))
+        proba = ml_model.predict_proba(vectorizer.transform([feats.text]))[0]
+        return ai_result(proba[1] if len(proba) > 1 else 0)
     except Exception as e:
+        metrics.record_error("ml")
         logging.error(f"AI layer error: {e}")
         return 0, []
 
-async def apply_azure_layer(content: str) -> tuple:
+def apply_ai_layer_batch(feats_list: List[features.ScanFeatures]) -> List[tuple]:
+    """Score many inputs; falls back to one vectorizer/model call for non-linear models."""
+    global ml_model, vectorizer
+    if ml_model is None or vectorizer is None or not feats_list:
+        return [(0, []) for _ in feats_list]
+    try:
+        scorer = get_text_scorer()
+        if scorer is not None:
+            return [ai_result(scorer.scam_probability(feats.tokens)) for feats in feats_list]
+        probas = ml_model.predict_proba(vectorizer.transform([feats.text for feats in feats_list]))
+    except Exception as e:
+        metrics.record_error("ml")
+        logging.error(f"AI layer batch error: {e}")
+        return [(0, []) for _ in feats_list]
+    return [ai_result(proba[1] if len(proba) > 1 else 0) for proba in probas]
+
+def sentiment_layer_result(source: str, sentiment_label: str, negative_score: float,
+                           positive_score: float) -> tuple:
+    """Layer 4 score and triggers from Azure-style sentiment confidences."""
+    score = 0
+    triggers = []
+    # High negative sentiment is a scam signal
+    if sentiment_label == "negative" and negative_score > 0.7:
+        score += 20
+        triggers.append(f"{source}: high_negative_sentiment")
+    # Very low positive with high negative
+    if negative_score > 0.8 and positive_score < 0.1:
+        score += 10
+        triggers.append(f"{source}: threatening_tone_detected")
+    return min(score, 30), triggers
+
+async def query_azure_sentiment(content: str) -> Optional[tuple]:
     """
     Layer 4: Azure AI Language
-    Uses sentiment analysis to detect negative/threatening tone
-    and key phrase extraction to identify scam-related entities.
+    Uses sentiment analysis to detect negative/threatening tone.
+    Returns None when Azure is not configured, its circuit is open or
+    the call did not produce a result.
     """
-    if not AZURE_LANGUAGE_KEY or not AZURE_LANGUAGE_ENDPOINT:
-        return 0, []
+    return (await query_azure_sentiment_batch([content]))[0]
 
-    score = 0
-    triggers = []
+async def query_azure_sentiment_batch(contents: List[str]) -> List[Optional[tuple]]:
+    """
+    Layer 4 for up to AZURE_BATCH_DOCUMENTS texts in one Azure request.
+    Each entry is None when the call did not produce a result for that text.
+    """
+    if not AZURE_LANGUAGE_KEY or not AZURE_LANGUAGE_ENDPOINT:
+        return [None] * len(contents)
+    if not azure_circuit.allow():
+        return [None] * len(contents)
 
     try:
         url = f"{AZURE_LANGUAGE_ENDPOINT}language/:analyze-text?api-version=2023-04-01"
@@ -285,9 +573,6 @@ async def apply_azure_layer(content: str) -> tuple:
             "Content-Type": "application/json"
         }
 
-        # Truncate content to 5000 chars (Azure limit)
-        content_truncated = content[:5000]
-
         payload = {
             "kind": "SentimentAnalysis",
             "parameters": {
@@ -295,56 +580,115 @@ async def apply_azure_layer(content: str) -> tuple:
                 "opinionMining": True
             },
             "analysisInput": {
+                # Truncate content to 5000 chars (Azure limit)
                 "documents": [
-                    {"id": "1", "language": "en", "text": content_truncated}
+                    {"id": str(number), "language": "en", "text": content[:5000]}
+                    for number, content in enumerate(contents, start=1)
                 ]
             }
         }
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
+        async with azure_bulkhead.slot():
+            response = await get_azure_client().post(url, headers=headers, json=payload)
 
-        if response.status_code == 200:
-            data = response.json()
-            documents = data.get("results", {}).get("documents", [])
+        if response.status_code != 200:
+            azure_circuit.record_failure()
+            metrics.record_error("azure")
+            logging.warning(f"Azure layer returned HTTP {response.status_code}")
+            return [None] * len(contents)
+        azure_circuit.record_success()
 
-            if documents:
-                doc = documents[0]
-                sentiment = doc.get("sentiment", "neutral")
-                confidence = doc.get("confidenceScores", {})
-
-                negative_score = confidence.get("negative", 0)
-                positive_score = confidence.get("positive", 0)
-
-                # High negative sentiment is a scam signal
-                if sentiment == "negative" and negative_score > 0.7:
-                    score += 20
-                    triggers.append("Azure: high_negative_sentiment")
-
-                # Very low positive with high negative
-                if negative_score > 0.8 and positive_score < 0.1:
-                    score += 10
-                    triggers.append("Azure: threatening_tone_detected")
-
-                logging.info(f"Azure sentiment: {sentiment}, negative: {negative_score:.2f}")
+        data = response.json()
+        documents = {doc.get("id"): doc for doc in data.get("results", {}).get("documents", [])}
+        results = []
+        for number in range(1, len(contents) + 1):
+            doc = documents.get(str(number))
+            if doc is None:
+                # Azure rejected this document (e.g. unsupported language)
+                results.append(None)
+                continue
+            sentiment_label = doc.get("sentiment", "neutral")
+            confidence = doc.get("confidenceScores", {})
+            negative_score = confidence.get("negative", 0)
+            positive_score = confidence.get("positive", 0)
+            logging.info(f"Azure sentiment: {sentiment_label}, negative: {negative_score:.2f}")
+            results.append(sentiment_layer_result("Azure", sentiment_label, negative_score, positive_score))
+        metrics.SENTIMENT_SCORES.labels("azure").inc(len(documents))
+        return results
 
+    except admission.Saturated as e:
+        # Our own bulkhead is full; Azure itself has not failed
+        metrics.RESOURCE_TIMEOUTS.labels("azure").inc()
+        logging.warning(f"Azure layer skipped: {e}")
     except Exception as e:
+        azure_circuit.record_failure()
+        metrics.record_error("azure")
         logging.warning(f"Azure layer error (non-critical): {e}")
-
-    return min(score, 30), triggers
+    return [None] * len(contents)
+
+def get_lexicon_sentiment() -> sentiment.LexiconSentiment:
+    global lexicon_sentiment
+    if lexicon_sentiment is None:
+        lexicon_sentiment = sentiment.LexiconSentiment()
+    return lexicon_sentiment
+
+def apply_lexicon_layer_batch(feats_list: List[features.ScanFeatures]) -> List[tuple]:
+    """Layer 4 in-process: lexicon tone scores for many inputs in one vectorized pass."""
+    if not feats_list:
+        return []
+    try:
+        scores = get_lexicon_sentiment().score_batch(
+            [feats.tokens for feats in feats_list], [feats.text.count('!') for feats in feats_list]
+        )
+    except Exception as e:
+        metrics.record_error("sentiment")
+        logging.error(f"Lexicon sentiment error: {e}")
+        return [(0, []) for _ in feats_list]
+    metrics.SENTIMENT_SCORES.labels("lexicon").inc(len(scores))
+    return [sentiment_layer_result("Lexicon", *score) for score in scores]
+
+def apply_lexicon_layer(feats: features.ScanFeatures) -> tuple:
+    return apply_lexicon_layer_batch([feats])[0]
+
+async def apply_sentiment_layer(feats: features.ScanFeatures) -> tuple:
+    """Layer 4 from the backend selected by SENTIMENT_BACKEND."""
+    if SENTIMENT_BACKEND == "local":
+        return apply_lexicon_layer(feats)
+    result = await query_azure_sentiment(feats.text)
+    if result is not None:
+        return result
+    if SENTIMENT_BACKEND == "auto":
+        return apply_lexicon_layer(feats)
+    return 0, []
+
+async def apply_sentiment_layer_batch(feats_list: List[features.ScanFeatures]) -> List[tuple]:
+    """
+    Layer 4 for a batch. The local backend scores the whole batch at once;
+    Azure gets AZURE_BATCH_DOCUMENTS texts per request, with the requests
+    sent concurrently through the Azure bulkhead.
+    """
+    if SENTIMENT_BACKEND == "local":
+        return apply_lexicon_layer_batch(feats_list)
+    groups = [feats_list[i:i + AZURE_BATCH_DOCUMENTS] for i in range(0, len(feats_list), AZURE_BATCH_DOCUMENTS)]
+    answers = await asyncio.gather(*(
+        query_azure_sentiment_batch([feats.text for feats in group]) for group in groups
+    ))
+    results = [result for group_results in answers for result in group_results]
+    fallback = [feats for feats, result in zip(feats_list, results) if result is None]
+    if SENTIMENT_BACKEND != "auto" or not fallback:
+        return [result if result is not None else (0, []) for result in results]
+    lexicon_iter = iter(apply_lexicon_layer_batch(fallback))
+    return [result if result is not None else next(lexicon_iter) for result in results]
 
 def calculate_final_score_and_label(rule_score: int, blacklist_score: int, ai_score: int, azure_score: int = 0) -> tuple:
     total_score = min(rule_score + blacklist_score + ai_score + azure_score, 100)
     if total_score <= 30:
-        label = "🟢 Safe"
-        guidance = "This content appears safe. No significant risk indicators detected."
+        code = 0
     elif total_score <= 70:
-        label = "🟡 Suspicious"
-        guidance = "This content shows some warning signs. Exercise caution and verify authenticity before taking any action."
+        code = 1
     else:
-        label = "🔴 Dangerous"
-        guidance = "This content is highly likely to be a scam. Do not share personal information, click links, or send money."
-    return total_score, label, guidance
+        code = 2
+    return total_score, LABELS[code], LABEL_GUIDANCE[code]
 
 def build_explanation(triggers: List[str]) -> str:
     explanations = []
@@ -357,78 +701,266 @@ def build_explanation(triggers: List[str]) -> str:
         return "No specific scam patterns detected."
     return " ".join(explanations)
 
-async def run_scan(content: str, scan_type: Optional[str] = None) -> ScanResult:
-    content = content.strip()
-    if not content:
-        raise HTTPException(status_code=400, detail="Content cannot be empty")
+# Compact scan_history documents: label/trigger codes, explanation rebuilt on read
+scan_codec = compact.ScanCodec(LABELS, LABEL_GUIDANCE, TRIGGER_CODES, build_explanation)
 
-    detected_type = scan_type or detect_input_type(content)
+async def run_scan(content: str, scan_type: Optional[str] = None,
+                   timings: Optional[profiling.ScanTimings] = None) -> ScanResult:
+    scan_started = time.perf_counter()
+    with profiling.stage(timings, "detection"):
+        # Normalize once; every layer reads the same immutable features
+        feats = features.extract_features(content)
+        if not feats.text:
+            raise HTTPException(status_code=400, detail="Content cannot be empty")
+        detected_type = scan_type or detect_input_type(feats)
 
     # Run all four detection layers
-    rule_score, rule_triggers = apply_rule_layer(content, detected_type)
-    blacklist_score, blacklist_triggers = await apply_blacklist_layer(content, detected_type)
-    ai_score, ai_triggers = apply_ai_layer(content)
-    azure_score, azure_triggers = await apply_azure_layer(content)
+    with metrics.time_layer("rules"), profiling.stage(timings, "rules"):
+        rule_score, rule_triggers = apply_rule_layer(feats, detected_type)
+    with metrics.time_layer("blacklist"), profiling.stage(timings, "blacklist"):
+        try:
+            blacklist_score, blacklist_triggers = await apply_blacklist_layer(feats, detected_type)
+        except admission.Saturated:
+            raise admission.Overloaded("storage_saturated", RESOURCE_ACQUIRE_TIMEOUT)
+    with metrics.time_layer("ml"), profiling.stage(timings, "ml"):
+        ai_score, ai_triggers = apply_ai_layer(feats)
+    with metrics.time_layer("azure"), profiling.stage(timings, "azure"):
+        azure_score, azure_triggers = await apply_sentiment_layer(feats)
+
+    result = build_scan_result(
+        feats.text, detected_type,
+        [(rule_score, rule_triggers), (blacklist_score, blacklist_triggers),
+         (ai_score, ai_triggers), (azure_score, azure_triggers)],
+    )
+    result_doc = result.model_dump()
 
+    try:
+        with profiling.stage(timings, "persistence"):
+            async with storage_op("scan_history.insert_one"):
+                await store.insert_scan(scan_codec.encode(result_doc))
+    except Exception as e:
+        metrics.record_error("history_write")
+        logging.error(f"Failed to store scan history: {e}")
+
+    if NEAR_DUPLICATE_FROM_HISTORY and near_duplicate_index is not None and is_confirmed_scam(result_doc):
+        near_duplicate_index.add(feats.text, "scan_history")
+
+    metrics.record_scan(result.label, result.scan_type)
+    metrics.SCAN_LATENCY.observe(time.perf_counter() - scan_started)
+    return result
+
+def build_scan_result(content: str, detected_type: str, layers: List[tuple]) -> ScanResult:
+    """Combine (score, triggers) pairs from the rule, blacklist, AI and Azure layers."""
+    (rule_score, _), (blacklist_score, _), (ai_score, _), (azure_score, _) = layers
     total_score, label, guidance = calculate_final_score_and_label(
         rule_score, blacklist_score, ai_score, azure_score
     )
-
-    all_triggers = rule_triggers + blacklist_triggers + ai_triggers + azure_triggers
-    explanation = build_explanation(all_triggers)
-
-    result = ScanResult(
+    all_triggers = [trigger for _, triggers in layers for trigger in triggers]
+    return ScanResult(
         content=content[:500],
         scan_type=detected_type,
         risk_score=total_score,
         label=label,
         guidance=guidance,
         triggers=all_triggers,
-        explanation=explanation,
+        explanation=build_explanation(all_triggers),
     )
 
-    try:
-        await db.scan_history.insert_one(result.dict())
-    except Exception as e:
-        logging.error(f"Failed to store scan history: {e}")
+def analyze_batch(items: List[tuple]) -> tuple:
+    """
+    CPU-bound part of run_scan_batch: features, input types and the rule and
+    ML layers. A rule layer that fails is returned as its exception.
+    """
+    feats_list = [features.extract_features(content or "") for content, _ in items]
+    types = [scan_type or (detect_input_type(feats) if feats.text else 'text')
+             for feats, (_, scan_type) in zip(feats_list, items)]
+    scanned = [feats for feats in feats_list if feats.text]
+    rule_layers = []
+    for feats, detected_type in zip(feats_list, types):
+        if not feats.text:
+            continue
+        try:
+            rule_layers.append(apply_rule_layer(feats, detected_type))
+        except Exception as e:
+            rule_layers.append(e)
+    return feats_list, types, scanned, rule_layers, apply_ai_layer_batch(scanned)
 
-    return result
+async def run_scan_batch(items: List[tuple]) -> List[dict]:
+    """
+    Scan many (content, scan_type) items at once for batch jobs.
+    The ML layer is vectorized across the whole batch; results are
+    returned as compact scan documents and are not written to scan_history.
+    The CPU-bound layers run in a worker thread so a large chunk does not
+    stall the event loop; blacklist and sentiment lookups stay on the loop.
+    """
+    feats_list, types, scanned, rule_layers, ai_layers = await asyncio.to_thread(analyze_batch, items)
+    rule_iter = iter(rule_layers)
+    ai_iter = iter(ai_layers)
+    sentiment_iter = iter(await apply_sentiment_layer_batch(scanned))
+
+    results = []
+    for feats, detected_type in zip(feats_list, types):
+        if not feats.text:
+            results.append({"error": "Content cannot be empty"})
+            continue
+        rule_layer = next(rule_iter)
+        ai_layer = next(ai_iter)
+        sentiment_layer = next(sentiment_iter)
+        try:
+            if isinstance(rule_layer, Exception):
+                raise rule_layer
+            layers = [
+                rule_layer,
+                await apply_blacklist_layer(feats, detected_type),
+                ai_layer,
+                sentiment_layer,
+            ]
+            result = build_scan_result(feats.text, detected_type, layers)
+            metrics.record_scan(result.label, result.scan_type)
+            results.append(scan_codec.encode(result.model_dump()))
+        except admission.Saturated:
+            results.append({"error": "Server is busy, please retry"})
+        except Exception as e:
+            metrics.record_error("batch_scan")
+            logging.error(f"Batch scan item error: {e}")
+            results.append({"error": "Internal server error during scan"})
+    return results
+
+# Patterns a live session keeps incrementally: the rule categories plus the
+# email heuristic of detect_input_type
+LIVE_SCAN_PATTERNS = COMPILED_SCAM_PATTERNS + [("email_input", EMAIL_INPUT_RE, None)]
+
+def new_live_session() -> livescan.LiveScanSession:
+    # Capped below RULE_MATCH_MAX_CHARS so live rules see the same text as a full scan
+    return livescan.LiveScanSession(LIVE_SCAN_PATTERNS, features.tokenize,
+                                    min(LIVE_SCAN_MAX_CHARS, RULE_MATCH_MAX_CHARS))
+
+def evaluate_live_session(session: livescan.LiveScanSession, scan_type: Optional[str] = None) -> dict:
+    """
+    Score a live session with the cheap layers only (rules and ML), reusing
+    its incremental match and token state. Blacklist, Azure and history
+    persistence are left to the final submit through run_scan.
+    """
+    feats = features.extract_features(session.text, with_tokens=False)
+    matches = dict(session.matches())
+    email_match = "email_input" in matches
+    matches.pop("email_input", None)
+    detected_type = scan_type or (detect_input_type(feats, email_match) if feats.text else 'text')
+
+    rule_score = sum(CATEGORY_SCORES[category] for category in matches)
+    type_score, type_triggers = apply_type_rules(feats, detected_type, feats.lower)
+    rule_layer = (min(rule_score + type_score, 70), list(matches.values()) + type_triggers)
+
+    if ml_model is None or vectorizer is None or not feats.text:
+        ai_layer = (0, [])
+    elif get_text_scorer() is not None:
+        ai_layer = ai_result(session.scam_probability(text_scorer))
+    else:
+        # Models without a token-level scorer are re-scored from scratch
+        ai_layer = apply_ai_layer(features.extract_features(session.text))
+
+    total_score, label, _ = calculate_final_score_and_label(rule_layer[0], 0, ai_layer[0])
+    return {
+        "type": "update",
+        "version": session.version,
+        "scan_type": detected_type,
+        "risk_score": total_score,
+        "label": label,
+        "triggers": rule_layer[1] + ai_layer[1],
+    }
 
 # ======================================================
 # ML Model
 # ======================================================
 
+SMS_DATASET_PATH = ROOT_DIR / "sms_spam.tsv"
+
+def load_sms_dataset(path: Path) -> tuple:
+    """Return (texts, labels) from the tab-separated SMS Spam Collection; 1 = spam."""
+    texts = []
+    labels = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split('\t')
+            if len(parts) == 2:
+                label, text = parts
+                labels.append(1 if label == 'spam' else 0)
+                texts.append(text)
+    return texts, labels
+
+def load_ml_artifacts() -> bool:
+    """Load the saved model and vectorizer; False when they are missing or unreadable."""
+    global ml_model, vectorizer
+    if not (MODEL_PATH.exists() and VECTORIZER_PATH.exists()):
+        return False
+    try:
+        with open(MODEL_PATH, 'rb') as f:
+            ml_model = pickle.load(f)
+        with open(VECTORIZER_PATH, 'rb') as f:
+            vectorizer = pickle.load(f)
+        logging.info("ML model loaded from disk.")
+        return True
+    except Exception as e:
+        logging.warning(f"Could not load saved model, retraining: {e}")
+        ml_model = None
+        vectorizer = None
+        return False
+
+def save_artifact(obj, path: Path):
+    """Pickle to a temporary file and rename it, so readers never see a partial file."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def model_training_lock():
+    """Exclusive lock across the processes of this node (no-op where fcntl is unavailable)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(MODEL_LOCK_PATH, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 async def initialize_ml_model():
     global ml_model, vectorizer
 
-    if MODEL_PATH.exists() and VECTORIZER_PATH.exists():
-        try:
-            with open(MODEL_PATH, 'rb') as f:
-                ml_model = pickle.load(f)
-            with open(VECTORIZER_PATH, 'rb') as f:
-                vectorizer = pickle.load(f)
-            logging.info("ML model loaded from disk.")
+    # Already loaded, e.g. by the pre-fork master this worker was forked from
+    if ml_model is not None and vectorizer is not None:
+        return
+
+    if load_ml_artifacts():
+        return
+
+    with model_training_lock():
+        # Another process may have trained and saved the artifacts while we waited
+        if load_ml_artifacts():
             return
-        except Exception as e:
-            logging.warning(f"Could not load saved model, retraining: {e}")
+        train_ml_model()
+
+def train_ml_model():
+    global ml_model, vectorizer
 
     try:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score
+
         dataset_url = "https://raw.githubusercontent.com/justmarkham/pycon-2016-tutorial/master/data/sms.tsv"
-        dataset_path = ROOT_DIR / "sms_spam.tsv"
+        dataset_path = SMS_DATASET_PATH
 
         if not dataset_path.exists():
             logging.info("Downloading SMS Spam dataset...")
             urllib.request.urlretrieve(dataset_url, dataset_path)
 
-        texts = []
-        labels = []
-        with open(dataset_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                parts = line.strip().split('\t')
-                if len(parts) == 2:
-                    label, text = parts
-                    labels.append(1 if label == 'spam' else 0)
-                    texts.append(text)
+        texts, labels = load_sms_dataset(dataset_path)
 
         logging.info(f"Loaded {len(texts)} messages ({sum(labels)} spam, {len(labels)-sum(labels)} ham)")
 
@@ -445,10 +977,8 @@ async def initialize_ml_model():
         accuracy = accuracy_score(y_test, y_pred)
         logging.info(f"ML model trained. Test accuracy: {accuracy:.2%}")
 
-        with open(MODEL_PATH, 'wb') as f:
-            pickle.dump(ml_model, f)
-        with open(VECTORIZER_PATH, 'wb') as f:
-            pickle.dump(vectorizer, f)
+        save_artifact(ml_model, MODEL_PATH)
+        save_artifact(vectorizer, VECTORIZER_PATH)
         logging.info("ML model saved to disk.")
 
     except Exception as e:
@@ -470,10 +1000,6 @@ async def seed_database():
             {"domain": "claim-inheritance.biz", "reason": "Inheritance scam domain"},
             {"domain": "irs-tax-urgent.com", "reason": "Fake IRS domain"},
         ]
-        for domain_data in domains_to_seed:
-            existing = await db.blocked_domains.find_one({"domain": domain_data["domain"]})
-            if not existing:
-                await db.blocked_domains.insert_one(domain_data)
 
         numbers_to_seed = [
             {"number": "555-0123", "reason": "Known scam number"},
@@ -481,10 +1007,6 @@ async def seed_database():
             {"number": "+1-555-000-0000", "reason": "Common scam pattern"},
             {"number": "123-456-7890", "reason": "Test scam number"},
         ]
-        for number_data in numbers_to_seed:
-            existing = await db.blocked_numbers.find_one({"number": number_data["number"]})
-            if not existing:
-                await db.blocked_numbers.insert_one(number_data)
 
         messages_to_seed = [
             {"pattern": "congratulations you have won", "reason": "Lottery scam pattern"},
@@ -493,36 +1015,198 @@ async def seed_database():
             {"pattern": "suspended within 24 hours", "reason": "Urgency scam pattern"},
             {"pattern": "final notice", "reason": "Fake authority pattern"},
         ]
-        for message_data in messages_to_seed:
-            existing = await db.blocked_messages.find_one({"pattern": message_data["pattern"]})
-            if not existing:
-                await db.blocked_messages.insert_one(message_data)
 
+        await store.seed_blocklists(domains_to_seed, numbers_to_seed, messages_to_seed)
         logging.info("Database seeded successfully")
     except Exception as e:
         logging.error(f"Database seeding error: {e}")
 
+# ======================================================
+# Near-duplicate Index
+# ======================================================
+
+def is_confirmed_scam(result: dict) -> bool:
+    """A Dangerous text/email scan that was not itself flagged as a near duplicate."""
+    label = scan_codec.label_name(result.get("label"))
+    triggers = result.get("triggers", [])
+    return (label == LABELS[2] and result.get("scan_type") in ('text', 'email')
+            and "Blacklist: near_duplicate_scam" not in triggers
+            and scan_codec.trigger_codes["Blacklist: near_duplicate_scam"] not in triggers)
+
+async def build_near_duplicate_index():
+    """
+    Index the curated blocked_messages patterns. The training dataset's spam
+    is left out: the ML layer already scores text like it, and indexing it
+    would add a second, overlapping signal to ordinary messages.
+    """
+    global near_duplicate_index
+    if NEAR_DUPLICATE_THRESHOLD <= 0:
+        return
+    index = neardup.NearDuplicateIndex(NEAR_DUPLICATE_THRESHOLD)
+    try:
+        async with storage_op("blocked_messages.find"):
+            patterns = await store.blocked_message_patterns(100000)
+        await asyncio.to_thread(index.add_many, patterns, "blocked_messages")
+    except Exception as e:
+        metrics.record_error("near_duplicate")
+        logging.error(f"Near-duplicate index build error: {e}")
+    near_duplicate_index = index
+    metrics.NEAR_DUPLICATE_ENTRIES.set_function(lambda: len(index))
+    logging.info(f"Near-duplicate index holds {len(index)} known scam texts.")
+
+async def backfill_near_duplicates_from_history():
+    """Add the confirmed Dangerous scans already in scan_history to the index."""
+    added = 0
+    try:
+        async for chunk in store.iter_scans(None, datetime.now(timezone.utc), HISTORY_ARCHIVE_CHUNK_SIZE):
+            texts = [doc["content"] for doc in chunk if is_confirmed_scam(doc)]
+            added += await asyncio.to_thread(near_duplicate_index.add_many, texts, "scan_history")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        metrics.record_error("near_duplicate")
+        logging.error(f"Near-duplicate history backfill error: {e}")
+    logging.info(f"Near-duplicate index: added {added} Dangerous scans from scan_history.")
+
 # ======================================================
 # API Endpoints
 # ======================================================
 
-@api_router.post("/scan", response_model=ScanResult)
-async def scan_content(request: ScanRequest):
+def client_id(request: HTTPConnection) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get('x-forwarded-for')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def overloaded_detail(e: admission.Overloaded) -> str:
+    metrics.ADMISSION_REJECTED.labels(e.reason).inc()
+    return "Too many requests" if e.reason == "rate_limited" else "Server is busy, please retry"
+
+def reject_overloaded(e: admission.Overloaded):
+    # Our own storage bulkhead being full is a server-side condition, not the client's rate
+    status_code = 503 if e.reason == "storage_saturated" else 429
+    raise HTTPException(status_code=status_code, detail=overloaded_detail(e),
+                        headers={"Retry-After": e.retry_after_header})
+
+def reject_storage_saturated():
+    """503 with Retry-After for a request whose storage bulkhead wait timed out."""
+    reject_overloaded(admission.Overloaded("storage_saturated", RESOURCE_ACQUIRE_TIMEOUT))
+
+async def admit_scan(request: Request):
+    """Admit a scan request or reject it fast with 429 and Retry-After."""
+    try:
+        admission_controller.admit(client_id(request))
+    except admission.Overloaded as e:
+        reject_overloaded(e)
     try:
-        return await run_scan(request.content, request.scan_type)
+        yield
+    finally:
+        admission_controller.release()
+
+def rate_limit(request: Request):
+    """Per-client rate limiting for endpoints that do not hold a scan slot."""
+    limiter = admission_controller.rate_limiter
+    if limiter.enabled:
+        wait = limiter.check(client_id(request))
+        if wait:
+            reject_overloaded(admission.Overloaded("rate_limited", wait))
+
+def debug_timings(
+    debug_timing: bool = Query(False),
+    x_debug_timing: Optional[str] = Header(None),
+) -> Optional[profiling.ScanTimings]:
+    """Opt-in per-request timing via ?debug_timing=1 or the X-Debug-Timing header."""
+    if debug_timing or (x_debug_timing or '').lower() in ('1', 'true', 'yes'):
+        return profiling.ScanTimings()
+    return None
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def scan_response(result: ScanResult, timings: Optional[profiling.ScanTimings]) -> Response:
+    """Serialize a ScanResult once in pydantic-core instead of re-validating it as response_model."""
+    response = Response(content=result.model_dump_json(), media_type="application/json")
+    if timings:
+        response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+# File types accepted by /api/scan/file and the offline CLI scanner, and their size limit
+SUPPORTED_FILE_TYPES = ['.txt', '.eml', '.csv', '.msg', '.pdf']
+MAX_FILE_BYTES = 1_000_000
+
+def extract_file_content(file_ext: str, content_bytes: bytes) -> str:
+    """Extract scannable text from an uploaded file's bytes."""
+    if file_ext == '.pdf':
+        try:
+            from PyPDF2 import PdfReader
+            pdf_reader = PdfReader(io.BytesIO(content_bytes))
+            content = ""
+            for page in pdf_reader.pages:
+                extracted = page.extract_text()
+                if extracted:
+                    content += extracted + "\n"
+            content = content.strip()
+            if not content:
+                raise HTTPException(status_code=400, detail="Could not extract text from PDF. The PDF may be scanned or image-based.")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logging.error(f"PDF extraction error: {e}")
+            raise HTTPException(status_code=400, detail="Could not read PDF file.")
+    elif file_ext == '.eml':
+        try:
+            content = content_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            content = content_bytes.decode('latin-1')
+        lines = content.split('\n')
+        body_lines = []
+        in_body = False
+        subject = ""
+        for line in lines:
+            if line.lower().startswith('subject:'):
+                subject = line[8:].strip()
+            if line.strip() == '' and not in_body:
+                in_body = True
+                continue
+            if in_body:
+                body_lines.append(line)
+        body = '\n'.join(body_lines).strip()
+        content = f"{subject}\n{body}" if subject else body
+    else:
+        try:
+            content = content_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            content = content_bytes.decode('latin-1')
+
+    return content[:2000].strip()
+
+@api_router.post("/scan", response_model=ScanResult, dependencies=[Depends(admit_scan)])
+async def scan_content(request: ScanRequest,
+                       timings: Optional[profiling.ScanTimings] = Depends(debug_timings)):
+    try:
+        with profiling.profiler.track():
+            result = await run_scan(request.content, request.scan_type, timings)
+        return scan_response(result, timings)
     except HTTPException:
         raise
+    except admission.Overloaded as e:
+        reject_overloaded(e)
     except Exception as e:
+        metrics.record_error("scan")
         logging.error(f"Scan error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during scan")
 
-@api_router.post("/scan/file", response_model=ScanResult)
-async def scan_file(file: UploadFile = File(...)):
+@api_router.post("/scan/file", response_model=ScanResult, dependencies=[Depends(admit_scan)])
+async def scan_file(file: UploadFile = File(...),
+                    timings: Optional[profiling.ScanTimings] = Depends(debug_timings)):
     try:
-        allowed_extensions = ['.txt', '.eml', '.csv', '.msg', '.pdf']
         file_ext = os.path.splitext(file.filename or '')[1].lower()
 
-        if file_ext not in allowed_extensions:
+        if file_ext not in SUPPORTED_FILE_TYPES:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type. Allowed: .txt, .eml, .csv, .msg, .pdf"
@@ -530,93 +1214,207 @@ async def scan_file(file: UploadFile = File(...)):
 
         content_bytes = await file.read()
 
-        if len(content_bytes) > 1_000_000:
+        if len(content_bytes) > MAX_FILE_BYTES:
             raise HTTPException(status_code=400, detail="File too large. Maximum size is 1MB.")
 
-        if file_ext == '.pdf':
-            try:
-                from PyPDF2 import PdfReader
-                pdf_reader = PdfReader(io.BytesIO(content_bytes))
-                content = ""
-                for page in pdf_reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        content += extracted + "\n"
-                content = content.strip()
-                if not content:
-                    raise HTTPException(status_code=400, detail="Could not extract text from PDF. The PDF may be scanned or image-based.")
-            except HTTPException:
-                raise
-            except Exception as e:
-                logging.error(f"PDF extraction error: {e}")
-                raise HTTPException(status_code=400, detail="Could not read PDF file.")
-        elif file_ext == '.eml':
-            try:
-                content = content_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                content = content_bytes.decode('latin-1')
-            lines = content.split('\n')
-            body_lines = []
-            in_body = False
-            subject = ""
-            for line in lines:
-                if line.lower().startswith('subject:'):
-                    subject = line[8:].strip()
-                if line.strip() == '' and not in_body:
-                    in_body = True
-                    continue
-                if in_body:
-                    body_lines.append(line)
-            body = '\n'.join(body_lines).strip()
-            content = f"{subject}\n{body}" if subject else body
-        else:
-            try:
-                content = content_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                content = content_bytes.decode('latin-1')
-
-        content = content[:2000].strip()
+        with profiling.profiler.track():
+            with profiling.stage(timings, "extraction"):
+                content = extract_file_content(file_ext, content_bytes)
 
-        if not content:
-            raise HTTPException(status_code=400, detail="Could not extract text from file.")
+            if not content:
+                raise HTTPException(status_code=400, detail="Could not extract text from file.")
 
-        scan_type = 'email' if file_ext == '.eml' else None
-        return await run_scan(content, scan_type)
+            scan_type = 'email' if file_ext == '.eml' else None
+            result = await run_scan(content, scan_type, timings)
+        return scan_response(result, timings)
 
     except HTTPException:
         raise
+    except admission.Overloaded as e:
+        reject_overloaded(e)
     except Exception as e:
+        metrics.record_error("scan_file")
         logging.error(f"File scan error: {e}")
         raise HTTPException(status_code=500, detail="Failed to process file.")
 
+@api_router.websocket("/ws/scan")
+async def live_scan(websocket: WebSocket):
+    """
+    Live scanning while the user types. Messages from the client:
+      {"type": "text", "text": ...}                       whole text (diffed against the last one)
+      {"type": "edit", "start": i, "end": j, "text": ...}  replace text[i:j]
+      {"type": "submit"}                                   full scan of the current text
+    Any message may carry "scan_type". Once edits pause for
+    LIVE_SCAN_DEBOUNCE_MS an "update" with the rule and ML score is pushed
+    (only when it changed); submit answers with a "result" holding the full
+    ScanResult, including the blacklist and Azure layers.
+    """
+    limiter = admission_controller.rate_limiter
+    if limiter.enabled and limiter.check(client_id(websocket)):
+        metrics.ADMISSION_REJECTED.labels("rate_limited").inc()
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+
+    session = new_live_session()
+    scan_type = None
+    last_update = None
+    deadline = None
+    loop = asyncio.get_running_loop()
+    metrics.LIVE_SCAN_SESSIONS.inc()
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout)
+            except asyncio.TimeoutError:
+                deadline = None
+                started = time.perf_counter()
+                update = evaluate_live_session(session, scan_type)
+                metrics.LIVE_SCAN_UPDATE_LATENCY.observe(time.perf_counter() - started)
+                key = (update["scan_type"], update["risk_score"], update["triggers"])
+                if key != last_update:
+                    last_update = key
+                    await websocket.send_json(update)
+                continue
+            except (ValueError, TypeError, KeyError):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            if "scan_type" in message:
+                scan_type = message["scan_type"] if isinstance(message["scan_type"], str) else None
+            kind = message.get("type")
+            if kind in ("text", "edit"):
+                try:
+                    text = message.get("text", "")
+                    if not isinstance(text, str):
+                        raise livescan.EditError("text must be a string")
+                    if kind == "text":
+                        session.replace(text)
+                    else:
+                        session.edit(int(message["start"]), int(message["end"]), text)
+                except (livescan.EditError, KeyError, ValueError, TypeError) as e:
+                    await websocket.send_json({"type": "error", "detail": f"Invalid edit: {e}"})
+                    continue
+                deadline = loop.time() + LIVE_SCAN_DEBOUNCE_MS / 1000
+            elif kind == "submit":
+                deadline = None
+                await websocket.send_json(await submit_live_scan(websocket, session.text, scan_type))
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        metrics.LIVE_SCAN_SESSIONS.dec()
+
+async def submit_live_scan(websocket: WebSocket, content: str, scan_type: Optional[str]) -> dict:
+    """Run the full scan for a live session, admitted like POST /scan."""
+    try:
+        admission_controller.admit(client_id(websocket))
+    except admission.Overloaded as e:
+        return {"type": "error", "detail": overloaded_detail(e), "retry_after": e.retry_after}
+    try:
+        with profiling.profiler.track():
+            result = await run_scan(content, scan_type)
+        return {"type": "result", "result": result.model_dump(mode="json")}
+    except HTTPException as e:
+        return {"type": "error", "detail": e.detail}
+    except admission.Overloaded as e:
+        return {"type": "error", "detail": overloaded_detail(e), "retry_after": e.retry_after}
+    except Exception as e:
+        metrics.record_error("scan")
+        logging.error(f"Live scan submit error: {e}")
+        return {"type": "error", "detail": "Internal server error during scan"}
+    finally:
+        admission_controller.release()
+
+@api_router.post("/jobs", response_model=ScanJobStatus, status_code=202, dependencies=[Depends(rate_limit)])
+async def submit_scan_job(request: ScanJobRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Job must contain at least one item")
+    if len(request.items) > SCAN_JOB_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Job too large. Maximum is {SCAN_JOB_MAX_ITEMS} items.")
+    try:
+        job = await job_manager.submit([(item.content, item.scan_type) for item in request.items])
+        return ScanJobStatus(**job, **jobs.job_throughput(job))
+    except Exception as e:
+        logging.error(f"Job submission error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to submit scan job")
+
+@api_router.post("/jobs/file", response_model=ScanJobStatus, status_code=202, dependencies=[Depends(rate_limit)])
+async def submit_scan_job_file(file: UploadFile = File(...)):
+    file_ext = os.path.splitext(file.filename or '')[1].lower()
+    if file_ext not in ['.txt', '.csv']:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Allowed: .txt, .csv (one item per line)")
+    content_bytes = await file.read(MAX_FILE_BYTES + 1)
+    if len(content_bytes) > MAX_FILE_BYTES:
+        raise HTTPException(status_code=400, detail="File too large. Maximum size is 1MB.")
+    try:
+        text = content_bytes.decode('utf-8')
+    except UnicodeDecodeError:
+        text = content_bytes.decode('latin-1')
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return await submit_scan_job(ScanJobRequest(items=[ScanRequest(content=line) for line in lines]))
+
+@api_router.get("/jobs/{job_id}", response_model=ScanJobStatus)
+async def get_scan_job(job_id: str):
+    job = await job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@api_router.get("/jobs/{job_id}/results", response_model=ScanJobResults)
+async def get_scan_job_results(job_id: str, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    job = await job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    results = [
+        result if "error" in result else scan_codec.decode(result)
+        for result in await job_manager.get_results(job_id, skip, limit)
+    ]
+    return ScanJobResults(
+        job_id=job_id, status=job["status"], total=job["total"],
+        skip=skip, limit=limit, results=results,
+    )
+
 @api_router.get("/history", response_model=List[HistoryItem])
 async def get_scan_history():
     try:
-        history = await db.scan_history.find().sort("timestamp", -1).limit(10).to_list(10)
-        results = []
-        for item in history:
-            if 'explanation' not in item:
-                item['explanation'] = ""
-            results.append(HistoryItem(**item))
-        return results
+        async with storage_op("scan_history.find"):
+            history = await store.recent_scans(10)
+        return [HistoryItem(**scan_codec.decode(item)) for item in history]
+    except admission.Saturated:
+        reject_storage_saturated()
     except Exception as e:
+        metrics.record_error("history_read")
         logging.error(f"History retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve scan history")
 
 @api_router.get("/stats")
 async def get_stats():
     try:
-        total_scans = await db.scan_history.count_documents({})
-        safe_scans = await db.scan_history.count_documents({"label": "🟢 Safe"})
-        suspicious_scans = await db.scan_history.count_documents({"label": "🟡 Suspicious"})
-        dangerous_scans = await db.scan_history.count_documents({"label": "🔴 Dangerous"})
+        # One pass over the collection, grouped by label code (or legacy label string)
+        async with storage_op("scan_history.aggregate"):
+            groups = await store.count_scans_by_label()
+        counts = {label: 0 for label in LABELS}
+        for stored_label, count in groups.items():
+            label = scan_codec.label_name(stored_label)
+            if label in counts:
+                counts[label] += count
+        total_scans = sum(groups.values())
         return {
             "total_scans": total_scans,
-            "safe_scans": safe_scans,
-            "suspicious_scans": suspicious_scans,
-            "dangerous_scans": dangerous_scans
+            "safe_scans": counts[LABELS[0]],
+            "suspicious_scans": counts[LABELS[1]],
+            "dangerous_scans": counts[LABELS[2]]
         }
+    except admission.Saturated:
+        reject_storage_saturated()
     except Exception as e:
+        metrics.record_error("stats")
         logging.error(f"Stats retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
 
@@ -628,39 +1426,168 @@ async def health_check():
         "training_data": "UCI SMS Spam Collection (5,574 messages)",
         "detection_layers": 4,
         "azure_ai_enabled": bool(AZURE_LANGUAGE_KEY),
+        "sentiment_backend": SENTIMENT_BACKEND,
+        "azure_circuit": azure_circuit.state,
         "supported_scan_types": ["text", "url", "phone", "email", "file"],
-        "supported_file_types": [".txt", ".eml", ".csv", ".msg", ".pdf"]
+        "supported_file_types": SUPPORTED_FILE_TYPES
     }
 
+@api_router.post("/admin/profile", status_code=202, dependencies=[Depends(require_admin)])
+async def start_profile(requests: int = Query(50, ge=1, le=10000),
+                        interval_ms: float = Query(5.0, ge=0.5, le=1000)):
+    """Sample the next N scan requests; fetch the result from GET /api/admin/profile."""
+    try:
+        # start() joins the previous sampler thread; sample this (event loop) thread
+        await asyncio.to_thread(profiling.profiler.start, requests, interval_ms, threading.get_ident())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiling.profiler.snapshot()
+
+@api_router.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile():
+    """Return session status while running, then the collapsed-stack file."""
+    snapshot = profiling.profiler.snapshot()
+    if snapshot["status"] != "completed":
+        return snapshot
+    # Waits for the sampler thread to exit, up to one sampling interval
+    return PlainTextResponse(
+        await asyncio.to_thread(profiling.profiler.collapsed),
+        headers={"Content-Disposition": 'attachment; filename="scamshield.collapsed"'},
+    )
+
+@api_router.delete("/admin/profile", dependencies=[Depends(require_admin)])
+async def cancel_profile():
+    await asyncio.to_thread(profiling.profiler.cancel)
+    return profiling.profiler.snapshot()
+
+@api_router.get("/admin/history/archive", dependencies=[Depends(require_admin)])
+async def search_history_archive(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                 scan_type: Optional[str] = None, label: Optional[str] = None,
+                                 contains: Optional[str] = None,
+                                 limit: int = Query(100, ge=1, le=1000)):
+    """Search scans that have been archived out of the hot window."""
+    return await asyncio.to_thread(
+        retention.query_archive, HISTORY_ARCHIVE_DIR, start, end, scan_type, label, contains, limit,
+        scan_codec.decode,
+    )
+
+@api_router.post("/admin/history/archive", dependencies=[Depends(require_admin)])
+async def run_history_archive():
+    """Archive everything that is due now instead of waiting for the next cycle."""
+    if not retention_manager:
+        raise HTTPException(status_code=409, detail="History retention is disabled in this process")
+    try:
+        return await retention_manager.archive_once()
+    except Exception as e:
+        metrics.record_error("retention")
+        logging.error(f"Manual archival error: {e}")
+        raise HTTPException(status_code=500, detail="Archival failed")
+
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 # ======================================================
 # App Setup
 # ======================================================
 
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
+async def connect_database():
+    """Create and connect the configured storage backend; a store injected beforehand is kept."""
+    global store
+    if store is None:
+        store = storage.create_storage(config.STORAGE_BACKEND, config.MONGO_URL, config.DB_NAME, config.SQLITE_PATH)
+    try:
+        await store.connect()
+        logging.info(f"Storage backend: {store.name}")
+    except Exception as e:
+        metrics.record_error("storage")
+        logging.error(f"Storage backend {store.name} failed to connect: {e}")
+
 async def startup_event():
+    global job_manager, retention_manager, near_duplicate_backfill
+    await connect_database()
     await initialize_ml_model()
     await seed_database()
-    if AZURE_LANGUAGE_KEY:
+    await build_near_duplicate_index()
+    if NEAR_DUPLICATE_FROM_HISTORY and near_duplicate_index is not None:
+        near_duplicate_backfill = asyncio.create_task(backfill_near_duplicates_from_history())
+    job_manager = jobs.JobManager(store, run_scan_batch, SCAN_JOB_CONCURRENCY, SCAN_JOB_CHUNK_SIZE,
+                                  SCAN_JOB_HEARTBEAT_SECONDS, SCAN_JOB_OWNER_TIMEOUT_SECONDS)
+    metrics.JOB_QUEUE_DEPTH.set_function(job_manager.queue.qsize)
+    metrics.ADMISSION_IN_FLIGHT.set_function(lambda: admission_controller.in_flight)
+    metrics.ADMISSION_SATURATION.set_function(lambda: admission_controller.saturation)
+    for bulkhead in (azure_bulkhead, mongo_bulkhead):
+        metrics.RESOURCE_IN_USE.labels(bulkhead.name).set_function(lambda b=bulkhead: b.in_use)
+        metrics.RESOURCE_WAITING.labels(bulkhead.name).set_function(lambda b=bulkhead: b.waiting)
+    metrics.RESOURCE_CIRCUIT_OPEN.labels(azure_circuit.name).set_function(
+        lambda: azure_circuit.state != "closed"
+    )
+    try:
+        await job_manager.start(resume=RESUME_SCAN_JOBS)
+    except Exception as e:
+        logging.error(f"Scan job worker pool failed to start: {e}")
+    if HISTORY_RETENTION_DAYS > 0 and RETENTION_TASK_ENABLED:
+        retention_manager = retention.RetentionManager(
+            store, HISTORY_ARCHIVE_DIR,
+            hot_window=timedelta(days=HISTORY_RETENTION_DAYS),
+            lead=timedelta(hours=HISTORY_ARCHIVE_LEAD_HOURS),
+            interval=HISTORY_ARCHIVE_INTERVAL,
+            chunk_size=HISTORY_ARCHIVE_CHUNK_SIZE,
+        )
+        try:
+            await retention_manager.start()
+        except Exception as e:
+            metrics.record_error("retention")
+            logging.error(f"scan_history retention failed to start: {e}")
+    if SENTIMENT_BACKEND not in ("azure", "local", "auto"):
+        logging.warning(f"Unknown SENTIMENT_BACKEND {SENTIMENT_BACKEND!r} — using Azure only.")
+    if SENTIMENT_BACKEND in ("local", "auto"):
+        get_lexicon_sentiment()
+    if SENTIMENT_BACKEND == "local":
+        logging.info("Layer 4 uses the local sentiment lexicon.")
+    elif AZURE_LANGUAGE_KEY:
         logging.info("Azure AI Language integration enabled.")
+    elif SENTIMENT_BACKEND == "auto":
+        logging.info("Azure AI Language key not set — Layer 4 uses the local sentiment lexicon.")
     else:
         logging.warning("Azure AI Language key not set — Layer 4 disabled.")
 
-@app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    if near_duplicate_backfill:
+        near_duplicate_backfill.cancel()
+        await asyncio.gather(near_duplicate_backfill, return_exceptions=True)
+    if job_manager:
+        await job_manager.stop()
+    if retention_manager:
+        await retention_manager.stop()
+    if azure_client:
+        await azure_client.aclose()
+    if store:
+        await store.close()
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application; the DB client is created on startup."""
+    application = FastAPI(title="ScamShield API", description="Hybrid fraud detection system with Azure AI",
+                          default_response_class=DefaultJSONResponse)
+    application.include_router(api_router)
+    application.add_api_route("/metrics", prometheus_metrics, include_in_schema=False)
+    # Unprefixed liveness probe for load balancers and autoscalers
+    application.add_api_route("/health", health_check, include_in_schema=False)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    application.add_event_handler("startup", startup_event)
+    application.add_event_handler("shutdown", shutdown_db_client)
+    return application
+
+app = create_app()
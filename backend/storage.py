@@ -0,0 +1,696 @@
+"""
+storage.py — Persistence backends for the ScamShield backend.
+Storage is the interface the API, batch jobs and retention use for the
+blacklist, scan history, job and archive-state data. MongoStorage wraps
+Motor; SQLiteStorage is an embedded single-file engine (WAL mode) for
+single-node deployments, tests and benchmarks with no external services.
+"""
+
+import asyncio
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+RETENTION_STATE_ID = "scan_history"
+
+
+class Storage(ABC):
+    """
+    Interface implemented by every backend. Documents are plain dicts.
+    connect and close have no-op defaults; a backend missing any other
+    method cannot be instantiated.
+    """
+
+    name = "base"
+
+    async def connect(self):
+        """Open connections and create the schema and indexes."""
+
+    async def close(self):
+        """Release connections."""
+
+    # --------------------------------------------------
+    # Blacklist
+    # --------------------------------------------------
+
+    @abstractmethod
+    async def find_blocked_number(self, number: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_blocked_domain(self, domain: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def blocked_message_patterns(self, limit: int) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def seed_blocklists(self, domains: List[dict], numbers: List[dict], messages: List[dict]):
+        """Insert the entries that are not stored yet; existing ones are left untouched."""
+        raise NotImplementedError
+
+    # --------------------------------------------------
+    # Scan history
+    # --------------------------------------------------
+
+    @abstractmethod
+    async def insert_scan(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def recent_scans(self, limit: int) -> List[dict]:
+        """Newest stored scan documents first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_scans_by_label(self) -> Dict[object, int]:
+        """Number of stored scans per stored label value."""
+        raise NotImplementedError
+
+    # --------------------------------------------------
+    # Retention
+    # --------------------------------------------------
+
+    @abstractmethod
+    async def expire_scans(self, before: datetime) -> int:
+        """Delete scans older than `before`; called only once they are archived."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_scans(self, start: Optional[datetime], end: datetime, batch_size: int) -> AsyncIterator[List[dict]]:
+        """Yield scans with start <= timestamp < end, oldest first, in batches."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_archive_watermark(self) -> Optional[datetime]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_archive_watermark(self, value: datetime):
+        raise NotImplementedError
+
+    # --------------------------------------------------
+    # Batch jobs
+    # --------------------------------------------------
+
+    @abstractmethod
+    async def insert_job(self, job: dict, items: List[Tuple[str, Optional[str]]]):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_job(self, job_id: str, set_fields: Optional[dict] = None,
+                         inc_fields: Optional[dict] = None, expected_status: Optional[str] = None):
+        """Set and increment job fields, optionally only while the job has `expected_status`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def unfinished_jobs(self, statuses: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def touch_jobs(self, owner: str, statuses: List[str], now: datetime):
+        """Set heartbeat_at to `now` on every job in `statuses` owned by `owner`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim_job(self, job_id: str, owner: str, previous_owner: Optional[str], now: datetime) -> bool:
+        """Hand the job to `owner` if `previous_owner` still owns it; return whether it was claimed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def job_items(self, job_id: str, start: int, end: int) -> List[dict]:
+        """Items with start <= index < end as {"index", "content", "scan_type"}, in order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_job_items(self, job_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_job_results(self, job_id: str, chunk: int, results: List[Tuple[int, dict]]):
+        """Store (index, result) pairs; results already stored for an index are kept."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def job_result_counts(self, job_id: str) -> Dict[int, int]:
+        """Number of stored results per chunk start, for chunks with any results."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def job_results(self, job_id: str, skip: int, limit: int) -> List[dict]:
+        """Stored results with their "index", ordered by index."""
+        raise NotImplementedError
+
+
+def _item_id(job_id: str, index: int) -> str:
+    return f"{job_id}:{index}"
+
+
+class MongoStorage(Storage):
+    """MongoDB through Motor; motor is imported when the client is created."""
+
+    name = "mongo"
+
+    def __init__(self, mongo_url: str, db_name: str, db=None,
+                 server_selection_timeout_ms: Optional[int] = None):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        # None keeps Motor's default (30s) wait for a reachable server
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+        self.client = None
+        # A database handle passed in (e.g. a mock) is used as-is
+        self.db = db
+
+    async def connect(self):
+        if self.db is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            options = {}
+            if self.server_selection_timeout_ms is not None:
+                options["serverSelectionTimeoutMS"] = self.server_selection_timeout_ms
+            self.client = AsyncIOMotorClient(self.mongo_url, **options)
+            self.db = self.client[self.db_name]
+        await self.db.blocked_domains.create_index("domain")
+        await self.db.blocked_numbers.create_index("number")
+        await self.db.blocked_messages.create_index("pattern")
+        if "scan_history_ttl" in await self.db.scan_history.index_information():
+            # Earlier releases expired scans with a TTL index, which also deleted
+            # scans the archiver had not written yet; expire_scans() does it now
+            await self.db.scan_history.drop_index("scan_history_ttl")
+        # Same scan_history indexes as SQLite: recent_scans sorts on timestamp,
+        # count_scans_by_label groups on label, expire_scans ranges on timestamp
+        await self.db.scan_history.create_index("timestamp", name="scan_history_timestamp")
+        await self.db.scan_history.create_index("label", name="scan_history_label")
+        await self.db.scan_jobs.create_index("id", unique=True)
+        await self.db.scan_job_items.create_index([("job_id", 1), ("index", 1)])
+        await self.db.scan_job_results.create_index([("job_id", 1), ("index", 1)])
+
+    async def close(self):
+        if self.client:
+            self.client.close()
+
+    async def find_blocked_number(self, number):
+        return await self.db.blocked_numbers.find_one({"number": number}, {"_id": 0})
+
+    async def find_blocked_domain(self, domain):
+        return await self.db.blocked_domains.find_one({"domain": domain}, {"_id": 0})
+
+    async def blocked_message_patterns(self, limit):
+        docs = await self.db.blocked_messages.find({}, {"_id": 0, "pattern": 1}).to_list(limit)
+        return [doc["pattern"] for doc in docs if doc.get("pattern")]
+
+    async def seed_blocklists(self, domains, numbers, messages):
+        for collection, key, docs in (
+            (self.db.blocked_domains, "domain", domains),
+            (self.db.blocked_numbers, "number", numbers),
+            (self.db.blocked_messages, "pattern", messages),
+        ):
+            for doc in docs:
+                await collection.update_one({key: doc[key]}, {"$setOnInsert": doc}, upsert=True)
+
+    async def insert_scan(self, doc):
+        await self.db.scan_history.insert_one(dict(doc))
+
+    async def recent_scans(self, limit):
+        return await self.db.scan_history.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+
+    async def count_scans_by_label(self):
+        groups = await self.db.scan_history.aggregate(
+            [{"$group": {"_id": "$label", "count": {"$sum": 1}}}]
+        ).to_list(None)
+        return {group["_id"]: group["count"] for group in groups}
+
+    async def expire_scans(self, before):
+        result = await self.db.scan_history.delete_many({"timestamp": {"$lt": before}})
+        return result.deleted_count
+
+    async def iter_scans(self, start, end, batch_size):
+        query = {"timestamp": {"$lt": end}}
+        if start:
+            query["timestamp"]["$gte"] = start
+        cursor = self.db.scan_history.find(query, {"_id": 0}).sort("timestamp", 1).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def get_archive_watermark(self):
+        state = await self.db.retention_state.find_one({"_id": RETENTION_STATE_ID})
+        return state["archived_until"] if state else None
+
+    async def set_archive_watermark(self, value):
+        await self.db.retention_state.update_one(
+            {"_id": RETENTION_STATE_ID}, {"$set": {"archived_until": value}}, upsert=True
+        )
+
+    async def insert_job(self, job, items):
+        docs = [
+            {"_id": _item_id(job["id"], i), "job_id": job["id"], "index": i, "content": content, "scan_type": scan_type}
+            for i, (content, scan_type) in enumerate(items)
+        ]
+        for start in range(0, len(docs), 1000):
+            await self.db.scan_job_items.insert_many(docs[start:start + 1000])
+        await self.db.scan_jobs.insert_one(dict(job))
+
+    async def get_job(self, job_id):
+        return await self.db.scan_jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def update_job(self, job_id, set_fields=None, inc_fields=None, expected_status=None):
+        query = {"id": job_id}
+        if expected_status:
+            query["status"] = expected_status
+        update = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if inc_fields:
+            update["$inc"] = inc_fields
+        await self.db.scan_jobs.update_one(query, update)
+
+    async def unfinished_jobs(self, statuses):
+        return await self.db.scan_jobs.find({"status": {"$in": statuses}}, {"_id": 0}).to_list(None)
+
+    async def touch_jobs(self, owner, statuses, now):
+        await self.db.scan_jobs.update_many(
+            {"owner": owner, "status": {"$in": statuses}}, {"$set": {"heartbeat_at": now}}
+        )
+
+    async def claim_job(self, job_id, owner, previous_owner, now):
+        # {"owner": None} also matches jobs stored before owners were recorded
+        result = await self.db.scan_jobs.update_one(
+            {"id": job_id, "owner": previous_owner}, {"$set": {"owner": owner, "heartbeat_at": now}}
+        )
+        return result.modified_count == 1
+
+    async def job_items(self, job_id, start, end):
+        return await (
+            self.db.scan_job_items.find(
+                {"job_id": job_id, "index": {"$gte": start, "$lt": end}},
+                {"_id": 0, "index": 1, "content": 1, "scan_type": 1},
+            )
+            .sort("index", 1)
+            .to_list(end - start)
+        )
+
+    async def delete_job_items(self, job_id):
+        await self.db.scan_job_items.delete_many({"job_id": job_id})
+
+    async def insert_job_results(self, job_id, chunk, results):
+        from pymongo.errors import BulkWriteError
+
+        docs = [
+            {"_id": _item_id(job_id, index), "job_id": job_id, "chunk": chunk, "index": index, **result}
+            for index, result in results
+        ]
+        try:
+            await self.db.scan_job_results.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # A chunk interrupted by a restart may already be partially stored
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def job_result_counts(self, job_id):
+        cursor = self.db.scan_job_results.aggregate([
+            {"$match": {"job_id": job_id}},
+            {"$group": {"_id": "$chunk", "count": {"$sum": 1}}},
+        ])
+        return {group["_id"]: group["count"] async for group in cursor}
+
+    async def job_results(self, job_id, skip, limit):
+        cursor = (
+            self.db.scan_job_results.find({"job_id": job_id}, {"_id": 0, "job_id": 0, "chunk": 0})
+            .sort("index", 1)
+            .skip(skip)
+            .limit(limit)
+        )
+        return await cursor.to_list(limit)
+
+
+# --------------------------------------------------
+# Embedded SQLite engine
+# --------------------------------------------------
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocked_domains (domain TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blocked_numbers (number TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blocked_messages (pattern TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS scan_history (
+    id TEXT PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    label,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_history_timestamp ON scan_history (timestamp);
+CREATE INDEX IF NOT EXISTS scan_history_label ON scan_history (label);
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL,
+    scan_time_ms REAL NOT NULL DEFAULT 0,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS scan_jobs_status ON scan_jobs (status);
+CREATE TABLE IF NOT EXISTS scan_job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    content TEXT,
+    scan_type TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS scan_job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    chunk INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS retention_state (id TEXT PRIMARY KEY, archived_until REAL);
+"""
+
+JOB_COLUMNS = ("id", "status", "total", "processed", "failed", "chunk_size",
+               "scan_time_ms", "created_at", "started_at", "finished_at", "error",
+               "owner", "heartbeat_at")
+JOB_TIME_COLUMNS = ("created_at", "started_at", "finished_at", "heartbeat_at")
+# Columns added after the first release, with their types, for existing database files
+SQLITE_ADDED_COLUMNS = {"scan_jobs": (("owner", "TEXT"), ("heartbeat_at", "REAL"))}
+
+
+def _to_epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_epoch(value: Optional[float]) -> Optional[datetime]:
+    """Naive UTC, matching what Motor returns for stored dates."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def _scan_from_row(timestamp: float, doc: str) -> dict:
+    scan = json.loads(doc)
+    scan["timestamp"] = _from_epoch(timestamp)
+    return scan
+
+
+class SQLiteStorage(Storage):
+    """
+    Embedded storage in a single SQLite file (or ":memory:"). All statements
+    run on one dedicated thread so the event loop never blocks on disk I/O;
+    WAL mode lets other processes (extra workers, investigations) read while
+    this one writes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.conn: Optional[sqlite3.Connection] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(SQLITE_SCHEMA)
+        for table, columns in SQLITE_ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self.conn = conn
+
+    async def connect(self):
+        if self.conn is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+            await self._run(self._connect)
+
+    async def close(self):
+        if self.conn is not None:
+            await self._run(self.conn.close)
+            self.conn = None
+            self.executor.shutdown(wait=False)
+
+    def _fetchone(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql, params=()):
+        return self.conn.execute(sql, params).rowcount
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _executemany(self, sql, rows):
+        with self._transaction():
+            self.conn.executemany(sql, rows)
+
+    # Blacklist
+
+    async def find_blocked_number(self, number):
+        row = await self._run(self._fetchone, "SELECT doc FROM blocked_numbers WHERE number = ?", (number,))
+        return json.loads(row[0]) if row else None
+
+    async def find_blocked_domain(self, domain):
+        row = await self._run(self._fetchone, "SELECT doc FROM blocked_domains WHERE domain = ?", (domain,))
+        return json.loads(row[0]) if row else None
+
+    async def blocked_message_patterns(self, limit):
+        rows = await self._run(self._fetchall, "SELECT pattern FROM blocked_messages LIMIT ?", (limit,))
+        return [row[0] for row in rows if row[0]]
+
+    async def seed_blocklists(self, domains, numbers, messages):
+        for table, key, docs in (
+            ("blocked_domains", "domain", domains),
+            ("blocked_numbers", "number", numbers),
+            ("blocked_messages", "pattern", messages),
+        ):
+            await self._run(
+                self._executemany,
+                f"INSERT OR IGNORE INTO {table} ({key}, doc) VALUES (?, ?)",
+                [(doc[key], json.dumps(doc)) for doc in docs],
+            )
+
+    # Scan history
+
+    async def insert_scan(self, doc):
+        body = {key: value for key, value in doc.items() if key != "timestamp"}
+        await self._run(
+            self._execute,
+            "INSERT INTO scan_history (id, timestamp, label, doc) VALUES (?, ?, ?, ?)",
+            (doc["id"], _to_epoch(doc["timestamp"]), doc["label"], json.dumps(body, ensure_ascii=False)),
+        )
+
+    async def recent_scans(self, limit):
+        rows = await self._run(
+            self._fetchall, "SELECT timestamp, doc FROM scan_history ORDER BY timestamp DESC LIMIT ?", (limit,)
+        )
+        return [_scan_from_row(*row) for row in rows]
+
+    async def count_scans_by_label(self):
+        rows = await self._run(self._fetchall, "SELECT label, COUNT(*) FROM scan_history GROUP BY label")
+        return dict(rows)
+
+    # Retention
+
+    async def expire_scans(self, before):
+        return await self._run(self._execute, "DELETE FROM scan_history WHERE timestamp < ?", (_to_epoch(before),))
+
+    async def iter_scans(self, start, end, batch_size):
+        # Keyset pagination on (timestamp, id) so each batch is one short query
+        after = (_to_epoch(start) if start else float("-inf"), "")
+        end_epoch = _to_epoch(end)
+        while True:
+            rows = await self._run(
+                self._fetchall,
+                "SELECT timestamp, id, doc FROM scan_history "
+                "WHERE (timestamp, id) > (?, ?) AND timestamp < ? ORDER BY timestamp, id LIMIT ?",
+                (after[0], after[1], end_epoch, batch_size),
+            )
+            if not rows:
+                return
+            yield [_scan_from_row(timestamp, doc) for timestamp, _, doc in rows]
+            after = rows[-1][:2]
+
+    async def get_archive_watermark(self):
+        row = await self._run(
+            self._fetchone, "SELECT archived_until FROM retention_state WHERE id = ?", (RETENTION_STATE_ID,)
+        )
+        return _from_epoch(row[0]) if row else None
+
+    async def set_archive_watermark(self, value):
+        await self._run(
+            self._execute,
+            "INSERT INTO retention_state (id, archived_until) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET archived_until = excluded.archived_until",
+            (RETENTION_STATE_ID, _to_epoch(value)),
+        )
+
+    # Batch jobs
+
+    def _insert_job(self, job, items):
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT INTO scan_job_items (job_id, idx, content, scan_type) VALUES (?, ?, ?, ?)",
+                [(job["id"], i, content, scan_type) for i, (content, scan_type) in enumerate(items)],
+            )
+            values = [
+                _to_epoch(job.get(column)) if column in JOB_TIME_COLUMNS else job.get(column)
+                for column in JOB_COLUMNS
+            ]
+            self.conn.execute(
+                f"INSERT INTO scan_jobs ({', '.join(JOB_COLUMNS)}) VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                values,
+            )
+
+    async def insert_job(self, job, items):
+        await self._run(self._insert_job, job, items)
+
+    @staticmethod
+    def _job_from_row(row) -> dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        for column in JOB_TIME_COLUMNS:
+            job[column] = _from_epoch(job[column])
+        if job["error"] is None:
+            del job["error"]
+        return job
+
+    async def get_job(self, job_id):
+        row = await self._run(
+            self._fetchone, f"SELECT {', '.join(JOB_COLUMNS)} FROM scan_jobs WHERE id = ?", (job_id,)
+        )
+        return self._job_from_row(row) if row else None
+
+    async def update_job(self, job_id, set_fields=None, inc_fields=None, expected_status=None):
+        assignments, params = [], []
+        for column, value in (set_fields or {}).items():
+            if column not in JOB_COLUMNS:
+                raise ValueError(f"Unknown job field: {column}")
+            assignments.append(f"{column} = ?")
+            params.append(_to_epoch(value) if column in JOB_TIME_COLUMNS else value)
+        for column, value in (inc_fields or {}).items():
+            if column not in JOB_COLUMNS:
+                raise ValueError(f"Unknown job field: {column}")
+            assignments.append(f"{column} = {column} + ?")
+            params.append(value)
+        if not assignments:
+            return
+        sql = f"UPDATE scan_jobs SET {', '.join(assignments)} WHERE id = ?"
+        params.append(job_id)
+        if expected_status:
+            sql += " AND status = ?"
+            params.append(expected_status)
+        await self._run(self._execute, sql, params)
+
+    async def unfinished_jobs(self, statuses):
+        rows = await self._run(
+            self._fetchall,
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM scan_jobs WHERE status IN ({', '.join('?' * len(statuses))})",
+            list(statuses),
+        )
+        return [self._job_from_row(row) for row in rows]
+
+    async def touch_jobs(self, owner, statuses, now):
+        await self._run(
+            self._execute,
+            f"UPDATE scan_jobs SET heartbeat_at = ? WHERE owner = ? AND status IN ({', '.join('?' * len(statuses))})",
+            [_to_epoch(now), owner, *statuses],
+        )
+
+    async def claim_job(self, job_id, owner, previous_owner, now):
+        claimed = await self._run(
+            self._execute,
+            "UPDATE scan_jobs SET owner = ?, heartbeat_at = ? WHERE id = ? AND owner IS ?",
+            (owner, _to_epoch(now), job_id, previous_owner),
+        )
+        return claimed == 1
+
+    async def job_items(self, job_id, start, end):
+        rows = await self._run(
+            self._fetchall,
+            "SELECT idx, content, scan_type FROM scan_job_items WHERE job_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+            (job_id, start, end),
+        )
+        return [{"index": idx, "content": content, "scan_type": scan_type} for idx, content, scan_type in rows]
+
+    async def delete_job_items(self, job_id):
+        await self._run(self._execute, "DELETE FROM scan_job_items WHERE job_id = ?", (job_id,))
+
+    async def insert_job_results(self, job_id, chunk, results):
+        rows = []
+        for index, result in results:
+            body = dict(result)
+            if "timestamp" in body:
+                body["timestamp"] = _to_epoch(body["timestamp"])
+            rows.append((job_id, index, chunk, json.dumps(body, ensure_ascii=False)))
+        await self._run(
+            self._executemany,
+            "INSERT OR IGNORE INTO scan_job_results (job_id, idx, chunk, doc) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    async def job_result_counts(self, job_id):
+        rows = await self._run(
+            self._fetchall, "SELECT chunk, COUNT(*) FROM scan_job_results WHERE job_id = ? GROUP BY chunk", (job_id,)
+        )
+        return dict(rows)
+
+    async def job_results(self, job_id, skip, limit):
+        rows = await self._run(
+            self._fetchall,
+            "SELECT idx, doc FROM scan_job_results WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+            (job_id, limit, skip),
+        )
+        results = []
+        for idx, doc in rows:
+            result = json.loads(doc)
+            if "timestamp" in result:
+                result["timestamp"] = _from_epoch(result["timestamp"])
+            results.append({"index": idx, **result})
+        return results
+
+
+def create_storage(backend: str, mongo_url: str, db_name: str, sqlite_path: str,
+                   mongo_timeout_ms: Optional[int] = None) -> Storage:
+    """Build the storage backend named by STORAGE_BACKEND."""
+    if backend == "mongo":
+        return MongoStorage(mongo_url, db_name, server_selection_timeout_ms=mongo_timeout_ms)
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r} (expected 'mongo' or 'sqlite')")
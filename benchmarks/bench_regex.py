@@ -0,0 +1,131 @@
+"""
+bench_regex.py — Worst-case latency harness for the rule-layer patterns.
+
+Feeds apply_rule_layer adversarial inputs built to make backtracking
+regexes blow up (repeated pattern prefixes with the closing word missing,
+long alphanumeric runs) plus seeded random fuzz over the pattern
+vocabulary, at growing input sizes. The length cap is disabled while
+measuring so the raw matcher is what gets timed.
+
+Fails (exit 1) when the cost per character at the largest size grows
+more than --max-growth times over the smallest size, i.e. when matching
+is no longer linear in the input length.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_regex
+    python -m benchmarks.bench_regex --sizes 1000,4000,16000 --fuzz 500
+    python -m benchmarks.bench_regex --unbounded   # legacy .* gaps, for comparison
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from backend import server
+from backend.features import extract_features
+
+# Words that open a gap in one of the rule patterns, and their closers
+PREFIXES = ["won ", "you won ", "claim ", "code ", "pin ", "verify ", "bank ", "credit ",
+            "social ", "tax ", "legal ", "click ", "download ", "open ", "selected ", "investment "]
+FUZZ_VOCABULARY = PREFIXES + ["prize ", "$", "1234 ", "account ", "here ", "now ", "link ",
+                              "a", "0", ".", " ", "\n", "urgent ", "x" * 25]
+
+
+def adversarial_inputs(size: int) -> dict:
+    """Inputs of `size` characters that maximise backtracking for each rule shape."""
+    inputs = {prefix.strip().replace(" ", "_"): (prefix * (size // len(prefix) + 1))[:size] for prefix in PREFIXES}
+    inputs["alnum_run"] = "a" * size
+    inputs["digit_run"] = "1" * size
+    inputs["url_alnum_run"] = "http://" + "a" * (size - 7)
+    inputs["mixed_prefixes"] = ("".join(PREFIXES) * (size // len("".join(PREFIXES)) + 1))[:size]
+    return inputs
+
+
+def fuzz_inputs(count: int, size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(count):
+        parts = []
+        length = 0
+        while length < size:
+            token = rng.choice(FUZZ_VOCABULARY)
+            parts.append(token)
+            length += len(token)
+        inputs.append("".join(parts)[:size])
+    return inputs
+
+
+def time_rules(text: str, repeat: int) -> float:
+    """Best-of-N seconds for the rule layer on one input, as text and as a URL."""
+    feats = extract_features(text)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        server.apply_rule_layer(feats, "text")
+        server.apply_rule_layer(feats, "url")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def use_unbounded_patterns():
+    """Swap in the pre-bounded pattern shapes (.* gaps, open-ended runs)."""
+    gap = re.escape(server.GAP)
+    server.COMPILED_SCAM_PATTERNS = [
+        (category, re.compile(re.sub(gap, ".*", pattern.pattern)), trigger)
+        for category, pattern, trigger in server.COMPILED_SCAM_PATTERNS
+    ]
+    server.SUSPICIOUS_URL_RE = re.compile(
+        server.SUSPICIOUS_URL_RE.pattern.replace("{20}", "{20,}").replace("{10}", "{10,}")
+    )
+
+
+def run(args) -> dict:
+    server.RULE_MATCH_MAX_CHARS = sys.maxsize
+    if args.unbounded:
+        use_unbounded_patterns()
+
+    report = {}
+    for size in args.sizes:
+        worst_name, worst = None, 0.0
+        for name, text in adversarial_inputs(size).items():
+            elapsed = time_rules(text, args.repeat)
+            if elapsed > worst:
+                worst_name, worst = name, elapsed
+        for i, text in enumerate(fuzz_inputs(args.fuzz, size, args.seed + size)):
+            elapsed = time_rules(text, 1)
+            if elapsed > worst:
+                worst_name, worst = f"fuzz#{i}", elapsed
+        report[size] = {"worst_ms": worst * 1000, "ns_per_char": worst * 1e9 / size, "input": worst_name}
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rule pattern worst-case latency harness")
+    parser.add_argument("--sizes", default="1000,2000,8000,32000",
+                        type=lambda s: [int(x) for x in s.split(",")])
+    parser.add_argument("--fuzz", type=int, default=200, help="random inputs per size")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per adversarial input (best kept)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--max-growth", type=float, default=4.0,
+                        help="allowed growth of ns/char from the smallest to the largest size")
+    parser.add_argument("--unbounded", action="store_true", help="measure the legacy unbounded patterns")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print(f"{'chars':>8} {'worst ms':>10} {'ns/char':>10}  worst input")
+    for size, row in report.items():
+        print(f"{size:>8} {row['worst_ms']:>10.3f} {row['ns_per_char']:>10.1f}  {row['input']}")
+
+    sizes = sorted(report)
+    growth = report[sizes[-1]]["ns_per_char"] / report[sizes[0]]["ns_per_char"]
+    print(f"ns/char growth {sizes[0]} -> {sizes[-1]} chars: {growth:.2f}x (limit {args.max_growth:.2f}x)")
+    if growth > args.max_growth:
+        print("NOT LINEAR: worst-case matching cost grows faster than the input")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
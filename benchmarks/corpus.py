@@ -0,0 +1,104 @@
+"""
+corpus.py — Reproducible benchmark corpus for the detection pipeline.
+Uses the UCI SMS Spam Collection (backend/sms_spam.tsv) when it has been
+downloaded, otherwise a seeded synthetic message set, plus synthetic
+URLs and phone numbers.
+"""
+
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+SMS_DATASET_PATH = Path(__file__).resolve().parent.parent / "backend" / "sms_spam.tsv"
+
+SPAM_TEMPLATES = [
+    "URGENT: Your account will be suspended within {n} hours. Click here to verify: {url}",
+    "Congratulations! You have won ${amount} in our lottery. Claim your prize now at {url}",
+    "Your verification code is {code}. Do not share this code with anyone.",
+    "IRS notice: legal action will be taken unless you pay ${amount} today. Call {phone}",
+    "Dear customer, we have detected unusual activity. Confirm your account details at {url}",
+    "FREE entry to win a {item}! Text WIN to {short} now. Limited time offer!",
+    "Final notice: your {item} subscription has expired. Update your billing information here {url}",
+    "You have been selected as a winner of a {item}. Reply with your bank details to claim.",
+]
+
+HAM_TEMPLATES = [
+    "Hey, are we still meeting for lunch at {hour}?",
+    "Can you pick up some {item} on your way home?",
+    "The meeting has been moved to {hour} tomorrow, see you there.",
+    "Thanks for the {item}, it was really thoughtful of you.",
+    "I'll call you back after class, around {hour}.",
+    "Don't forget mom's birthday dinner on {day}.",
+    "Running {n} minutes late, sorry! Start without me.",
+    "Did you finish the assignment for {day}? I'm stuck on question {n}.",
+]
+
+ITEMS = ["iPhone", "gift card", "cruise", "laptop", "groceries", "book", "ticket", "coffee"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DOMAINS = ["google.com", "github.com", "example.org", "university.edu", "news.net"]
+SCAM_HOSTS = [
+    "scam-bank-verify.com", "fake-lottery.net", "secure-login-update.info",
+    "192.168.14.3", "a8f3k2m9x7q1w5e4r6t0y.biz", "1234567890123.net",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        n=rng.randint(1, 72),
+        amount=f"{rng.randint(100, 5_000_000):,}",
+        code=rng.randint(1000, 999999),
+        url=synthetic_url(rng, scam=True),
+        phone=synthetic_phone(rng),
+        short=rng.randint(80000, 89999),
+        item=rng.choice(ITEMS),
+        hour=f"{rng.randint(1, 12)} PM",
+        day=rng.choice(DAYS),
+    )
+
+
+def synthetic_url(rng: random.Random, scam: bool = False) -> str:
+    host = rng.choice(SCAM_HOSTS if scam else DOMAINS)
+    path = "/".join(rng.choice(["login", "verify", "account", "docs", "news", "id"]) for _ in range(rng.randint(0, 3)))
+    return f"{rng.choice(['http', 'https'])}://{host}/{path}"
+
+
+def synthetic_phone(rng: random.Random) -> str:
+    style = rng.randint(0, 3)
+    if style == 0:
+        return f"{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    if style == 1:
+        return f"+1-{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    if style == 2:
+        return f"({rng.randint(200, 999)}) {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+    return str(rng.randint(10000, 99999))
+
+
+def load_messages(limit: int, seed: int = 42) -> List[Tuple[str, int]]:
+    """Return up to `limit` (text, is_spam) pairs."""
+    rng = random.Random(seed)
+    messages = []
+    if SMS_DATASET_PATH.exists():
+        with open(SMS_DATASET_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.strip().split("\t")
+                if len(parts) == 2:
+                    messages.append((parts[1], 1 if parts[0] == "spam" else 0))
+        rng.shuffle(messages)
+        return messages[:limit]
+    for i in range(limit):
+        spam = i % 4 == 0
+        template = rng.choice(SPAM_TEMPLATES if spam else HAM_TEMPLATES)
+        messages.append((_fill(template, rng), 1 if spam else 0))
+    return messages
+
+
+def build_corpus(messages: int = 1000, urls: int = 200, phones: int = 200, seed: int = 42) -> dict:
+    """Build the benchmark corpus: labelled messages plus URL and phone inputs."""
+    rng = random.Random(seed)
+    texts = load_messages(messages, seed)
+    return {
+        "messages": texts,
+        "urls": [synthetic_url(rng, scam=rng.random() < 0.5) for _ in range(urls)],
+        "phones": [synthetic_phone(rng) for _ in range(phones)],
+        "source": "sms_spam.tsv" if SMS_DATASET_PATH.exists() else "synthetic",
+    }
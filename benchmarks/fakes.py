@@ -0,0 +1,61 @@
+"""
+fakes.py — In-process stand-ins for the external services used by run_scan.
+MockAzureServer is a local HTTP server returning canned sentiment results;
+storage is covered by the embedded SQLite backend.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockAzureServer:
+    """Serves fixed Azure AI Language sentiment scores for every posted document on 127.0.0.1."""
+
+    def __init__(self, negative: float = 0.85, positive: float = 0.05, latency_ms: float = 0.0):
+        scores = {
+            "sentiment": "negative" if negative > positive else "positive",
+            "confidenceScores": {"negative": negative, "neutral": 1 - negative - positive, "positive": positive},
+        }
+        delay = latency_ms / 1000
+        self.requests = 0
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                mock.requests += 1
+                documents = request.get("analysisInput", {}).get("documents", [{"id": "1"}])
+                body = json.dumps({
+                    "kind": "SentimentAnalysisResults",
+                    "results": {"documents": [{"id": doc["id"], **scores} for doc in documents]},
+                }).encode()
+                if delay:
+                    time.sleep(delay)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,238 @@
+"""
+loadgen.py — Concurrent load generator for a running ScamShield server.
+
+Replays a weighted mix of text, URL, phone, email and file scans either
+with a fixed number of concurrent clients (closed loop) or at a target
+arrival rate (open loop), then reports throughput and p50/p95/p99 latency
+per endpoint. In rate mode latency is measured from each request's
+scheduled start, so a saturated server is not hidden by the generator
+slowing down (coordinated omission).
+
+Usage (from the repository root, server on localhost:8000):
+    python -m benchmarks.loadgen --concurrency 32 --duration 30
+    python -m benchmarks.loadgen --rate 200 --duration 60 --mix text=60,url=20,file=20
+    python -m benchmarks.loadgen --concurrency 64 --label workers=4 --json results/w4.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.corpus import load_messages, synthetic_phone, synthetic_url
+
+DEFAULT_MIX = "text=50,url=20,phone=15,email=10,file=5"
+
+EMAIL_TEMPLATES = [
+    "Subject: Account notice\nFrom: security@{host}\n\nDear customer, we have detected unusual activity. "
+    "Confirm your identity at {url} within 24 hours.\n\nRegards,\nSecurity Team",
+    "Subject: Lunch\nFrom: sam@{host}\n\nHi! Are we still on for Friday? Let me know.\n\nThanks,\nSam",
+    "Subject: Invoice #{n}\nFrom: billing@{host}\n\nPlease find your invoice attached. "
+    "Update your billing information here: {url}\n\nSincerely,\nBilling",
+]
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("text", "url", "phone", "email", "file"):
+            raise ValueError(f"Unknown scan kind in mix: {kind!r}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+class PayloadFactory:
+    """Builds request payloads for each scan kind from the benchmark corpus."""
+
+    def __init__(self, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.messages = [text for text, _ in load_messages(2000, seed)]
+
+    def email(self) -> str:
+        return self.rng.choice(EMAIL_TEMPLATES).format(
+            host=self.rng.choice(["example.com", "bank-secure.net", "school.edu"]),
+            url=synthetic_url(self.rng, scam=True),
+            n=self.rng.randint(1000, 9999),
+        )
+
+    def request(self, kind: str) -> tuple:
+        """Return (endpoint, httpx request kwargs)."""
+        if kind == "file":
+            if self.rng.random() < 0.5:
+                return "/api/scan/file", {"files": {"file": ("message.txt", self.rng.choice(self.messages).encode(), "text/plain")}}
+            return "/api/scan/file", {"files": {"file": ("message.eml", self.email().encode(), "message/rfc822")}}
+        content = {
+            "text": lambda: self.rng.choice(self.messages),
+            "url": lambda: synthetic_url(self.rng, scam=self.rng.random() < 0.5),
+            "phone": lambda: synthetic_phone(self.rng),
+            "email": self.email,
+        }[kind]()
+        return "/api/scan", {"json": {"content": content}}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least pct% of samples at or below it."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, key: str, latency_s: float, status):
+        self.latencies[key].append(latency_s * 1000)
+        if status is None:
+            self.errors[key] += 1
+        else:
+            self.statuses[key][str(status)] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for key, values in sorted(self.latencies.items()):
+            values.sort()
+            ok = sum(n for status, n in self.statuses[key].items() if status.startswith("2"))
+            endpoints[key] = {
+                "requests": len(values),
+                "ok": ok,
+                "errors": self.errors[key],
+                "status_codes": dict(self.statuses[key]),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "latency_ms": {
+                    "mean": round(sum(values) / len(values), 3),
+                    "p50": round(percentile(values, 50), 3),
+                    "p95": round(percentile(values, 95), 3),
+                    "p99": round(percentile(values, 99), 3),
+                    "max": round(values[-1], 3),
+                },
+            }
+        total = len(self.latencies["all"])
+        return {"elapsed_seconds": round(elapsed, 3), "total_requests": total,
+                "throughput_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+async def send(client, factory, recorder, kind, scheduled):
+    endpoint, kwargs = factory.request(kind)
+    status = None
+    try:
+        response = await client.post(endpoint, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError:
+        pass
+    latency = time.perf_counter() - scheduled
+    recorder.record(f"{kind} {endpoint}", latency, status)
+    recorder.record("all", latency, status)
+
+
+async def run_closed_loop(client, factory, recorder, kinds, weights, args, deadline):
+    sent = 0
+
+    async def user():
+        nonlocal sent
+        while time.perf_counter() < deadline and (not args.requests or sent < args.requests):
+            sent += 1
+            kind = factory.rng.choices(kinds, weights)[0]
+            await send(client, factory, recorder, kind, time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+
+
+async def run_open_loop(client, factory, recorder, kinds, weights, args, deadline):
+    interval = 1.0 / args.rate
+    next_at = time.perf_counter()
+    tasks = set()
+    sent = 0
+    while next_at < deadline and (not args.requests or sent < args.requests):
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = factory.rng.choices(kinds, weights)[0]
+        task = asyncio.create_task(send(client, factory, recorder, kind, next_at))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        sent += 1
+        next_at += factory.rng.expovariate(args.rate) if args.poisson else interval
+    await asyncio.gather(*tasks)
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    kinds, weights = list(mix), list(mix.values())
+    factory = PayloadFactory(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        if args.rate:
+            await run_open_loop(client, factory, recorder, kinds, weights, args, deadline)
+        else:
+            await run_closed_loop(client, factory, recorder, kinds, weights, args, deadline)
+        elapsed = time.perf_counter() - started
+    return {
+        "label": args.label,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "url": args.url,
+            "mode": "rate" if args.rate else "concurrency",
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": mix,
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def print_report(result: dict):
+    print(f"{'endpoint':<28} {'reqs':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for key, data in result["endpoints"].items():
+        lat = data["latency_ms"]
+        errors = data["requests"] - data["ok"]
+        print(f"{key:<28} {data['requests']:>7} {errors:>5} {data['throughput_rps']:>9.1f} "
+              f"{lat['p50']:>9.2f} {lat['p95']:>9.2f} {lat['p99']:>9.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ScamShield load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients (closed loop)")
+    parser.add_argument("--rate", type=float, default=0.0, help="target requests/second (open loop)")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times in rate mode")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weighted scan mix, e.g. text=60,url=40")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--label", default="", help="free-form tag stored in the JSON output")
+    parser.add_argument("--json", type=Path, help="write machine-readable results here ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.json and str(args.json) == "-":
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(result)
+        if args.json:
+            args.json.parent.mkdir(parents=True, exist_ok=True)
+            args.json.write_text(json.dumps(result, indent=2) + "\n")
+    return 0 if result["total_requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
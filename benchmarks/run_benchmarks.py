@@ -0,0 +1,282 @@
+"""
+run_benchmarks.py — Local benchmark suite for the ScamShield detection pipeline.
+
+Benchmarks extract_features, detect_input_type, apply_rule_layer,
+apply_ai_layer, the local lexicon sentiment layer, build_explanation,
+live-scan typing, near-duplicate lookups and the full run_scan in
+isolation, with an in-memory SQLite store and a mock Azure server.
+Every timed round is paired with a fixed calibration workload run right
+before it and the median ratio is kept, which evens out background load.
+Calibration does not make ~1us timings comparable across CPU
+architectures or Python versions, so baselines.json keeps one baseline
+per platform (architecture and Python minor version) and the gate runs
+against this platform's entry.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks                   # compare with baselines.json
+    python -m benchmarks.run_benchmarks --update-baseline # record this platform's baselines
+    python -m benchmarks.run_benchmarks --only apply_rule_layer,apply_ai_layer --threshold 1.5
+
+Exits with status 1 when any benchmark is slower than
+baseline * threshold by more than NOISE_FLOOR_US per item, and with
+status 2 when the baseline was recorded on a different corpus. A
+platform without a baseline only gets the report, unless --strict is
+given or the CI environment variable is set, in which case it exits
+with status 2 as well.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from backend import server
+from benchmarks.corpus import build_corpus
+from backend.storage import SQLiteStorage
+from benchmarks.fakes import MockAzureServer
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_THRESHOLD = 1.30
+# Slowdowns smaller than this per item are timer and scheduler noise, not regressions
+NOISE_FLOOR_US = 1.0
+
+
+def platform_key() -> str:
+    """Identify the architecture and interpreter a baseline was recorded with."""
+    return f"{platform.machine()}/python-{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def calibrate(rounds: int = 7) -> float:
+    """Microseconds taken by a fixed pure-Python workload (best of N)."""
+    def workload():
+        total = 0
+        words = []
+        for i in range(20000):
+            total += i * i % 7
+            words.append(str(i).lower())
+        return total, " ".join(words).count("1")
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        workload()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def measure(fn, items, rounds: int) -> dict:
+    """Time `rounds` passes over `items`, each paired with a calibration run; keep the median ratio."""
+    fn(items[: max(1, len(items) // 10)])  # warm-up
+    samples = []
+    ratios = []
+    calibrations = []
+    for _ in range(rounds):
+        calibration_us = calibrate(rounds=3)
+        start = time.perf_counter()
+        fn(items)
+        per_item_us = (time.perf_counter() - start) / len(items) * 1e6
+        samples.append(per_item_us)
+        ratios.append(per_item_us / calibration_us)
+        calibrations.append(calibration_us)
+    return {
+        "per_item_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "relative": round(statistics.median(ratios), 6),
+        "calibration_us": round(min(calibrations), 3),
+        "items": len(items),
+    }
+
+
+def train_bench_model(messages):
+    """Fit the production model configuration on the benchmark corpus."""
+    texts = [text for text, _ in messages]
+    labels = [label for _, label in messages]
+    vectorizer = TfidfVectorizer(max_features=3000, stop_words='english')
+    model = LogisticRegression(random_state=42, max_iter=1000)
+    model.fit(vectorizer.fit_transform(texts), labels)
+    return model, vectorizer
+
+
+def build_benchmarks(corpus, loop):
+    texts = [text for text, _ in corpus["messages"]]
+    mixed = texts + corpus["urls"] + corpus["phones"]
+    mixed_feats = [server.features.extract_features(item) for item in mixed]
+    text_feats = mixed_feats[:len(texts)]
+    typed = [(feats, server.detect_input_type(feats)) for feats in mixed_feats]
+    trigger_lists = [server.apply_rule_layer(feats, scan_type)[1] + ["AI: suspicious_language_patterns"]
+                     for feats, scan_type in typed]
+
+    def bench_features(items):
+        for item in items:
+            server.features.extract_features(item)
+
+    def bench_detect(items):
+        for item in items:
+            server.detect_input_type(item)
+
+    def bench_rules(items):
+        for item, scan_type in items:
+            server.apply_rule_layer(item, scan_type)
+
+    def bench_ml(items):
+        for item in items:
+            server.apply_ai_layer(item)
+
+    def bench_lexicon(items):
+        for item in items:
+            server.apply_lexicon_layer(item)
+
+    def bench_explanation(items):
+        for triggers in items:
+            server.build_explanation(triggers)
+
+    def bench_live_typing(items):
+        # Each message is typed one character at a time, re-evaluated after every keystroke
+        for text in items:
+            session = server.new_live_session()
+            for i, ch in enumerate(text):
+                session.edit(i, i, ch)
+                server.evaluate_live_session(session)
+
+    def bench_near_duplicate(items):
+        for text in items:
+            server.near_duplicate_index.match(text)
+
+    def bench_run_scan(items):
+        async def scan_all():
+            for item in items:
+                await server.run_scan(item)
+        loop.run_until_complete(scan_all())
+
+    return {
+        "extract_features": (bench_features, mixed),
+        "detect_input_type": (bench_detect, mixed_feats),
+        "apply_rule_layer": (bench_rules, typed),
+        "apply_ai_layer": (bench_ml, text_feats),
+        "apply_lexicon_layer": (bench_lexicon, text_feats),
+        "build_explanation": (bench_explanation, trigger_lists),
+        "live_scan_typing": (bench_live_typing, texts[:200]),
+        "near_duplicate_match": (bench_near_duplicate, texts),
+        "run_scan": (bench_run_scan, mixed[:: max(1, len(mixed) // 100)]),
+    }
+
+
+def run(args) -> dict:
+    # Keep per-scan INFO logs out of the timed loops and the report
+    logging.getLogger().setLevel(logging.WARNING)
+    corpus = build_corpus(messages=args.messages)
+    server.ml_model, server.vectorizer = train_bench_model(corpus["messages"])
+    server.store = SQLiteStorage(":memory:")
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.store.connect())
+    loop.run_until_complete(server.seed_database())
+    loop.run_until_complete(server.build_near_duplicate_index())
+
+    selected = set(args.only.split(",")) if args.only else None
+    results = {}
+    with MockAzureServer(latency_ms=args.azure_latency_ms) as azure:
+        server.AZURE_LANGUAGE_KEY = "benchmark-key"
+        server.AZURE_LANGUAGE_ENDPOINT = azure.endpoint
+        for name, (fn, items) in build_benchmarks(corpus, loop).items():
+            if selected and name not in selected:
+                continue
+            results[name] = measure(fn, items, args.rounds)
+    loop.run_until_complete(server.store.close())
+    loop.close()
+    return {
+        "platform": platform_key(),
+        "calibration_us": round(calibrate(), 3),
+        "corpus": corpus["source"],
+        "python": platform.python_version(),
+        "benchmarks": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return (name, ratio) for every benchmark slower than baseline * threshold
+    whose per-item time also grew by more than NOISE_FLOOR_US.
+    Benchmarks measured over a different number of items are not compared.
+    """
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            continue
+        if base.get("items") != result["items"]:
+            print(f"WARNING: {name} ran {result['items']} items, its baseline {base.get('items')}; not compared",
+                  file=sys.stderr)
+            continue
+        ratio = result["relative"] / base["relative"]
+        result["vs_baseline"] = round(ratio, 3)
+        if ratio > threshold and result["median_us"] - base["median_us"] > NOISE_FLOOR_US:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ScamShield detection pipeline benchmarks")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--messages", type=int, default=1000, help="number of corpus messages")
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown factor against the baseline")
+    parser.add_argument("--azure-latency-ms", type=float, default=0.0,
+                        help="artificial latency added by the mock Azure server")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--baseline-platform", default="",
+                        help="compare with (or record) this baselines.json entry instead of the current platform's")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--strict", action="store_true", default=bool(os.environ.get("CI")),
+                        help="fail when there is no baseline to compare with (default when CI is set)")
+    parser.add_argument("--output", type=Path, help="also write results JSON here")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    key = args.baseline_platform or current["platform"]
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"platforms": {}}
+    baseline = baselines["platforms"].get(key)
+    regressions = []
+    if args.update_baseline:
+        baselines["platforms"][key] = current
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline for {key} written to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline for {key} in {args.baseline}; not compared "
+              f"(record one with --update-baseline or pick one with --baseline-platform)", file=sys.stderr)
+        if args.strict:
+            return 2
+    else:
+        if baseline.get("corpus") != current["corpus"]:
+            print(f"Baseline for {key} was recorded on the {baseline.get('corpus')!r} corpus, "
+                  f"this run used {current['corpus']!r}; record a baseline for this corpus with --update-baseline",
+                  file=sys.stderr)
+            return 2
+        regressions = compare(current, baseline, args.threshold)
+
+    print(f"{'benchmark':<20} {'us/item':>10} {'relative':>10} {'vs base':>8}")
+    for name, result in current["benchmarks"].items():
+        vs = result.get("vs_baseline")
+        print(f"{name:<20} {result['per_item_us']:>10.2f} {result['relative']:>10.5f} "
+              f"{(f'{vs:.2f}x' if vs else '-'):>8}")
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2) + "\n")
+
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} is {ratio:.2f}x its baseline "
+              f"(threshold {args.threshold:.2f}x, noise floor {NOISE_FLOOR_US:g}us)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
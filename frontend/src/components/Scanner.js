@@ -1,5 +1,6 @@
 import React, { useState, useRef } from "react";
 import CONFIG from "../config";
+import useLiveScan from "../hooks/use-live-scan";
 import "./Scanner.css";
 
 const TABS = [
@@ -25,6 +26,7 @@ export default function Scanner() {
   const [uploadedFile, setUploadedFile] = useState(null);
   const [dragOver, setDragOver] = useState(false);
   const fileInputRef = useRef(null);
+  const livePreview = useLiveScan(input, activeTab, activeTab !== "file");
 
   const handleTabChange = (tabId) => {
     setActiveTab(tabId);
@@ -185,6 +187,12 @@ export default function Scanner() {
               placeholder={currentTab?.placeholder}
               rows={activeTab === "email" ? 8 : 4}
             />
+            {livePreview && !result && (
+              <div className={`live-preview ${getRiskColor(livePreview.label)}`}>
+                Live check: <strong>{livePreview.label}</strong> ({livePreview.risk_score}/100)
+                <span className="live-preview-note">Scan for the full four-layer result</span>
+              </div>
+            )}
             <div className="examples-row">
               <span className="examples-label">Try an example:</span>
               <button
@@ -0,0 +1,78 @@
+import { useEffect, useRef, useState } from "react";
+import CONFIG from "../config";
+
+const LIVE_SCAN_URL = `${CONFIG.API_BASE_URL.replace(/^http/, "ws")}/ws/scan`;
+
+const isHighSurrogate = (code) => code >= 0xd800 && code <= 0xdbff;
+const isLowSurrogate = (code) => code >= 0xdc00 && code <= 0xdfff;
+const codePoints = (text) => Array.from(text).length;
+
+// Smallest single-range edit turning `before` into `after`. The server
+// counts characters as code points, so offsets are converted from UTF-16.
+function spliceEdit(before, after) {
+  let start = 0;
+  while (start < before.length && start < after.length && before[start] === after[start]) start++;
+  if (start > 0 && isHighSurrogate(before.charCodeAt(start - 1))) start--;
+
+  let suffix = 0;
+  while (
+    suffix < before.length - start &&
+    suffix < after.length - start &&
+    before[before.length - 1 - suffix] === after[after.length - 1 - suffix]
+  ) suffix++;
+  if (suffix > 0 && isLowSurrogate(before.charCodeAt(before.length - suffix))) suffix--;
+
+  const offset = codePoints(before.slice(0, start));
+  return {
+    type: "edit",
+    start: offset,
+    end: offset + codePoints(before.slice(start, before.length - suffix)),
+    text: after.slice(start, after.length - suffix),
+  };
+}
+
+// Streams edits of `text` to the live-scan WebSocket and returns the latest
+// preview ({risk_score, label, triggers, scan_type}) pushed by the server.
+// The preview only covers the rule and ML layers; the full scan still goes
+// through POST /scan.
+export default function useLiveScan(text, scanType, enabled = true) {
+  const socketRef = useRef(null);
+  const sentRef = useRef("");
+  const latestRef = useRef({ text, scanType });
+  const [preview, setPreview] = useState(null);
+  latestRef.current = { text, scanType };
+
+  useEffect(() => {
+    if (!enabled) return undefined;
+    const socket = new WebSocket(LIVE_SCAN_URL);
+    socketRef.current = socket;
+    socket.onopen = () => {
+      const { text: current, scanType: type } = latestRef.current;
+      sentRef.current = current;
+      socket.send(JSON.stringify({ type: "text", text: current, scan_type: type }));
+    };
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === "update") setPreview(message);
+    };
+    return () => {
+      socket.close();
+      socketRef.current = null;
+      sentRef.current = "";
+      setPreview(null);
+    };
+  }, [enabled]);
+
+  useEffect(() => {
+    const socket = socketRef.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return;
+    if (text === sentRef.current) {
+      socket.send(JSON.stringify({ type: "edit", start: 0, end: 0, text: "", scan_type: scanType }));
+    } else {
+      socket.send(JSON.stringify({ ...spliceEdit(sentRef.current, text), scan_type: scanType }));
+    }
+    sentRef.current = text;
+  }, [text, scanType]);
+
+  return text.trim() ? preview : null;
+}
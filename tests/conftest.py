@@ -0,0 +1,25 @@
+"""
+conftest.py — Shared fixtures for the API tests.
+`client` runs the app's startup and shutdown around each test, with no ML
+model loaded and `scan_store` as its storage. `scan_store` is an in-memory
+SQLite store; override it in a test module to use a file on disk.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import server
+from backend.storage import SQLiteStorage
+
+@pytest.fixture
+def scan_store():
+    return SQLiteStorage(":memory:")
+
+@pytest.fixture
+def client(monkeypatch, scan_store):
+    async def no_model():
+        return None
+    monkeypatch.setattr(server, "initialize_ml_model", no_model)
+    monkeypatch.setattr(server, "store", scan_store)
+    with TestClient(server.app) as test_client:
+        yield test_client
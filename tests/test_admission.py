@@ -0,0 +1,161 @@
+"""
+test_admission.py — Admission control and storage bulkhead saturation.
+Checks the per-client token buckets, the circuit breaker's open, half-open
+and closed cycle, and that scans over the in-flight limit or the rate
+limit get 429 with Retry-After while the saturation gauges follow the
+in-flight count. A scan whose blacklist lookup cannot get a storage slot
+must be rejected with 503 and Retry-After, never answered with a verdict
+that skipped the blacklist; history and stats reads report the same
+condition. Timeouts and cancellations must never leak a bulkhead permit.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from backend import admission, server
+
+PHONE = "1-900-555-0123"
+
+class Clock:
+    """Stands in for time.monotonic in the admission module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+def test_rate_limiter_spends_the_burst_then_refills(clock):
+    limiter = admission.RateLimiter(per_minute=60, burst=2)
+    assert limiter.enabled
+    assert [limiter.check("a"), limiter.check("a")] == [0.0, 0.0]
+    assert limiter.check("a") == pytest.approx(1.0)
+    # Other clients have their own bucket
+    assert limiter.check("b") == 0.0
+    clock.now += 0.5
+    assert limiter.check("a") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.check("a") == 0.0
+    assert not admission.RateLimiter(per_minute=0, burst=20).enabled
+
+def test_rate_limiter_forgets_the_least_recently_seen_client(clock):
+    limiter = admission.RateLimiter(per_minute=60, burst=1, max_clients=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.check("a")
+    limiter.check("c")
+    assert list(limiter.buckets) == ["a", "c"]
+
+def test_circuit_breaker_opens_half_opens_and_closes(clock):
+    breaker = admission.CircuitBreaker("azure", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_busy_server_does_not_spend_rate_limit_tokens(clock):
+    controller = admission.AdmissionController(1, admission.RateLimiter(per_minute=60, burst=2))
+    controller.admit("a")
+    with pytest.raises(admission.Overloaded) as rejected:
+        controller.admit("a")
+    assert rejected.value.reason == "server_busy"
+    controller.release()
+    # The rejected request left the second token in the bucket
+    controller.admit("a")
+    controller.release()
+    with pytest.raises(admission.Overloaded) as rejected:
+        controller.admit("a")
+    assert rejected.value.reason == "rate_limited"
+    assert controller.in_flight == 0
+
+def test_scans_over_the_limits_get_429_with_retry_after(client, monkeypatch):
+    controller = admission.AdmissionController(2, admission.RateLimiter(per_minute=60, burst=1))
+    monkeypatch.setattr(server, "admission_controller", controller)
+
+    assert client.post("/api/scan", json={"content": PHONE}).status_code == 200
+    response = client.post("/api/scan", json={"content": PHONE})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "Too many requests"
+
+    controller.rate_limiter = admission.RateLimiter(per_minute=0, burst=1)
+    controller.in_flight = 2
+    response = client.post("/api/scan", json={"content": PHONE})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "Server is busy, please retry"
+
+def test_saturation_gauges_follow_in_flight_scans(client, monkeypatch):
+    controller = admission.AdmissionController(4, admission.RateLimiter(per_minute=0, burst=1))
+    monkeypatch.setattr(server, "admission_controller", controller)
+    controller.in_flight = 1
+    families = {family.name: family for family in text_string_to_metric_families(client.get("/metrics").text)}
+    assert families["scamshield_admission_in_flight"].samples[0].value == 1
+    assert families["scamshield_admission_saturation_ratio"].samples[0].value == 0.25
+
+def test_saturated_storage_rejects_scan(monkeypatch):
+    # No free slot: every storage operation times out at once
+    monkeypatch.setattr(server, "mongo_bulkhead", admission.Bulkhead("mongo", 0, 0.01))
+    client = TestClient(server.app)
+    response = client.post("/api/scan", json={"content": PHONE, "scan_type": "phone"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+    # asyncio primitives stay bound to the loop that first used them
+    monkeypatch.setattr(server, "mongo_bulkhead", admission.Bulkhead("mongo", 0, 0.01))
+    results = asyncio.run(server.run_scan_batch([(PHONE, "phone"), ("", None)]))
+    assert results == [{"error": "Server is busy, please retry"}, {"error": "Content cannot be empty"}]
+
+def test_saturated_storage_rejects_history_and_stats(monkeypatch):
+    client = TestClient(server.app)
+    for path in ("/api/history", "/api/stats"):
+        # Each request outside a client context runs on its own event loop
+        monkeypatch.setattr(server, "mongo_bulkhead", admission.Bulkhead("mongo", 0, 0.01))
+        response = client.get(path)
+        assert response.status_code == 503 and response.headers["Retry-After"] == "2"
+
+def test_bulkhead_keeps_its_permits_under_timeouts_and_cancellation():
+    async def scenario():
+        bulkhead = admission.Bulkhead("mongo", 2, 0.001)
+
+        async def use(hold):
+            try:
+                async with bulkhead.slot():
+                    await asyncio.sleep(hold)
+            except admission.Saturated:
+                pass
+
+        for round_number in range(50):
+            tasks = [asyncio.create_task(use(0.001 * (i % 3))) for i in range(20)]
+            await asyncio.sleep(0.001 * (round_number % 3))
+            for task in tasks[::4]:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        assert (bulkhead.in_use, bulkhead.waiting) == (0, 0)
+        # Every permit is still there: the full limit can be taken at once
+        for _ in range(2):
+            await asyncio.wait_for(bulkhead.semaphore.acquire(), 0.1)
+        assert bulkhead.semaphore.locked()
+    asyncio.run(scenario())
@@ -0,0 +1,95 @@
+"""
+test_cli.py — Offline parallel CLI scanner.
+Scans a directory and stdin lines on a two-worker process pool, checks
+that results come back in input order as JSONL/CSV with per-file errors,
+that errors, missing inputs and an unreachable storage backend give a
+non-zero exit status, and that --persist writes them to scan_history.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import time
+
+import pytest
+
+from backend import cli, config, server
+from backend.storage import SQLiteStorage
+
+SCAM = "URGENT! Your account has been suspended. Click here to verify your bank details now"
+
+@pytest.fixture(autouse=True)
+def no_model(monkeypatch):
+    # Workers are forked from this process and inherit the patch
+    async def no_model_load():
+        return None
+    monkeypatch.setattr(server, "initialize_ml_model", no_model_load)
+
+@pytest.fixture
+def inbox(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text(SCAM)
+    (tmp_path / "sub" / "b.eml").write_text(
+        "Subject: Security alert\nFrom: bank\n\nDear customer, we have detected unusual activity.\n")
+    (tmp_path / "c.csv").write_text("name,note\nbob,see you at lunch\n")
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "notes.md").write_text(SCAM)
+    return tmp_path
+
+def test_directory_scan_streams_jsonl_in_order(inbox, tmp_path):
+    output = tmp_path / "out.jsonl"
+    # empty.txt cannot be scanned, so the run reports failure
+    assert cli.main([str(inbox), "--workers", "2", "--chunk-size", "1", "--offline",
+                     "--output", str(output)]) == 1
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [row["source"].replace(str(inbox), "") for row in rows] == [
+        "/a.txt", "/c.csv", "/empty.txt", "/sub/b.eml"]
+    assert rows[0]["label"] == server.LABELS[1] and "Rule: urgency" in rows[0]["triggers"]
+    assert rows[1]["label"] == server.LABELS[0]
+    assert rows[2] == {"source": str(inbox / "empty.txt"), "error": "Could not extract text from file."}
+    assert rows[3]["scan_type"] == "email"
+
+    (inbox / "empty.txt").unlink()
+    assert cli.main([str(inbox), "--offline", "--output", str(output)]) == 0
+
+def test_missing_input_path_is_an_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exited:
+        cli.main([str(tmp_path / "missing"), "--offline"])
+    assert exited.value.code == 2
+    assert "no such file or directory" in capsys.readouterr().err
+
+def test_stdin_lines_to_csv_and_persist(monkeypatch, tmp_path):
+    database = tmp_path / "history.db"
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(config, "SQLITE_PATH", str(database))
+    monkeypatch.setattr("sys.stdin", io.StringIO(f"{SCAM}\n\nhttp://paypa1.com/login\n1-900-555-0123\n"))
+    output = tmp_path / "out.csv"
+    assert cli.main(["-", "--format", "csv", "--workers", "2", "--offline", "--persist",
+                     "--output", str(output)]) == 0
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["source"], row["scan_type"]) for row in rows] == [
+        ("stdin:1", "email"), ("stdin:3", "url"), ("stdin:4", "phone")]
+    assert rows[2]["triggers"] == "Rule: suspicious_number_pattern"
+
+    async def history():
+        store = SQLiteStorage(str(database))
+        await store.connect()
+        scans = await store.recent_scans(10)
+        await store.close()
+        return scans
+    assert sorted(scan["content"] for scan in asyncio.run(history())) == sorted(
+        [SCAM, "http://paypa1.com/login", "1-900-555-0123"])
+
+def test_unreachable_mongo_fails_before_the_pool_starts(inbox, monkeypatch, capsys):
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "mongo")
+    monkeypatch.setattr(config, "MONGO_URL", "mongodb://127.0.0.1:1")
+    monkeypatch.setattr(cli, "MONGO_TIMEOUT_MS", 200)
+    def no_pool(*args, **kwargs):
+        raise AssertionError("the pool was started")
+    monkeypatch.setattr(cli, "scan_parallel", no_pool)
+    started = time.perf_counter()
+    assert cli.main([str(inbox)]) == 2
+    assert time.perf_counter() - started < 5
+    assert "cannot connect to the mongo storage backend" in capsys.readouterr().err
@@ -0,0 +1,48 @@
+"""
+test_compact.py — Compact scan_history documents.
+A stored scan must decode back to exactly the API response, and documents
+written before the compact schema must still read correctly. The code
+tables are append-only, so the codes already in use are pinned here.
+"""
+
+from backend.server import LABELS, TRIGGER_CODES, build_scan_result, scan_codec
+
+# Codes persisted by existing deployments; new entries may only be appended
+PINNED_TRIGGER_CODES = [
+    "Rule: urgency", "Rule: lottery", "Rule: otp_phishing", "Rule: financial", "Rule: authority",
+    "Rule: suspicious_links", "Rule: email_phishing", "Rule: suspicious_number_pattern",
+    "Rule: suspicious_url_pattern", "Rule: lookalike_domain", "Blacklist: known_scam_number",
+    "Blacklist: known_scam_domain", "Blacklist: known_scam_message", "AI: suspicious_language_patterns",
+    "Azure: high_negative_sentiment", "Azure: threatening_tone_detected", "Blacklist: near_duplicate_scam",
+    "Lexicon: high_negative_sentiment", "Lexicon: threatening_tone_detected",
+]
+
+def test_compact_document_round_trips_to_the_api_shape():
+    result = build_scan_result(
+        "URGENT: you won a prize", "text",
+        [(65, ["Rule: urgency", "Rule: lottery"]), (0, []), (30, ["AI: suspicious_language_patterns"]), (0, [])],
+    ).model_dump()
+    doc = scan_codec.encode(result)
+    assert doc["label"] == 2
+    assert all(isinstance(code, int) for code in doc["triggers"])
+    assert "explanation" not in doc and "guidance" not in doc
+    assert scan_codec.decode(doc) == result
+
+def test_unknown_triggers_and_legacy_documents_pass_through():
+    result = build_scan_result("hi", "text", [(0, ["Rule: brand_new_rule"]), (0, []), (0, []), (0, [])]).model_dump()
+    assert scan_codec.decode(scan_codec.encode(result))["triggers"] == ["Rule: brand_new_rule"]
+
+    legacy = {"id": "1", "content": "x", "scan_type": "text", "risk_score": 0,
+              "label": "🟢 Safe", "guidance": "g", "triggers": []}
+    assert scan_codec.decode(legacy) == {**legacy, "explanation": ""}
+
+def test_code_tables_are_append_only():
+    assert TRIGGER_CODES[:len(PINNED_TRIGGER_CODES)] == PINNED_TRIGGER_CODES
+    assert len(set(TRIGGER_CODES)) == len(TRIGGER_CODES)
+
+def test_codes_from_a_newer_deployment_decode_as_unknown():
+    doc = {"id": "1", "content": "x", "scan_type": "text", "risk_score": 90,
+           "label": len(LABELS), "triggers": [0, len(TRIGGER_CODES)]}
+    decoded = scan_codec.decode(doc)
+    assert decoded["label"] == "Unknown" and decoded["guidance"] == ""
+    assert decoded["triggers"] == ["Rule: urgency", f"Unknown trigger {len(TRIGGER_CODES)}"]
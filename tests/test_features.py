@@ -0,0 +1,91 @@
+"""
+test_features.py — Shared scan features and the token-level ML scorer.
+LinearTextScorer must reproduce TfidfVectorizer.transform() +
+LogisticRegression.predict_proba() on the same tokens, and
+detect_input_type on precomputed features must classify inputs exactly
+like the original regex-per-call implementation.
+"""
+
+import re
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from backend import features, server
+
+TRAINING = [
+    ("URGENT: your account is suspended, verify your bank details now", 1),
+    ("Congratulations! You won a prize, claim your reward today", 1),
+    ("Send the OTP code to confirm the payment", 1),
+    ("Your parcel is held, pay the customs fee at this link", 1),
+    ("See you at lunch tomorrow", 0),
+    ("The meeting moved to 3pm, bring the slides", 0),
+    ("Thanks for dinner, it was great", 0),
+    ("Can you pick up milk on the way home?", 0),
+]
+
+SAMPLES = [
+    "URGENT urgent URGENT verify your account",
+    "claim your prize, verify the OTP code now!",
+    "lunch at 3pm?",
+    "completely unseen vocabulary here",
+    "",
+    "Ünïcode déjà vu: your account",
+]
+
+def legacy_detect_input_type(content):
+    """detect_input_type as it was before features were shared across layers."""
+    content = content.strip()
+    phone_pattern = r'^[\+]?[1-9]?[\-\.\s]?\(?[0-9]{3}\)?[\-\.\s]?[0-9]{3}[\-\.\s]?[0-9]{4,6}$'
+    if re.match(phone_pattern, content) or content.replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
+        return 'phone'
+    if re.search(r'^https?://|^www\.|\.com$|\.org$|\.net$', content, re.IGNORECASE):
+        return 'url'
+    email_patterns = [
+        r'subject:|from:|to:|dear (customer|user|sir|madam)',
+        r'unsubscribe|click here to|your account|sincerely|regards',
+    ]
+    if any(re.search(p, content.lower()) for p in email_patterns):
+        return 'email'
+    return 'text'
+
+@pytest.mark.parametrize("stop_words", [None, "english"])
+def test_linear_scorer_matches_sklearn(stop_words):
+    texts = [text for text, _ in TRAINING]
+    vectorizer = TfidfVectorizer(stop_words=stop_words)
+    model = LogisticRegression().fit(vectorizer.fit_transform(texts), [label for _, label in TRAINING])
+    scorer = features.LinearTextScorer.from_model(vectorizer, model)
+    assert scorer is not None
+    expected = model.predict_proba(vectorizer.transform(SAMPLES))[:, 1]
+    for text, probability in zip(SAMPLES, expected):
+        tokens = features.extract_features(text).tokens
+        assert scorer.scam_probability(tokens) == pytest.approx(probability, abs=1e-9)
+
+def test_linear_scorer_rejects_unsupported_models():
+    texts = [text for text, _ in TRAINING]
+    labels = [label for _, label in TRAINING]
+    bigrams = TfidfVectorizer(ngram_range=(1, 2))
+    model = LogisticRegression().fit(bigrams.fit_transform(texts), labels)
+    assert features.LinearTextScorer.from_model(bigrams, model) is None
+    sublinear = TfidfVectorizer(sublinear_tf=True)
+    model = LogisticRegression().fit(sublinear.fit_transform(texts), labels)
+    assert features.LinearTextScorer.from_model(sublinear, model) is None
+
+@pytest.mark.parametrize("content, expected", [
+    ("+1-555-123-4567", "phone"),
+    ("(555) 123-4567", "phone"),
+    ("  5551234567  ", "phone"),
+    ("https://paypa1.com/login", "url"),
+    ("WWW.Example.org/path", "url"),
+    ("secure-bank.NET", "url"),
+    ("Subject: Invoice\nFrom: billing", "email"),
+    ("Dear Customer, please click here to unsubscribe", "email"),
+    ("Kind regards, the team", "email"),
+    ("see you at lunch", "text"),
+    ("visit example.com today", "text"),
+    ("call 555-1234 later", "text"),
+])
+def test_detect_input_type(content, expected):
+    assert server.detect_input_type(features.extract_features(content)) == expected
+    assert legacy_detect_input_type(content) == expected
@@ -0,0 +1,34 @@
+"""
+test_import_time.py — Cold-import budget for the ScamShield backend.
+Importing backend.server must not need MONGO_URL and must not pull in the
+training, Azure or database dependencies; those are what made it slow.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ["sklearn", "numpy", "scipy", "httpx", "azure", "motor", "pymongo"]
+
+PROBE = f"""
+import json, sys
+import backend.server
+print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))
+"""
+
+
+def run_probe():
+    env = {k: v for k, v in os.environ.items() if k not in ("MONGO_URL", "DB_NAME")}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_without_mongo_url_defers_heavy_dependencies():
+    """Training, Azure and database libraries are loaded on first use only."""
+    assert run_probe() == []
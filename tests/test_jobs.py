@@ -0,0 +1,188 @@
+"""
+test_jobs.py — Batch scan jobs on SQLite storage.
+A job interrupted by a restart must resume from its unfinished chunks,
+including a chunk whose results were only partly stored, without
+rescanning finished chunks or duplicating results. A job whose owner
+stopped heart-beating must pass to another manager, a failed chunk must
+stop the rest of its job and clean up the stored items, and the
+/api/jobs endpoints must expose submission, progress and results.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend import jobs
+from backend.storage import SQLiteStorage
+
+ITEMS = [(f"message {i}", None) for i in range(6)]
+
+async def open_store(path):
+    store = SQLiteStorage(str(path))
+    await store.connect()
+    return store
+
+async def wait_for_status(manager, job_id, statuses):
+    for _ in range(500):
+        job = await manager.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stuck in {job['status']}")
+
+def test_restarted_manager_resumes_without_duplicates(tmp_path):
+    scanned = []
+    stuck = asyncio.Event()
+
+    async def scan_until_crash(items):
+        if scanned:
+            # The second chunk never finishes: the process "crashes" here
+            stuck.set()
+            await asyncio.Event().wait()
+        scanned.extend(content for content, _ in items)
+        return [{"content": content} for content, _ in items]
+
+    async def scan(items):
+        scanned.extend(content for content, _ in items)
+        return [{"content": content} for content, _ in items]
+
+    async def scenario():
+        store = await open_store(tmp_path / "jobs.db")
+        manager = jobs.JobManager(store, scan_until_crash, concurrency=1, chunk_size=2)
+        await manager.start()
+        job = await manager.submit(ITEMS)
+        await stuck.wait()
+        await manager.stop()
+        await store.close()
+
+        store = await open_store(tmp_path / "jobs.db")
+        manager = jobs.JobManager(store, scan, concurrency=1, chunk_size=2)
+        await manager.start()
+        status = await wait_for_status(manager, job["id"], [jobs.JOB_COMPLETED, jobs.JOB_FAILED])
+        results = await manager.get_results(job["id"], 0, 100)
+        items_left = await store.job_items(job["id"], 0, 100)
+        await manager.stop()
+        await store.close()
+        return status, results, items_left
+
+    status, results, items_left = asyncio.run(scenario())
+    assert (status["status"], status["processed"], status["failed"]) == (jobs.JOB_COMPLETED, 6, 0)
+    assert [result["index"] for result in results] == list(range(6))
+    assert [result["content"] for result in results] == [content for content, _ in ITEMS]
+    # Each message was scanned exactly once across both runs
+    assert sorted(scanned) == sorted(content for content, _ in ITEMS)
+    assert items_left == []
+
+def test_partly_stored_chunk_is_rescanned_on_resume(tmp_path):
+    scanned = []
+
+    async def scan(items):
+        scanned.extend(content for content, _ in items)
+        return [{"content": content} for content, _ in items]
+
+    async def scenario():
+        store = await open_store(tmp_path / "jobs.db")
+        manager = jobs.JobManager(store, scan, concurrency=1, chunk_size=2)
+        job = await manager.submit(ITEMS)
+        # A crash left chunk 0 complete and only the first result of chunk 2
+        manager.queue = asyncio.Queue()
+        await store.update_job(job["id"], {"status": jobs.JOB_RUNNING})
+        await store.insert_job_results(job["id"], 0, [(0, {"content": "message 0"}), (1, {"content": "message 1"})])
+        await store.insert_job_results(job["id"], 2, [(2, {"content": "message 2"})])
+        await manager.start()
+        status = await wait_for_status(manager, job["id"], [jobs.JOB_COMPLETED, jobs.JOB_FAILED])
+        results = await manager.get_results(job["id"], 0, 100)
+        await manager.stop()
+        await store.close()
+        return status, results
+
+    status, results = asyncio.run(scenario())
+    assert (status["status"], status["processed"]) == (jobs.JOB_COMPLETED, 6)
+    assert [result["index"] for result in results] == list(range(6))
+    assert sorted(scanned) == [f"message {i}" for i in range(2, 6)]
+
+def test_stale_owner_loses_its_job_to_another_manager(tmp_path):
+    async def scan(items):
+        return [{"content": content} for content, _ in items]
+
+    async def scenario():
+        store = await open_store(tmp_path / "jobs.db")
+        first = jobs.JobManager(store, scan, chunk_size=2)
+        second = jobs.JobManager(store, scan, chunk_size=2)
+        job = await first.submit(ITEMS)
+        now = datetime.now(timezone.utc)
+        # A fresh heartbeat keeps the job with its owner
+        await second.resume_unfinished(stale_before=now - timedelta(seconds=60))
+        assert second.queue.qsize() == 0
+        await store.update_job(job["id"], {"heartbeat_at": now - timedelta(seconds=120)})
+        await second.resume_unfinished(stale_before=now - timedelta(seconds=60))
+        assert second.queue.qsize() == 3
+        assert (await store.get_job(job["id"]))["owner"] == second.owner
+        # The previous owner drops the chunks it still had queued
+        await first.start(resume=False)
+        await first.queue.join()
+        await first.stop()
+        assert await store.job_result_counts(job["id"]) == {}
+        await second.start(resume=False)
+        status = await wait_for_status(second, job["id"], [jobs.JOB_COMPLETED])
+        await second.stop()
+        await store.close()
+        return status
+
+    assert asyncio.run(scenario())["processed"] == 6
+
+def test_failed_chunk_stops_the_job_and_deletes_its_items(tmp_path):
+    calls = []
+
+    async def failing_scan(items):
+        calls.append(items)
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        store = await open_store(tmp_path / "jobs.db")
+        manager = jobs.JobManager(store, failing_scan, concurrency=1, chunk_size=2)
+        await manager.start()
+        job = await manager.submit(ITEMS)
+        await manager.queue.join()
+        status = await manager.get_job(job["id"])
+        items_left = await store.job_items(job["id"], 0, 100)
+        await manager.stop()
+        await store.close()
+        return status, items_left
+
+    status, items_left = asyncio.run(scenario())
+    assert status["status"] == jobs.JOB_FAILED and status["error"] == "model unavailable"
+    assert status["finished_at"] is not None
+    assert len(calls) == 1
+    assert items_left == []
+
+@pytest.fixture
+def scan_store(tmp_path):
+    return SQLiteStorage(str(tmp_path / "api.db"))
+
+def test_job_api_submit_status_and_results(client):
+    assert client.post("/api/jobs", json={"items": []}).status_code == 400
+    assert client.get("/api/jobs/missing").status_code == 404
+    submitted = client.post("/api/jobs", json={"items": [
+        {"content": "URGENT! Verify your bank account now"}, {"content": " "}, {"content": "1-900-555-0123"}]})
+    assert submitted.status_code == 202 and submitted.json()["total"] == 3
+
+    job_id = submitted.json()["id"]
+    status = poll(client, job_id)
+    assert (status["processed"], status["failed"]) == (3, 1)
+    assert status["items_per_second"] > 0
+
+    page = client.get(f"/api/jobs/{job_id}/results?skip=1&limit=2").json()
+    assert page["status"] == "completed" and [item["index"] for item in page["results"]] == [1, 2]
+    assert page["results"][0]["error"] == "Content cannot be empty"
+    assert page["results"][1]["scan_type"] == "phone" and "label" in page["results"][1]
+
+def poll(client, job_id):
+    for _ in range(500):
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] == "completed":
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job stuck in {status['status']}")
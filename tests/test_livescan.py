@@ -0,0 +1,125 @@
+"""
+test_livescan.py — Incremental live-scan sessions and the /api/ws/scan endpoint.
+Checks that a session edited keystroke by keystroke scores exactly like
+the rule and ML layers run from scratch, and that the WebSocket pushes
+debounced updates and runs the full scan only on submit.
+"""
+
+import random
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from backend import features, livescan, server
+
+MESSAGES = [
+    "URGENT: Your account will be suspended in 24 hours. Click here to verify!",
+    "Congratulations! You've won a prize. Claim your $1,000 reward now at bit.ly/win",
+    "Hi, this is a reminder about your appointment tomorrow at 2 PM.",
+    "Subject: Security alert\n\nDear customer, we have detected unusual activity. Regards",
+    "http://paypa1.com/login",
+    "1-900-555-0123",
+]
+SNIPPETS = ["urgent ", "claim ", "prize ", "$100 ", "code 1234 ", "bank ", "details ", "click ",
+            "here", " ", "x", "İ", "within 5 hours ", "dear customer", "\n"]
+
+def full_scan(text):
+    feats = features.extract_features(text)
+    scan_type = server.detect_input_type(feats)
+    rule_score, rule_triggers = server.apply_rule_layer(feats, scan_type)
+    ai_score, ai_triggers = server.apply_ai_layer(feats)
+    total, label, _ = server.calculate_final_score_and_label(rule_score, 0, ai_score)
+    return scan_type, total, label, rule_triggers + ai_triggers
+
+def test_common_affixes():
+    assert livescan.common_affixes("hello world", "hello brave world") == (6, 5)
+    assert livescan.common_affixes("aaa", "aaaa") == (3, 0)
+    assert livescan.common_affixes("", "abc") == (0, 0)
+
+def test_random_edits_match_full_scan():
+    rng = random.Random(3)
+    for _ in range(40):
+        session = server.new_live_session()
+        text = ""
+        for _ in range(40):
+            if rng.random() < 0.1:
+                text = rng.choice(MESSAGES)
+                session.replace(text)
+            else:
+                start = rng.randint(0, len(text))
+                end = min(len(text), start + rng.choice([0, 0, 1, 3]))
+                inserted = rng.choice(SNIPPETS) if rng.random() < 0.8 else ""
+                session.edit(start, end, inserted)
+                text = text[:start] + inserted + text[end:]
+            if text.strip() and rng.random() < 0.5:
+                update = server.evaluate_live_session(session)
+                assert (update["scan_type"], update["risk_score"], update["label"],
+                        update["triggers"]) == full_scan(text)
+
+def test_linear_scorer_sums_follow_edits():
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression().fit(vectorizer.fit_transform(MESSAGES), [1, 1, 0, 1, 1, 0])
+    scorer = features.LinearTextScorer.from_model(vectorizer, model)
+    session = server.new_live_session()
+    session.replace(MESSAGES[0])
+    session.scam_probability(scorer)
+    for i, ch in enumerate(" Claim your prize"):
+        session.edit(len(MESSAGES[0]) + i, len(MESSAGES[0]) + i, ch)
+    expected = model.predict_proba(vectorizer.transform([session.text]))[0][1]
+    assert session.scam_probability(scorer) == pytest.approx(expected, abs=1e-12)
+
+def test_unaffected_match_is_kept_without_searching():
+    session = server.new_live_session()
+    session.replace("urgent! " + "lorem ipsum " * 200)
+    session.matches()
+    calls = []
+    real_search = session._search_window
+    session._search_window = lambda *args: calls.append(args) or real_search(*args)
+    session.edit(len(session.text), len(session.text), "x")
+    assert ("urgency", "Rule: urgency") in session.matches()
+    # Only the unmatched patterns were searched, around the edit
+    assert len(calls) == len(server.LIVE_SCAN_PATTERNS) - 1
+    assert all(pos > 0 for _, pos, _ in calls)
+
+def test_edit_validation():
+    session = livescan.LiveScanSession(server.COMPILED_SCAM_PATTERNS, features.tokenize, max_chars=10)
+    session.replace("hello")
+    with pytest.raises(livescan.EditError):
+        session.edit(3, 9, "x")
+    with pytest.raises(livescan.EditError):
+        session.edit(5, 5, "too long!")
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(server, "LIVE_SCAN_DEBOUNCE_MS", 10)
+    return client
+
+def test_websocket_updates_and_submit(client):
+    with client.websocket_connect("/api/ws/scan") as ws:
+        ws.send_json({"type": "text", "text": "URGENT: verify your account"})
+        update = ws.receive_json()
+        assert update["type"] == "update"
+        assert "Rule: urgency" in update["triggers"]
+
+        # Typing appends an edit; only a changed score is pushed
+        ws.send_json({"type": "edit", "start": 27, "end": 27, "text": " or face legal action"})
+        update = ws.receive_json()
+        assert update["triggers"] == ["Rule: urgency", "Rule: otp_phishing", "Rule: authority"]
+
+        ws.send_json({"type": "edit", "start": 500, "end": 500, "text": "x"})
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"type": "submit"})
+        result = ws.receive_json()
+        assert result["type"] == "result"
+        assert result["result"]["content"] == "URGENT: verify your account or face legal action"
+        assert result["result"]["explanation"]
+
+    history = client.get("/api/history").json()
+    assert [item["content"] for item in history] == ["URGENT: verify your account or face legal action"]
+
+def test_websocket_submit_of_empty_text(client):
+    with client.websocket_connect("/api/ws/scan") as ws:
+        ws.send_json({"type": "submit"})
+        assert ws.receive_json() == {"type": "error", "detail": "Content cannot be empty"}
@@ -0,0 +1,57 @@
+"""
+test_loadgen.py — Concurrent async load generator.
+Checks nearest-rank percentiles, parsing of the --mix argument and the
+shape of the --json report, with requests answered by an in-process
+transport instead of a running server.
+"""
+
+import functools
+import json
+
+import httpx
+import pytest
+
+from benchmarks import loadgen
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert loadgen.percentile(values, 50) == 50
+    assert loadgen.percentile(values, 95) == 95
+    assert loadgen.percentile(values, 99) == 99
+    assert loadgen.percentile(values, 100) == 100
+    assert loadgen.percentile([3.0, 7.0], 50) == 3.0
+    assert loadgen.percentile([3.0, 7.0], 51) == 7.0
+    assert loadgen.percentile([4.2], 99) == 4.2
+    assert loadgen.percentile([], 95) == 0.0
+
+def test_parse_mix():
+    assert loadgen.parse_mix(loadgen.DEFAULT_MIX) == {"text": 50, "url": 20, "phone": 15, "email": 10, "file": 5}
+    # A kind without a weight counts once
+    assert loadgen.parse_mix(" text=3, url") == {"text": 3.0, "url": 1.0}
+    with pytest.raises(ValueError, match="sms"):
+        loadgen.parse_mix("text=1,sms=2")
+
+def test_json_report_shape(monkeypatch, tmp_path):
+    def answer(request):
+        if request.url.path == "/api/scan/file":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"risk_score": 0})
+
+    transport = httpx.MockTransport(answer)
+    monkeypatch.setattr(loadgen.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+    output = tmp_path / "results" / "run.json"
+    argv = ["--requests", "40", "--concurrency", "4", "--mix", "text=1,file=1", "--label", "workers=1",
+            "--json", str(output)]
+    assert loadgen.main(argv) == 0
+
+    report = json.loads(output.read_text())
+    assert report["label"] == "workers=1"
+    assert report["config"]["mode"] == "concurrency" and report["config"]["mix"] == {"text": 1.0, "file": 1.0}
+    assert report["total_requests"] == 40
+    assert set(report["endpoints"]) == {"all", "text /api/scan", "file /api/scan/file"}
+    for data in report["endpoints"].values():
+        assert set(data) == {"requests", "ok", "errors", "status_codes", "throughput_rps", "latency_ms"}
+        assert set(data["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+        assert data["latency_ms"]["p50"] <= data["latency_ms"]["p99"] <= data["latency_ms"]["max"]
+    file_scans = report["endpoints"]["file /api/scan/file"]
+    assert file_scans["ok"] == 0 and file_scans["status_codes"] == {"503": file_scans["requests"]}
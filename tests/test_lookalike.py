@@ -0,0 +1,47 @@
+"""
+test_lookalike.py — Lookalike-domain detection for the URL rule layer.
+Covers homoglyph, punycode and one-edit typosquats of protected brands
+and checks that the real brand domains and unrelated real sites stay clean.
+"""
+
+from backend.lookalike import LookalikeIndex, skeleton
+
+index = LookalikeIndex(["paypal.com", "google.com", "amazon.com", "apple.com"])
+brands = LookalikeIndex(["google.com", "amazon.com", "twitter.com", "netflix.com", "facebook.com",
+                         "linkedin.com", "outlook.com", "dropbox.com", "paypal.com"])
+
+def test_skeleton_folds_confusable_characters():
+    """Digits, Cyrillic letters and rn/vv pairs map to the Latin letters they imitate."""
+    assert skeleton("paypa1") == "paypal"
+    assert skeleton("аpple") == "apple"
+    assert skeleton("arnazon") == "amazon"
+    assert skeleton("xn--pypal-4ve") == "paypal"
+
+def test_homoglyph_and_punycode_hosts_match_their_brand():
+    assert index.match("paypa1.com") == "paypal.com"
+    assert index.match("xn--pypal-4ve.com") == "paypal.com"
+    assert index.match("login.g00gle.co.uk") == "google.com"
+
+def test_single_edit_typosquats_match():
+    assert index.match("www.gooogle.com") == "google.com"
+    assert index.match("amazno.net") == "amazon.com"
+    assert index.match("gogle.com") == "google.com"
+    assert brands.match("twltter.com") == "twitter.com"
+    assert brands.match("linkedln.com") == "linkedin.com"
+
+def test_brand_domains_and_unrelated_hosts_do_not_match():
+    assert index.match("accounts.google.com") is None
+    assert index.match("google.de") is None
+    assert index.match("example.com") is None
+    # Short brands only match exactly, not at distance one
+    assert index.match("ample.com") is None
+
+def test_real_sites_one_letter_from_a_brand_do_not_match():
+    """Plain one-letter substitutions and insertions give real, unrelated names."""
+    real_sites = [
+        "twister.com", "amazin.com", "goggle.com", "netflux.com", "doodle.com", "googly.com",
+        "tweeter.com", "glitter.com", "netflex.com", "amazing.com", "amazone.fr", "amazonia.org",
+        "github.com", "gmail.com", "twitch.tv", "twilio.com", "netlify.com", "outbrain.com",
+        "facebook.com", "instacart.com", "paypal.me", "payoneer.com", "dropbox.tech",
+    ]
+    assert [host for host in real_sites if brands.match(host)] == []
@@ -0,0 +1,45 @@
+"""
+test_metrics.py — Prometheus exposition on /metrics.
+Scrapes the endpoint after a scan and checks the per-layer histograms and
+scan counters are exported, and that blacklist patterns apply immediately.
+"""
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from backend import server
+
+SCAM = "URGENT! Your account has been suspended. Verify your bank details now"
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {family.name: family for family in text_string_to_metric_families(response.text)}
+
+def scans_counted(families):
+    return sum(sample.value for sample in families["scamshield_scans"].samples
+               if sample.name == "scamshield_scans_total")
+
+def test_scan_is_exported_on_metrics(client):
+    before = scans_counted(scrape(client))
+    assert client.post("/api/scan", json={"content": SCAM}).status_code == 200
+    families = scrape(client)
+
+    assert families["scamshield_layer_latency_seconds"].type == "histogram"
+    assert families["scamshield_scan_latency_seconds"].type == "histogram"
+    assert families["scamshield_mongo_operation_seconds"].type == "histogram"
+    assert families["scamshield_scans"].type == "counter"
+    assert "scamshield_errors" in families
+    layers = {sample.labels["layer"] for sample in families["scamshield_layer_latency_seconds"].samples
+              if sample.name == "scamshield_layer_latency_seconds_count" and sample.value > 0}
+    assert {"rules", "blacklist"} <= layers
+    operations = {sample.labels["operation"] for sample in families["scamshield_mongo_operation_seconds"].samples
+                  if sample.name == "scamshield_mongo_operation_seconds_count" and sample.value > 0}
+    assert {"blocked_messages.find", "scan_history.insert_one"} <= operations
+    assert scans_counted(families) == before + 1
+
+def test_new_blocked_message_applies_to_the_next_scan(client):
+    text = "Your parcel fee is unpaid, reply PARCEL to release it"
+    assert "Blacklist: known_scam_message" not in client.post("/api/scan", json={"content": text}).json()["triggers"]
+    client.portal.call(server.store.seed_blocklists, [], [], [{"pattern": "reply parcel", "reason": "reported"}])
+    assert "Blacklist: known_scam_message" in client.post("/api/scan", json={"content": text}).json()["triggers"]
@@ -0,0 +1,92 @@
+"""
+test_neardup.py — MinHash/LSH near-duplicate index of known scam messages.
+Edited copies of an indexed scam (new amounts, spacing, reordered or
+replaced words) must be found, unrelated messages must not, and the
+blacklist layer must report the match.
+"""
+
+import asyncio
+import random
+import threading
+
+from backend import features, neardup, server
+from backend.storage import SQLiteStorage
+
+SCAM = ("URGENT! Your bank account has been suspended. Call 0800-123-4567 now "
+        "to claim your $500 refund before midnight")
+DATASET_SPAM = ("WINNER!! As a valued network customer you have been selected to receive a "
+                "£1000 prize reward! To claim call 09061701461 within 12 hours")
+
+def test_edited_copies_match():
+    index = neardup.NearDuplicateIndex(threshold=0.6)
+    assert index.add(SCAM, "seed")
+    for variant in [
+        SCAM.replace("$500", "$1,250").replace("0800-123-4567", "0900 555 1111"),
+        SCAM.replace(" ", "   ").upper(),
+        SCAM.replace("Call 0800-123-4567 now", "now call 0800-123-4567"),
+        SCAM.replace("bank account", "account").replace("your $500", "the $500") + " today",
+    ]:
+        similarity, source = index.match(variant)
+        assert similarity >= 0.6 and source == "seed"
+
+def test_unrelated_and_short_messages_do_not_match():
+    index = neardup.NearDuplicateIndex(threshold=0.6)
+    index.add(SCAM)
+    assert index.match("Hi mum, can you pick me up from the station at 6? my phone is about to die") is None
+    assert index.match("Your bank account statement for March is now available online.") is None
+    assert index.match("call now") is None
+    assert not index.add("final notice")
+
+def test_near_identical_texts_are_indexed_once():
+    index = neardup.NearDuplicateIndex()
+    assert index.add(SCAM)
+    assert not index.add(SCAM.replace("$500", "$600"))
+    assert len(index) == 1
+
+def test_match_while_another_thread_grows_the_index():
+    index = neardup.NearDuplicateIndex(threshold=0.6)
+    index.add(SCAM, "seed")
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    texts = [" ".join("".join(rng.choices(letters, k=6)) for _ in range(12)) for _ in range(3000)]
+    writer = threading.Thread(target=index.add_many, args=(texts, "backfill"))
+    writer.start()
+    results = []
+    while writer.is_alive():
+        results.append(index.match(SCAM.replace("$500", "$900")))
+    writer.join()
+    assert len(index) > 1024
+    assert all(result is not None and result[1] == "seed" for result in results)
+
+def test_lookup_compares_a_bounded_number_of_candidates():
+    rng = random.Random(5)
+    words = SCAM.split()
+    index = neardup.NearDuplicateIndex(threshold=0.95)
+    # Shuffled copies of the scam share many buckets with it
+    for _ in range(2000):
+        rng.shuffle(words)
+        index.add(" ".join(words))
+    keys = index._keys(index.signature(SCAM))
+    assert len(index._candidates(keys)) <= neardup.MAX_CANDIDATES
+
+def test_blacklist_layer_reports_near_duplicates(monkeypatch, tmp_path):
+    async def scenario():
+        store = SQLiteStorage(":memory:")
+        await store.connect()
+        await store.seed_blocklists([], [], [{"pattern": SCAM, "reason": "reported"}])
+        monkeypatch.setattr(server, "store", store)
+        await server.build_near_duplicate_index()
+        variant = features.extract_features(SCAM.replace("$500", "$900").replace("midnight", "noon"))
+        score, triggers = await server.apply_blacklist_layer(variant, "text")
+        # Training-set spam is scored by the ML layer, not indexed as a known scam
+        dataset_spam = features.extract_features(DATASET_SPAM.replace("£1000", "£2000"))
+        assert await server.apply_blacklist_layer(dataset_spam, "text") == (0, [])
+        await store.close()
+        return score, triggers
+    dataset = tmp_path / "sms_spam.tsv"
+    dataset.write_text(f"spam\t{DATASET_SPAM}\nham\tSee you at lunch\n", encoding="utf-8")
+    monkeypatch.setattr(server, "SMS_DATASET_PATH", dataset)
+    monkeypatch.setattr(server, "near_duplicate_index", None)
+    assert asyncio.run(scenario()) == (40, ["Blacklist: near_duplicate_scam"])
+    assert len(server.near_duplicate_index) == 1
+    assert "known scam message" in server.build_explanation(["Blacklist: near_duplicate_scam"])
@@ -0,0 +1,184 @@
+"""
+test_prefork.py — Pre-fork model loading.
+Concurrent first starts on one node must train the model once under the
+file lock, and artifacts preloaded by the pre-fork master must be reused
+by the workers and frozen out of the garbage collector. The master keeps
+singleton background work in one worker and reports crashed workers in
+its exit status, and a job whose worker is killed mid-chunk is finished
+by another worker.
+"""
+
+import asyncio
+import gc
+import multiprocessing
+import os
+import pickle
+import signal
+import time
+from types import SimpleNamespace
+
+import httpx
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from backend import prefork, server
+
+MESSAGES = ["URGENT: verify your account now", "Claim your prize today", "See you at lunch", "Meeting moved to 3pm"]
+
+def start_server_process(log_path):
+    def fake_training():
+        with open(log_path, "a") as f:
+            f.write("trained\n")
+        time.sleep(0.3)
+        server.save_artifact({"model": 1}, server.MODEL_PATH)
+        server.save_artifact({"vectorizer": 1}, server.VECTORIZER_PATH)
+        server.ml_model, server.vectorizer = {"model": 1}, {"vectorizer": 1}
+    server.train_ml_model = fake_training
+    asyncio.run(server.initialize_ml_model())
+    assert server.ml_model == {"model": 1}
+
+def test_concurrent_starts_train_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "MODEL_PATH", tmp_path / "ml_model.pkl")
+    monkeypatch.setattr(server, "VECTORIZER_PATH", tmp_path / "vectorizer.pkl")
+    monkeypatch.setattr(server, "MODEL_LOCK_PATH", tmp_path / "ml_model.lock")
+    monkeypatch.setattr(server, "ml_model", None)
+    monkeypatch.setattr(server, "vectorizer", None)
+    log_path = tmp_path / "training.log"
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=start_server_process, args=(log_path,)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+    assert [process.exitcode for process in processes] == [0, 0, 0]
+    assert log_path.read_text() == "trained\n"
+    with open(tmp_path / "ml_model.pkl", "rb") as f:
+        assert pickle.load(f) == {"model": 1}
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_preloaded_artifacts_are_shared_and_frozen(monkeypatch):
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression().fit(vectorizer.fit_transform(MESSAGES), [1, 1, 0, 0])
+    monkeypatch.setattr(server, "ml_model", model)
+    monkeypatch.setattr(server, "vectorizer", vectorizer)
+    monkeypatch.setattr(server, "SENTIMENT_BACKEND", "auto")
+    for name in ("text_scorer", "text_scorer_source", "lexicon_sentiment"):
+        monkeypatch.setattr(server, name, None)
+
+    def no_disk_access():
+        raise AssertionError("preloaded artifacts were reloaded")
+    monkeypatch.setattr(server, "load_ml_artifacts", no_disk_access)
+    try:
+        prefork.preload()
+        assert gc.get_freeze_count() > 0
+        assert server.text_scorer is not None and server.lexicon_sentiment is not None
+        # A forked worker's startup keeps the master's objects
+        asyncio.run(server.initialize_ml_model())
+        assert server.ml_model is model
+    finally:
+        gc.unfreeze()
+
+def test_master_keeps_singletons_in_one_worker_and_reports_crashes(monkeypatch, tmp_path):
+    log_path = tmp_path / "workers.log"
+
+    class FakeUvicornServer:
+        """Slot 1 crashes on its first start; its replacement stops the master."""
+
+        def __init__(self, config):
+            pass
+
+        def run(self, sockets):
+            signal.signal(signal.SIGTERM, lambda *args: os._exit(0))
+            flags = f"{server.RETENTION_TASK_ENABLED} {server.RESUME_SCAN_JOBS}"
+            previous = log_path.read_text() if log_path.exists() else ""
+            with open(log_path, "a") as f:
+                f.write(flags + "\n")
+            if flags == "False False":
+                if "False False" not in previous:
+                    raise RuntimeError("worker crashed")
+                os.kill(os.getppid(), signal.SIGTERM)
+            while True:
+                signal.pause()
+
+    monkeypatch.setattr(prefork.uvicorn, "Server", FakeUvicornServer)
+    monkeypatch.setattr(prefork, "MIN_WORKER_LIFETIME", 0.2)
+    monkeypatch.setattr(server, "RETENTION_TASK_ENABLED", True)
+    monkeypatch.setattr(server, "RESUME_SCAN_JOBS", True)
+    args = SimpleNamespace(workers=2, log_level="warning", access_log=False, timeout_keep_alive=5)
+    handlers = {signum: signal.getsignal(signum) for signum in prefork.STOP_SIGNALS}
+    try:
+        assert prefork.Master(None, args).run() == 1
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    # Slot 0 runs the singletons; the re-forked slot 1 never resumes jobs
+    assert sorted(log_path.read_text().splitlines()) == ["False False", "False False", "True True"]
+
+def serve_prefork(sock, args):
+    handlers = {signum: signal.getsignal(signum) for signum in prefork.STOP_SIGNALS}
+    try:
+        os._exit(prefork.Master(sock, args).run())
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+def test_job_of_a_killed_worker_is_finished_by_another(monkeypatch, tmp_path):
+    marker = tmp_path / "hung.pid"
+
+    async def no_model():
+        return None
+
+    async def scan_batch(items):
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return [{"content": content} for content, _ in items]
+        # The first chunk hangs in its worker until the test kills that worker
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(server.config, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(server.config, "SQLITE_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(server, "initialize_ml_model", no_model)
+    monkeypatch.setattr(server, "run_scan_batch", scan_batch)
+    monkeypatch.setattr(server, "SCAN_JOB_CHUNK_SIZE", 2)
+    monkeypatch.setattr(server, "SCAN_JOB_HEARTBEAT_SECONDS", 0.1)
+    monkeypatch.setattr(server, "SCAN_JOB_OWNER_TIMEOUT_SECONDS", 0.5)
+    monkeypatch.setattr(server, "HISTORY_RETENTION_DAYS", 0)
+    monkeypatch.setattr(prefork, "MIN_WORKER_LIFETIME", 0.2)
+    sock = prefork.bind_socket("127.0.0.1", 0, 64)
+    base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    args = SimpleNamespace(workers=2, log_level="warning", access_log=False, timeout_keep_alive=5)
+    master = multiprocessing.get_context("fork").Process(target=serve_prefork, args=(sock, args))
+    master.start()
+    sock.close()
+    # One connection per request: a kept-alive one may belong to the killed worker
+    limits = httpx.Limits(max_keepalive_connections=0)
+    try:
+        with httpx.Client(base_url=base_url, timeout=5, limits=limits) as client:
+            for _ in range(200):
+                try:
+                    client.get("/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.05)
+            items = [{"content": f"message {i}"} for i in range(6)]
+            job_id = client.post("/api/jobs", json={"items": items}).json()["id"]
+            for _ in range(200):
+                if marker.exists() and marker.read_text():
+                    break
+                time.sleep(0.05)
+            os.kill(int(marker.read_text()), signal.SIGKILL)
+
+            for _ in range(300):
+                job = client.get(f"/api/jobs/{job_id}").json()
+                if job["status"] == "completed":
+                    break
+                time.sleep(0.05)
+            assert (job["status"], job["processed"], job["failed"]) == ("completed", 6, 0)
+            results = client.get(f"/api/jobs/{job_id}/results").json()["results"]
+            assert [result["index"] for result in results] == list(range(6))
+    finally:
+        os.kill(master.pid, signal.SIGTERM)
+        master.join(10)
@@ -0,0 +1,81 @@
+"""
+test_profiling.py — Server-Timing breakdown and the admin sampling profiler.
+Debug requests must carry a per-stage Server-Timing header, and a profiling
+session must sample exactly the requested number of scans, then serve a
+collapsed-stack file that no longer changes.
+"""
+
+import threading
+
+import pytest
+
+from backend import profiling, server
+
+ADMIN = {"X-Admin-Token": "secret"}
+SCAM = "URGENT! Your account has been suspended. Verify your bank details now"
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "profiler", profiling.SamplingProfiler())
+    return client
+
+def stage_names(header):
+    return [part.split(";")[0] for part in header.split(", ")]
+
+def test_server_timing_is_opt_in(client):
+    assert "Server-Timing" not in client.post("/api/scan", json={"content": SCAM}).headers
+    for response in [
+        client.post("/api/scan?debug_timing=1", json={"content": SCAM}),
+        client.post("/api/scan", json={"content": SCAM}, headers={"X-Debug-Timing": "true"}),
+    ]:
+        assert response.status_code == 200
+        assert stage_names(response.headers["Server-Timing"]) == [
+            "detection", "rules", "blacklist", "ml", "azure", "persistence", "total"]
+    response = client.post("/api/scan/file?debug_timing=1", files={"file": ("a.txt", SCAM.encode())})
+    assert stage_names(response.headers["Server-Timing"])[0] == "extraction"
+
+def test_admin_profile_session(client):
+    assert client.post("/api/admin/profile").status_code == 401
+    started = client.post("/api/admin/profile?requests=3&interval_ms=0.5", headers=ADMIN)
+    assert started.status_code == 202 and started.json()["status"] == "running"
+    # start() ran off the event loop but samples the event loop thread
+    assert profiling.profiler.target_ident == client.portal.call(threading.get_ident)
+    assert client.post("/api/admin/profile", headers=ADMIN).status_code == 409
+
+    client.post("/api/scan", json={"content": SCAM})
+    status = client.get("/api/admin/profile", headers=ADMIN).json()
+    assert status["status"] == "running" and status["requests_done"] == 1
+    for _ in range(2):
+        client.post("/api/scan", json={"content": SCAM})
+
+    download = client.get("/api/admin/profile", headers=ADMIN)
+    assert download.headers["content-disposition"] == 'attachment; filename="scamshield.collapsed"'
+    assert not profiling.profiler.thread.is_alive()
+    # Later scans are not sampled into a finished profile
+    client.post("/api/scan", json={"content": SCAM})
+    assert client.get("/api/admin/profile", headers=ADMIN).text == download.text
+    for line in download.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and stack
+
+    assert client.post("/api/admin/profile?requests=5", headers=ADMIN).status_code == 202
+    assert client.delete("/api/admin/profile", headers=ADMIN).json()["status"] == "cancelled"
+
+def test_concurrent_tracking_counts_every_request():
+    profiler = profiling.SamplingProfiler()
+    profiler.start(requests=400, interval_ms=0.5)
+
+    def requests():
+        for _ in range(100):
+            with profiler.track():
+                pass
+    threads = [threading.Thread(target=requests) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profiler.snapshot()["requests_done"] == 400
+    assert profiler.snapshot()["status"] == "completed"
+    profiler.collapsed()
+    assert not profiler.thread.is_alive() and profiler.in_flight == 0
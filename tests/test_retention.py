@@ -0,0 +1,90 @@
+"""
+test_retention.py — Archive files written by the scan_history retention job.
+Checks that archived scans land in per-day gzip files only on commit and
+can be searched back by time range and filters, and that scans are only
+deleted from the database after an archival pass has succeeded.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from backend.retention import ArchiveWriter, RetentionManager, query_archive
+
+DAY = datetime(2026, 1, 10, tzinfo=timezone.utc)
+
+def scans():
+    return [
+        {"id": str(i), "content": f"Claim your prize {i}" if i % 2 else f"See you at {i}",
+         "scan_type": "text", "label": "🔴 Dangerous" if i % 2 else "🟢 Safe",
+         "timestamp": DAY + timedelta(hours=6 * i)}
+        for i in range(8)
+    ]
+
+def test_archive_files_appear_only_after_commit(tmp_path):
+    writer = ArchiveWriter(tmp_path, "start")
+    writer.write(scans())
+    assert list(tmp_path.glob("*.jsonl.gz")) == []
+    files = writer.commit()
+    assert [f.name for f in files] == ["scan_history-2026-01-10-start.jsonl.gz",
+                                       "scan_history-2026-01-11-start.jsonl.gz"]
+    assert list(tmp_path.glob("*.tmp")) == []
+
+def test_aborted_archive_leaves_no_files(tmp_path):
+    writer = ArchiveWriter(tmp_path, "start")
+    writer.write(scans())
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+def test_query_archive_filters_by_range_label_and_text(tmp_path):
+    writer = ArchiveWriter(tmp_path, "start")
+    writer.write(scans())
+    writer.commit()
+
+    everything = query_archive(tmp_path, limit=100)
+    assert len(everything["results"]) == 8
+
+    found = query_archive(tmp_path, start=DAY + timedelta(days=1), label="dangerous", contains="PRIZE")
+    assert sorted(doc["id"] for doc in found["results"]) == ["5", "7"]
+    assert found["files_scanned"] == 1
+
+    limited = query_archive(tmp_path, limit=3)
+    assert len(limited["results"]) == 3 and limited["truncated"]
+
+class RecordingStorage:
+    """Storage stub whose first scan export fails."""
+
+    def __init__(self):
+        self.calls = []
+        self.watermark = None
+
+    async def get_archive_watermark(self):
+        return self.watermark
+
+    async def set_archive_watermark(self, value):
+        self.watermark = value
+
+    async def iter_scans(self, start, end, batch_size):
+        failed = "archive_failed" in self.calls
+        self.calls.append("archived" if failed else "archive_failed")
+        if not failed:
+            raise ConnectionError("database unavailable")
+        yield scans()
+
+    async def expire_scans(self, before):
+        self.calls.append("expired")
+        return 0
+
+def test_scans_are_only_expired_after_a_successful_archive(tmp_path):
+    storage = RecordingStorage()
+
+    async def run():
+        manager = RetentionManager(storage, tmp_path, timedelta(days=30), timedelta(hours=24), interval=0.01)
+        await manager.start()
+        assert storage.calls == []
+        for _ in range(100):
+            if "expired" in storage.calls:
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop()
+    asyncio.run(run())
+    assert storage.calls[:3] == ["archive_failed", "archived", "expired"]
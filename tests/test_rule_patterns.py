@@ -0,0 +1,42 @@
+"""
+test_rule_patterns.py — Linear-time guarantee for the rule layer.
+Rule patterns must not contain unbounded gaps, the cost of adversarial
+inputs must grow linearly with their length, and the per-scan character
+budget must bound what the layer matches.
+"""
+
+import re
+
+from backend import server
+from backend.features import extract_features
+from benchmarks.bench_regex import adversarial_inputs, time_rules
+
+UNBOUNDED = re.compile(r'\.\*|\.\+|\{\d+,\}')
+
+def test_rule_patterns_have_no_unbounded_gaps():
+    patterns = [p for group in server.SCAM_PATTERNS.values() for p in group]
+    patterns += [server.SUSPICIOUS_URL_RE.pattern]
+    assert [p for p in patterns if UNBOUNDED.search(p)] == []
+
+def test_bounded_patterns_still_match_scam_phrases():
+    _, triggers = server.apply_rule_layer(extract_features("You have won $5,000! Claim your prize"), "text")
+    assert "Rule: lottery" in triggers
+    _, triggers = server.apply_rule_layer(extract_features("Your verification pin is 482913"), "text")
+    assert "Rule: otp_phishing" in triggers
+
+def test_adversarial_input_cost_grows_linearly(monkeypatch):
+    monkeypatch.setattr(server, "RULE_MATCH_MAX_CHARS", 1 << 30)
+    small, large = 2000, 16000
+    per_char = {}
+    for size in (small, large):
+        text = adversarial_inputs(size)["you_won"]
+        per_char[size] = time_rules(text, repeat=5) / size
+    # Unbounded .* gaps are quadratic here: 8x the cost per character at 8x the length
+    assert per_char[large] / per_char[small] < 4.0
+
+def test_matching_budget_caps_the_matched_text(monkeypatch):
+    monkeypatch.setattr(server, "RULE_MATCH_MAX_CHARS", 100)
+    scam = extract_features("URGENT: final notice")
+    assert server.apply_rule_layer(scam, "text")[1] == ["Rule: urgency"]
+    padded = extract_features("x" * 100 + " URGENT: final notice")
+    assert server.apply_rule_layer(padded, "text") == (0, [])
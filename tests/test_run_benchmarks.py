@@ -0,0 +1,65 @@
+"""
+test_run_benchmarks.py — Regression gate of the benchmark suite.
+compare() flags a benchmark only when its calibration ratio is over the
+threshold and it is slower by more than the noise floor; main() exits 2
+on a corpus mismatch and on a missing baseline under --strict, and 0
+when the run matches its platform's baseline.
+"""
+
+import json
+
+import pytest
+
+from benchmarks import run_benchmarks
+
+def result(relative, median_us, items=1000):
+    return {"per_item_us": median_us, "median_us": median_us, "relative": relative,
+            "calibration_us": 3000.0, "items": items}
+
+def record(corpus="synthetic", **benchmarks):
+    return {"platform": "x86_64/python-3.11", "corpus": corpus, "benchmarks": benchmarks}
+
+def test_compare_flags_ratios_over_the_threshold():
+    baseline = record(rules=result(0.005, 17.0), ml=result(0.001, 2.7))
+    current = record(rules=result(0.007, 23.8), ml=result(0.0012, 3.2))
+    assert run_benchmarks.compare(current, baseline, 1.3) == [("rules", pytest.approx(1.4))]
+    assert current["benchmarks"]["ml"]["vs_baseline"] == 1.2
+    assert run_benchmarks.compare(current, baseline, 1.5) == []
+
+def test_compare_ignores_noise_and_other_item_counts():
+    # 1.5x slower, but by less than the noise floor per item
+    baseline = record(detect=result(0.0003, 1.0), scan=result(0.6, 1800.0, items=100))
+    current = record(detect=result(0.00045, 1.5), scan=result(1.2, 3600.0, items=50))
+    assert run_benchmarks.compare(current, baseline, 1.3) == []
+    assert "vs_baseline" not in current["benchmarks"]["scan"]
+
+@pytest.fixture
+def gate(monkeypatch, tmp_path):
+    """Run main() on a canned result against a baselines.json in tmp_path."""
+    path = tmp_path / "baselines.json"
+
+    def run_gate(current, baselines, *extra):
+        monkeypatch.setattr(run_benchmarks, "run", lambda args: current)
+        path.write_text(json.dumps({"platforms": baselines}))
+        return run_benchmarks.main(["--baseline", str(path), *extra])
+    return run_gate
+
+def test_main_passes_on_a_matching_baseline(gate, monkeypatch):
+    monkeypatch.delenv("CI", raising=False)
+    baseline = record(rules=result(0.005, 17.0))
+    assert gate(record(rules=result(0.0051, 17.3)), {"x86_64/python-3.11": baseline}) == 0
+    assert gate(record(rules=result(0.008, 27.0)), {"x86_64/python-3.11": baseline}) == 1
+
+def test_main_rejects_a_baseline_from_another_corpus(gate):
+    baseline = record(corpus="sms_spam.tsv", rules=result(0.005, 17.0))
+    assert gate(record(rules=result(0.005, 17.0)), {"x86_64/python-3.11": baseline}) == 2
+
+def test_missing_baseline_fails_only_when_strict(gate, monkeypatch):
+    monkeypatch.delenv("CI", raising=False)
+    current = record(rules=result(0.005, 17.0))
+    baselines = {"arm64/python-3.12": record(rules=result(0.005, 17.0))}
+    assert gate(current, baselines) == 0
+    assert gate(current, baselines, "--strict") == 2
+    assert gate(current, baselines, "--baseline-platform", "arm64/python-3.12", "--strict") == 0
+    monkeypatch.setenv("CI", "true")
+    assert gate(current, baselines) == 2
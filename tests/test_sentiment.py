@@ -0,0 +1,116 @@
+"""
+test_sentiment.py — Local lexicon sentiment layer and the Azure circuit breaker.
+Checks negation and intensity handling, that a vectorized batch scores
+like single texts, and that the "auto" backend falls back to the lexicon
+while Azure fails or its circuit is open, and for documents Azure leaves
+out of its answer. Batches are sent to Azure a request of several
+documents at a time.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from backend import admission, features, sentiment, server
+from benchmarks.fakes import MockAzureServer
+
+THREAT = ("URGENT! Your account has been suspended due to unauthorized activity. "
+          "Failure to verify will result in legal action and arrest!")
+
+def score(text):
+    feats = features.extract_features(text)
+    return sentiment.LexiconSentiment().score(feats.tokens, text.count('!'))
+
+def test_threatening_text_is_negative():
+    label, negative, positive = score(THREAT)
+    assert label == "negative" and negative > 0.8 and positive < 0.1
+    assert server.apply_lexicon_layer(features.extract_features(THREAT)) == (
+        30, ["Lexicon: high_negative_sentiment", "Lexicon: threatening_tone_detected"]
+    )
+    assert score("Hi mum, can you pick me up from the station at 6?") == ("neutral", 0.0, 0.0)
+    assert score("")[0] == "neutral"
+
+def test_negation_and_intensity():
+    assert score("Your account has been suspended")[0] == "negative"
+    label, negative, positive = score("Your account has not been suspended")
+    assert negative == 0.0 and positive > 0
+    assert score("Your account will be permanently suspended")[1] > score("Your account will be suspended")[1]
+    assert score("slightly bad")[1] < score("bad")[1]
+
+def test_batch_matches_single_scores():
+    texts = [THREAT, "Thanks, that was a great dinner!", "not bad at all", "", "no", "very"]
+    scorer = sentiment.LexiconSentiment()
+    token_lists = [features.extract_features(text).tokens for text in texts]
+    exclamations = [text.count('!') for text in texts]
+    batch = scorer.score_batch(token_lists, exclamations)
+    for result, tokens, bangs in zip(batch, token_lists, exclamations):
+        assert result == pytest.approx(scorer.score(tokens, bangs))
+    # Negation never leaks from the end of one text into the next
+    assert scorer.score_batch([("not",), ("bad",)])[1] == scorer.score(("bad",))
+
+class FailingAzureClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def post(self, *args, **kwargs):
+        self.calls += 1
+        raise ConnectionError("Azure unreachable")
+
+def test_auto_backend_falls_back_while_circuit_is_open(monkeypatch):
+    client = FailingAzureClient()
+    monkeypatch.setattr(server, "AZURE_LANGUAGE_KEY", "key")
+    monkeypatch.setattr(server, "AZURE_LANGUAGE_ENDPOINT", "https://azure.invalid/")
+    monkeypatch.setattr(server, "get_azure_client", lambda: client)
+    monkeypatch.setattr(server, "azure_circuit", admission.CircuitBreaker("azure", 2, 60))
+    feats = features.extract_features(THREAT)
+
+    monkeypatch.setattr(server, "SENTIMENT_BACKEND", "azure")
+    assert asyncio.run(server.apply_sentiment_layer(feats)) == (0, [])
+
+    monkeypatch.setattr(server, "SENTIMENT_BACKEND", "auto")
+    for _ in range(3):
+        assert asyncio.run(server.apply_sentiment_layer(feats))[1][0] == "Lexicon: high_negative_sentiment"
+    # The circuit opened after the second failure; Azure is no longer called
+    assert client.calls == 2 and server.azure_circuit.state == "open"
+    assert "sentiment analysis" in server.build_explanation(["Lexicon: threatening_tone_detected"])
+
+class PartialAzureClient:
+    """Answers for the first document only, as Azure does for unsupported languages."""
+
+    async def post(self, url, headers, json):
+        document = {"id": "1", "sentiment": "negative", "confidenceScores": {"negative": 0.9, "positive": 0.05}}
+        return httpx.Response(200, json={"results": {"documents": [document], "errors": [{"id": "2"}]}})
+
+def test_auto_backend_falls_back_for_documents_azure_omits(monkeypatch):
+    monkeypatch.setattr(server, "AZURE_LANGUAGE_KEY", "key")
+    monkeypatch.setattr(server, "AZURE_LANGUAGE_ENDPOINT", "https://azure.invalid/")
+    monkeypatch.setattr(server, "get_azure_client", PartialAzureClient)
+    monkeypatch.setattr(server, "azure_circuit", admission.CircuitBreaker("azure", 2, 60))
+    feats_list = [features.extract_features(THREAT), features.extract_features(f"{THREAT} again")]
+
+    assert asyncio.run(server.query_azure_sentiment_batch([feats.text for feats in feats_list]))[1] is None
+    monkeypatch.setattr(server, "SENTIMENT_BACKEND", "auto")
+    results = asyncio.run(server.apply_sentiment_layer_batch(feats_list))
+    assert results[0][1][0] == "Azure: high_negative_sentiment"
+    assert results[1][1][0] == "Lexicon: high_negative_sentiment"
+
+def test_batch_sends_several_documents_per_azure_request(monkeypatch):
+    monkeypatch.setattr(server, "SENTIMENT_BACKEND", "azure")
+    monkeypatch.setattr(server, "AZURE_LANGUAGE_KEY", "key")
+    monkeypatch.setattr(server, "azure_client", None)
+    monkeypatch.setattr(server, "azure_bulkhead", admission.Bulkhead("azure", 8, 2.0))
+    monkeypatch.setattr(server, "azure_circuit", admission.CircuitBreaker("azure", 2, 60))
+    feats_list = [features.extract_features(f"{THREAT} #{i}") for i in range(25)]
+
+    async def scan(endpoint):
+        monkeypatch.setattr(server, "AZURE_LANGUAGE_ENDPOINT", endpoint)
+        try:
+            return await server.apply_sentiment_layer_batch(feats_list)
+        finally:
+            await server.azure_client.aclose()
+
+    with MockAzureServer(latency_ms=50) as azure:
+        results = asyncio.run(scan(azure.endpoint))
+    assert azure.requests == 3
+    assert all(result[1][0] == "Azure: high_negative_sentiment" for result in results)
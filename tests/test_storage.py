@@ -0,0 +1,136 @@
+"""
+test_storage.py — Embedded SQLite storage backend.
+Exercises the blacklist, history, stats, retention and batch job paths
+against SQLiteStorage, so they run without an external MongoDB, checks
+that MongoStorage creates the same scan_history indexes as SQLite, and
+that an incomplete backend is refused when it is instantiated.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend import jobs
+from backend.retention import RetentionManager, query_archive
+from backend.storage import MongoStorage, SQLiteStorage, Storage
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def open_store(path=":memory:"):
+    store = SQLiteStorage(path)
+    await store.connect()
+    return store
+
+def scan(i, hours_ago, label=0):
+    return {"id": str(i), "content": f"message {i}", "scan_type": "text", "risk_score": 10,
+            "label": label, "triggers": [], "timestamp": NOW - timedelta(hours=hours_ago)}
+
+def test_blacklist_seeding_is_idempotent():
+    async def scenario():
+        store = await open_store()
+        for _ in range(2):
+            await store.seed_blocklists([{"domain": "bad.example", "reason": "r"}],
+                                        [{"number": "555-0123", "reason": "r"}],
+                                        [{"pattern": "final notice", "reason": "r"}])
+        assert (await store.find_blocked_domain("bad.example"))["reason"] == "r"
+        assert await store.find_blocked_domain("good.example") is None
+        assert await store.find_blocked_number("555-0123") is not None
+        assert await store.blocked_message_patterns(100) == ["final notice"]
+        await store.close()
+    run(scenario())
+
+def test_history_and_stats(tmp_path):
+    async def scenario():
+        store = await open_store(str(tmp_path / "scamshield.db"))
+        for i, label in enumerate([0, 2, 2, "🟡 Suspicious"]):
+            await store.insert_scan(scan(i, hours_ago=10 - i, label=label))
+        recent = await store.recent_scans(2)
+        assert [doc["id"] for doc in recent] == ["3", "2"]
+        assert recent[0]["timestamp"] == (NOW - timedelta(hours=7)).replace(tzinfo=None)
+        assert await store.count_scans_by_label() == {0: 1, 2: 2, "🟡 Suspicious": 1}
+        await store.close()
+    run(scenario())
+
+def test_retention_archives_before_expiring(tmp_path):
+    async def scenario():
+        store = await open_store()
+        for i in range(50):
+            await store.insert_scan(scan(i, hours_ago=i * 24))
+        manager = RetentionManager(store, tmp_path, hot_window=timedelta(days=30),
+                                   lead=timedelta(days=1), chunk_size=7)
+        result = await manager.archive_once(NOW)
+        # Everything older than 29 days is archived; older than 30 days is deleted
+        assert result["archived"] == 20
+        assert len(await store.recent_scans(100)) == 31
+        assert len(query_archive(tmp_path, limit=100)["results"]) == 20
+        assert (await manager.archive_once(NOW))["archived"] == 0
+        await store.close()
+    run(scenario())
+
+def test_batch_jobs_run_on_sqlite():
+    async def scan_batch(items):
+        return [{"error": "Content cannot be empty"} if not content.strip() else {"label": 0, "content": content}
+                for content, _ in items]
+
+    async def scenario():
+        store = await open_store()
+        manager = jobs.JobManager(store, scan_batch, concurrency=2, chunk_size=2)
+        await manager.start()
+        job = await manager.submit([("a", None), (" ", None), ("c", "text")])
+        await manager.queue.join()
+        status = await manager.get_job(job["id"])
+        assert (status["status"], status["processed"], status["failed"]) == (jobs.JOB_COMPLETED, 3, 1)
+        results = await manager.get_results(job["id"], 0, 10)
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert results[2]["content"] == "c"
+        assert await store.job_items(job["id"], 0, 10) == []
+        await manager.stop()
+        await store.close()
+    run(scenario())
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class PartialStorage(Storage):
+        async def insert_scan(self, doc):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialStorage()
+    # Both shipped backends implement the whole interface
+    assert not MongoStorage.__abstractmethods__ and not SQLiteStorage.__abstractmethods__
+
+class IndexRecordingCollection:
+    def __init__(self):
+        self.indexes = {}
+
+    async def create_index(self, keys, name=None, **options):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        self.indexes[name or "_".join(f"{key}_{order}" for key, order in keys)] = {"key": keys, **options}
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+class IndexRecordingDatabase(dict):
+    def __getattr__(self, name):
+        return self.setdefault(name, IndexRecordingCollection())
+
+def test_mongo_indexes_scan_history_like_sqlite():
+    db = IndexRecordingDatabase()
+    db.scan_history.indexes["scan_history_ttl"] = {"key": [("timestamp", 1)], "expireAfterSeconds": 86400}
+    run(MongoStorage("mongodb://unused", "scamshield", db=db).connect())
+    assert db.scan_history.indexes == {
+        "scan_history_timestamp": {"key": [("timestamp", 1)]},
+        "scan_history_label": {"key": [("label", 1)]},
+    }
+
+    store = run(open_store())
+    sqlite_indexes = {row[0] for row in store.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'scan_history' AND sql IS NOT NULL")}
+    assert sqlite_indexes == set(db.scan_history.indexes)
+    run(store.close())